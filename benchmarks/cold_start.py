@@ -0,0 +1,118 @@
+"""
+Cold-start benchmark of srx-gui.
+
+Each measurement runs in a new Python process, so the modules are imported from scratch:
+
+- ``--help``: parsing of the command line (``python -m srx_gui.main --help``);
+- ``startup``: import of the application, creation of the viewer and processing of the first
+  events in the Qt event loop (offscreen, without connecting to any data sources).
+
+The measurements are done for the working tree and, optionally, for a baseline git revision
+(checked out to a temporary worktree), e.g.
+
+    python benchmarks/cold_start.py --baseline HEAD~1 --repeat 10
+
+Any revision that has ``srx_gui/main.py`` with ``main(argv)`` can be compared, including
+the revisions before the startup profiling was added: the driver passes only the arguments
+accepted by all revisions (an empty list of Kafka topics, so no data sources are connected).
+A measurement that fails for a revision is reported as failed.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+_STARTUP_DRIVER = """
+from qtpy.QtWidgets import QApplication
+
+# The application exists before 'main()' is called, so 'main()' returns without entering the event loop
+app = QApplication(["srx-gui-benchmark"])
+from srx_gui.main import main
+
+main(["--kafka-topics", ""])
+app.processEvents()
+"""
+
+_MEASUREMENTS = {
+    "--help": [sys.executable, "-m", "srx_gui.main", "--help"],
+    "startup": [sys.executable, "-c", _STARTUP_DRIVER],
+}
+
+
+def _run(command, source_dir):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = source_dir + os.pathsep + env.get("PYTHONPATH", "")
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    t_start = time.perf_counter()
+    subprocess.run(
+        command, cwd=source_dir, env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    return time.perf_counter() - t_start
+
+
+def measure(source_dir, repeat):
+    """
+    Returns the dictionary that maps the name of the measurement to the list of durations
+    or ``None`` if the command failed.
+    """
+    results = {}
+    for name, command in _MEASUREMENTS.items():
+        try:
+            _run(command, source_dir)  # Warm up the file system cache and byte code
+            results[name] = [_run(command, source_dir) for _ in range(repeat)]
+        except subprocess.CalledProcessError as ex:
+            print(f"Failed to run the measurement {name!r} in {source_dir!r}: {ex}")
+            results[name] = None
+    return results
+
+
+def _format(durations):
+    if durations is None:
+        return "failed"
+    return f"{statistics.median(durations):7.3f} s (min {min(durations):.3f} s)"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cold-start benchmark of srx-gui")
+    parser.add_argument("--baseline", default=None, help="Git revision to compare with, e.g. 'HEAD~1'")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of runs of each measurement")
+    args = parser.parse_args(argv)
+
+    repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    trees = {"current": repo_dir}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if args.baseline:
+            baseline_dir = os.path.join(tmp_dir, "baseline")
+            subprocess.run(
+                ["git", "worktree", "add", "--detach", baseline_dir, args.baseline],
+                cwd=repo_dir,
+                check=True,
+                stdout=subprocess.DEVNULL,
+            )
+            trees = {f"baseline ({args.baseline})": baseline_dir, **trees}
+
+        try:
+            results = {tree: measure(source_dir, args.repeat) for tree, source_dir in trees.items()}
+        finally:
+            if args.baseline:
+                subprocess.run(["git", "worktree", "remove", "--force", baseline_dir], cwd=repo_dir, check=True)
+
+    width = max(len(_) for _ in trees)
+    for name in _MEASUREMENTS:
+        print(f"{name}:")
+        for tree, tree_results in results.items():
+            print(f"  {tree:<{width}}  {_format(tree_results[name])}")
+        if len(results) == 2:
+            (_, before), (_, after) = results.items()
+            if before[name] is None or after[name] is None:
+                continue
+            ratio = statistics.median(before[name]) / statistics.median(after[name])
+            print(f"  {'speedup':<{width}}  {ratio:7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
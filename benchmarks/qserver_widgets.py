@@ -0,0 +1,135 @@
+"""
+Load test of the queue, history and status widgets with the local stand-in for the queue server.
+
+Unlike ``queue_tables.py``, which emits the events of the model directly, the widgets are
+connected to ``RunEngineClient`` that communicates with the stand-in over 0MQ (see
+``srx_gui.qserver_stand_in``), so the measured times include the requests, the transfer
+of the queue and the history and the processing of the events by the widgets. For each
+operation the request is sent using the model, the status is reloaded and the Qt events are
+processed. The original widgets from bluesky-widgets and the SRX widgets are compared, e.g.
+
+    python benchmarks/qserver_widgets.py --sizes 1000 10000 --latency 0.005 --repeat 5
+
+The contents of the tables are verified after the operations.
+"""
+import argparse
+import os
+import statistics
+import time
+
+from srx_gui.testing import expected_table_contents, table_contents
+
+_OPERATIONS = ("connect", "status_poll", "add_item", "move_item", "edit_item", "complete_plan")
+
+
+def _new_item():
+    return {"item_type": "plan", "name": "nano_scan_and_fly", "args": [-1, 1, 11, -1, 1, 11, 0.01], "kwargs": {}}
+
+
+class _Operations:
+    def __init__(self, model, stand_in):
+        self._model = model
+        self._stand_in = stand_in
+
+    def connect(self):
+        self._model.manager_connecting_ops()
+        self._model.load_re_manager_status(unbuffered=True)
+
+    def status_poll(self):
+        # Nothing is changed: only the status is loaded from the server
+        self._model._client.status(reload=True)
+        self._model.load_re_manager_status(unbuffered=True)
+
+    def add_item(self):
+        self._model.selected_queue_item_uids = []
+        self._model.queue_item_add(item=_new_item())
+
+    def move_item(self):
+        items = self._model._plan_queue_items
+        self._model.selected_queue_item_uids = [items[len(items) // 2]["item_uid"]]
+        self._model.queue_items_move_to_top()
+
+    def edit_item(self):
+        item = dict(self._model._plan_queue_items[len(self._model._plan_queue_items) // 3])
+        item["args"] = list(item["args"]) + [1]
+        self._model.queue_item_update(item=item)
+
+    def complete_plan(self):
+        self._stand_in.complete_plan()
+        # The client keeps the status for a short time, the change is detected by the next poll
+        self._model._client.status(reload=True)
+        self._model.load_re_manager_status(unbuffered=True)
+
+
+def measure(widget_classes, n_items, latency, repeat, app):
+    """
+    Returns the dictionary: (widget set, operation) -> list of durations.
+    """
+    from srx_gui.models import SRXRunEngineClient
+    from srx_gui.qserver_stand_in import QueueServerStandIn
+
+    results = {}
+    for name, (queue_class, history_class, status_class) in widget_classes.items():
+        durations = {_: [] for _ in _OPERATIONS}
+        for n in range(repeat):
+            stand_in = QueueServerStandIn(queue_size=n_items, history_size=n_items, latency=latency)
+            stand_in.start()
+            model = SRXRunEngineClient(zmq_control_addr=stand_in.zmq_control_addr)
+            widgets = [queue_class(model), history_class(model), status_class(model)]
+            operations = _Operations(model, stand_in)
+            # Each operation is measured once per repetition, so the queue size is the same for both sets
+            for operation in _OPERATIONS:
+                t_start = time.perf_counter()
+                getattr(operations, operation)()
+                app.processEvents()
+                durations[operation].append(time.perf_counter() - t_start)
+
+            queue_widget, history_widget = widgets[:2]
+            if table_contents(queue_widget) != expected_table_contents(queue_widget, stand_in.queue):
+                raise RuntimeError(f"{name}: the contents of the queue table are incorrect")
+            if table_contents(history_widget) != expected_table_contents(history_widget, stand_in.history):
+                raise RuntimeError(f"{name}: the contents of the history table are incorrect")
+
+            for widget in widgets:
+                widget.close()
+            model._client.close()
+            stand_in.stop()
+        results.update({(name, k): v for k, v in durations.items()})
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Load test of the queue, history and status widgets with the queue server stand-in"
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000], help="Numbers of items.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Response latency of the stand-in in seconds.")
+    parser.add_argument("--repeat", type=int, default=3, help="The number of repetitions of each operation.")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from qtpy.QtWidgets import QApplication
+    from bluesky_widgets.qt.run_engine_client import QtRePlanHistory, QtRePlanQueue, QtReStatusMonitor
+
+    from srx_gui.widgets import QtSRXPlanHistory, QtSRXPlanQueue
+
+    app = QApplication.instance() or QApplication([])
+    widget_classes = {
+        "reload": (QtRePlanQueue, QtRePlanHistory, QtReStatusMonitor),
+        "diff": (QtSRXPlanQueue, QtSRXPlanHistory, QtReStatusMonitor),
+    }
+
+    print(f"{'items':>7} {'operation':<15} {'reload, ms':>12} {'diff, ms':>12} {'speedup':>9}")
+    for n_items in args.sizes:
+        results = measure(widget_classes, n_items, args.latency, args.repeat, app)
+        for operation in _OPERATIONS:
+            t_reload = statistics.median(results[("reload", operation)])
+            t_diff = statistics.median(results[("diff", operation)])
+            print(
+                f"{n_items:>7} {operation:<15} {t_reload * 1000:>12.2f} {t_diff * 1000:>12.2f} "
+                f"{t_reload / t_diff:>8.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
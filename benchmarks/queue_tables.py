@@ -0,0 +1,149 @@
+"""
+Benchmark of the updates of the plan queue and plan history tables.
+
+The widgets are driven by ``QueueEventsStandIn``, which keeps the queue and the history
+in memory, applies the typical operations (adding, removing, moving and editing a queue item,
+completion of a plan) and emits the ``plan_queue_changed`` and ``plan_history_changed`` events
+of ``RunEngineClient`` the same way as the model does after loading the updated queue from
+the server. No requests are sent (see ``qserver_widgets.py`` for the benchmark with the 0MQ
+stand-in for the queue server ``srx_gui.qserver_stand_in``). The time of processing of
+the events by the original widgets from bluesky-widgets (the table is reloaded) and by
+the widgets with diff-based updates is compared, e.g.
+
+    python benchmarks/queue_tables.py --sizes 100 1000 5000 --repeat 5
+
+The contents of the tables are verified after each update.
+"""
+import argparse
+import statistics
+import time
+import uuid
+
+from srx_gui.testing import expected_table_contents, table_contents
+
+
+def _make_item(n):
+    return {
+        "item_type": "plan",
+        "name": "nano_scan_and_fly",
+        "args": [-10, 10, 101, -5, 5, 51, 0.05],
+        "kwargs": {"shutter": True, "extra_dets": []},
+        "user": "bench",
+        "user_group": "primary",
+        "item_uid": str(uuid.uuid4()),
+        "result": {"run_uids": [str(uuid.uuid4())], "exit_status": "completed"},
+        "meta": {"n": n},
+    }
+
+
+class QueueEventsStandIn:
+    """
+    In-memory queue and history that emit the events of the ``RunEngineClient`` model
+    instead of the queue server.
+    """
+
+    def __init__(self, model, n_items):
+        self._model = model
+        self.queue = [_make_item(n) for n in range(n_items)]
+        self.history = [_make_item(n) for n in range(n_items)]
+
+    def _emit_queue(self):
+        self._model.events.plan_queue_changed(plan_queue_items=list(self.queue), selected_item_uids=[])
+
+    def _emit_history(self):
+        self._model.events.plan_history_changed(plan_history_items=list(self.history), selected_item_pos=[])
+
+    def reset(self):
+        self._emit_queue()
+        self._emit_history()
+
+    def add_item(self):
+        self.queue.append(_make_item(len(self.queue)))
+        self._emit_queue()
+
+    def move_item(self):
+        self.queue.insert(len(self.queue) // 2, self.queue.pop(-1))
+        self._emit_queue()
+
+    def edit_item(self):
+        n = len(self.queue) // 3
+        item = dict(self.queue[n])
+        item["args"] = list(item["args"]) + [1]
+        self.queue[n] = item
+        self._emit_queue()
+
+    def complete_plan(self):
+        # The plan at the top of the queue is completed and added to the history
+        item = self.queue.pop(0)
+        self.history.append(item)
+        self._emit_queue()
+        self._emit_history()
+
+
+_OPERATIONS = ("add_item", "move_item", "edit_item", "complete_plan")
+
+
+def measure(widget_classes, n_items, repeat, app):
+    """
+    Returns the dictionary: (widget set, operation) -> list of durations.
+    """
+    from bluesky_widgets.models.run_engine_client import RunEngineClient
+
+    results = {}
+    for name, (queue_class, history_class) in widget_classes.items():
+        model = RunEngineClient()
+        queue_widget, history_widget = queue_class(model), history_class(model)
+        server = QueueEventsStandIn(model, n_items)
+        server.reset()
+        app.processEvents()
+        for operation in _OPERATIONS:
+            durations = []
+            for _ in range(repeat):
+                t_start = time.perf_counter()
+                getattr(server, operation)()
+                app.processEvents()
+                durations.append(time.perf_counter() - t_start)
+            results[(name, operation)] = durations
+        if table_contents(queue_widget) != expected_table_contents(queue_widget, server.queue):
+            raise RuntimeError(f"{name}: the contents of the queue table are incorrect")
+        if table_contents(history_widget) != expected_table_contents(history_widget, server.history):
+            raise RuntimeError(f"{name}: the contents of the history table are incorrect")
+        queue_widget.close()
+        history_widget.close()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark of the updates of the plan queue and history tables")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000], help="Numbers of items.")
+    parser.add_argument("--repeat", type=int, default=5, help="The number of repetitions of each operation.")
+    args = parser.parse_args(argv)
+
+    import os
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from qtpy.QtWidgets import QApplication
+    from bluesky_widgets.qt.run_engine_client import QtRePlanHistory, QtRePlanQueue
+
+    from srx_gui.widgets import QtSRXPlanHistory, QtSRXPlanQueue
+
+    app = QApplication.instance() or QApplication([])
+    widget_classes = {
+        "reload": (QtRePlanQueue, QtRePlanHistory),
+        "diff": (QtSRXPlanQueue, QtSRXPlanHistory),
+    }
+
+    print(f"{'items':>7} {'operation':<15} {'reload, ms':>12} {'diff, ms':>12} {'speedup':>9}")
+    for n_items in args.sizes:
+        results = measure(widget_classes, n_items, args.repeat, app)
+        for operation in _OPERATIONS:
+            t_reload = statistics.median(results[("reload", operation)])
+            t_diff = statistics.median(results[("diff", operation)])
+            print(
+                f"{n_items:>7} {operation:<15} {t_reload * 1000:>12.2f} {t_diff * 1000:>12.2f} "
+                f"{t_reload / t_diff:>8.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
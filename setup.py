@@ -47,7 +47,8 @@ setup(
     packages=find_packages(exclude=["docs", "tests"]),
     entry_points={
         "console_scripts": [
-            "srx-gui = srx_gui.main:main"
+            "srx-gui = srx_gui.main:main",
+            "srx-gui-headless = srx_gui.headless:main",
             # 'command = some.module:some_function',
         ],
     },
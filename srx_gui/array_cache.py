@@ -0,0 +1,290 @@
+"""
+Local cache of the data of completed runs stored as memory-mappable arrays (``.npy`` files).
+
+When a live run is completed, the compact buffers accumulated by the live plots (data columns
+of the monitored streams) are saved to the cache together with the 'start', 'descriptor' and
+'stop' documents. The cached runs could be reopened in the GUI or loaded in a notebook without
+accessing databroker. The cache is limited in size: the least recently used runs are removed::
+
+    from srx_gui.array_cache import RunArrayCache
+
+    cache = RunArrayCache("~/.cache/srx-gui/arrays")
+    run = cache.open(uid)
+    data = run.read("xs_roi_monitor")["xs_roi"]  # numpy.memmap
+"""
+import json
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .plots import LiveImageSRX, LivePlotSRX
+from .streaming import compose_event_pages
+
+
+class CachedRun:
+    """
+    Run loaded from ``RunArrayCache``. The data columns are memory-mapped, so only the accessed
+    parts of the arrays are read from disk. The object provides the subset of the interface
+    of ``BlueskyRun`` used by the GUI (``metadata``, iteration over the stream names and
+    ``documents()``), so it could be passed to ``RunLoader``.
+
+    Only the plotted fields are cached. The streams that contain all fields of the run
+    are listed by ``complete_streams()``, the other fields should be read from the catalog
+    (see ``RunLoader.load()``).
+    """
+
+    def __init__(self, path):
+        self._path = path
+        with open(os.path.join(path, "metadata.json")) as f:
+            metadata = json.load(f)
+        self._metadata = {"start": metadata["start"], "stop": metadata["stop"]}
+        # Maps stream name -> descriptor
+        self._descriptors = metadata["descriptors"]
+        self._fields = metadata["fields"]
+
+    @property
+    def metadata(self):
+        return self._metadata
+
+    @property
+    def path(self):
+        return self._path
+
+    def __iter__(self):
+        return iter(self._descriptors)
+
+    def fields(self, stream_name):
+        """
+        Returns the list of the names of the cached fields of the stream.
+        """
+        return list(self._fields[stream_name])
+
+    def descriptor(self, stream_name):
+        """
+        Returns the 'descriptor' document of the stream as it was recorded (with all fields).
+        """
+        return self._descriptors[stream_name]
+
+    def complete_streams(self):
+        """
+        Returns the list of names of the streams for which all fields are cached.
+        """
+        return [
+            stream_name
+            for stream_name, descriptor in self._descriptors.items()
+            if set(descriptor["data_keys"]) <= set(self._fields[stream_name])
+        ]
+
+    def read(self, stream_name):
+        """
+        Returns the dictionary that maps field names to memory-mapped arrays for the stream.
+        """
+        directory = os.path.join(self._path, stream_name)
+        return {
+            field: np.load(os.path.join(directory, f"{field}.npy"), mmap_mode="r")
+            for field in self._fields[stream_name]
+        }
+
+    def documents(self, *, fill="no", page_size=1000):
+        """
+        Generate the documents of the run from the cached data: 'start', 'descriptor',
+        'event_page' (``page_size`` events per page) and 'stop' documents. The events contain
+        only the cached fields. The timestamps of individual events are not cached, so the time
+        of all events is set to the time of the 'stop' document. The ``fill`` parameter is accepted
+        for compatibility with ``BlueskyRun.documents()``: the cached data is always filled.
+        """
+        start, stop = self._metadata["start"], self._metadata["stop"]
+        yield "start", start
+        for stream_name, descriptor in self._descriptors.items():
+            # The events contain only the cached fields
+            data_keys = {k: v for k, v in descriptor["data_keys"].items() if k in self._fields[stream_name]}
+            yield "descriptor", dict(descriptor, data_keys=data_keys)
+        for stream_name, descriptor in self._descriptors.items():
+            for page in compose_event_pages(descriptor, self.read(stream_name), stop["time"], page_size=page_size):
+                yield "event_page", page
+        yield "stop", stop
+
+
+class RunArrayCache:
+    """
+    Directory of memory-mappable arrays of the completed runs keyed by the run uid. Each run
+    is saved in a separate subdirectory: ``metadata.json`` (documents and the list of fields)
+    and ``<stream name>/<field>.npy`` for the data columns.
+
+    Parameters
+    ----------
+    directory: str
+        Path to the directory of the cache. The directory is created if it does not exist.
+    max_bytes: int or None, optional
+        Maximum total size of the cached runs. The least recently used (saved or opened) runs
+        are removed when a run is saved. The size is not limited if ``None``.
+    """
+
+    def __init__(self, directory, *, max_bytes=None):
+        directory = os.path.abspath(os.path.expanduser(directory))
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._max_bytes = max_bytes
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="srx-gui-array-cache")
+
+    @property
+    def directory(self):
+        return self._directory
+
+    def path(self, uid):
+        return os.path.join(self._directory, uid)
+
+    def exists(self, uid):
+        return os.path.isfile(os.path.join(self.path(uid), "metadata.json"))
+
+    def open(self, uid):
+        """
+        Open the cached run.
+
+        Returns
+        -------
+        CachedRun
+
+        Raises
+        ------
+        KeyError
+            The run is not in the cache.
+        """
+        if not self.exists(uid):
+            raise KeyError(f"Run {uid!r} is not in the cache")
+        try:
+            # The modification time of the metadata file is the time of the last use
+            os.utime(os.path.join(self.path(uid), "metadata.json"))
+        except OSError:
+            pass
+        return CachedRun(self.path(uid))
+
+    def save(self, start, stop, descriptors, columns):
+        """
+        Save the data of the completed run.
+
+        Parameters
+        ----------
+        start, stop: dict
+            'start' and 'stop' documents of the run.
+        descriptors: dict
+            Maps stream name -> 'descriptor' document.
+        columns: dict
+            Maps stream name -> {field name: 1D array}. The columns of a stream are truncated
+            to the same length. Streams without descriptors are not saved.
+        """
+        uid = start["uid"]
+        fields, saved_descriptors = {}, {}
+        # The run is written to the temporary directory, so incomplete runs are never opened
+        path = self.path(uid)
+        path_tmp = f"{path}.{threading.get_ident()}.tmp"
+        shutil.rmtree(path_tmp, ignore_errors=True)
+        for stream_name, stream_columns in columns.items():
+            stream_columns = {k: np.asarray(v) for k, v in stream_columns.items() if len(v)}
+            if stream_name not in descriptors or not stream_columns:
+                continue
+            n_events = min(len(_) for _ in stream_columns.values())
+            directory = os.path.join(path_tmp, stream_name)
+            os.makedirs(directory)
+            for field, data in stream_columns.items():
+                np.save(os.path.join(directory, f"{field}.npy"), data[:n_events])
+            fields[stream_name] = list(stream_columns)
+            saved_descriptors[stream_name] = descriptors[stream_name]
+        os.makedirs(path_tmp, exist_ok=True)
+        with open(os.path.join(path_tmp, "metadata.json"), "w") as f:
+            json.dump({"start": start, "stop": stop, "descriptors": saved_descriptors, "fields": fields}, f)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(path_tmp, path)
+        if self._max_bytes is not None:
+            self._remove_least_recently_used(keep=uid)
+
+    def _remove_least_recently_used(self, *, keep=None):
+        # Maps uid -> (time of the last use, size in bytes)
+        runs = {}
+        for entry in os.scandir(self._directory):
+            if not entry.is_dir() or entry.name.endswith(".tmp") or not self.exists(entry.name):
+                continue
+            nbytes = 0
+            for root, _, files in os.walk(entry.path):
+                nbytes += sum(os.path.getsize(os.path.join(root, _)) for _ in files)
+            runs[entry.name] = (os.path.getmtime(os.path.join(entry.path, "metadata.json")), nbytes)
+        total = sum(nbytes for _, nbytes in runs.values())
+        for uid, (_, nbytes) in sorted(runs.items(), key=lambda _: _[1][0]):
+            if total <= self._max_bytes:
+                break
+            if uid != keep:
+                shutil.rmtree(self.path(uid), ignore_errors=True)
+                total -= nbytes
+
+    def save_async(self, start, stop, descriptors, columns):
+        """
+        Save the run in the background thread.
+        """
+        return self._executor.submit(self._save_logged, start, stop, descriptors, columns)
+
+    def _save_logged(self, *args):
+        try:
+            self.save(*args)
+        except Exception as ex:
+            print(f"Failed to save the run {args[0]['uid']!r} to the array cache: {ex}")
+
+    def close(self):
+        # Pending runs are saved before the application exits
+        self._executor.shutdown(wait=True)
+
+
+class LiveArrayCache:
+    """
+    Callback with signature ``(name, doc)`` that saves the data of the live run to
+    ``RunArrayCache`` when the run is completed. The data is taken from the buffers of
+    the live plots of the run (see ``LivePlotSRX`` and ``LiveImageSRX``), so only the plotted
+    fields are saved and the event pages are not needed (they may already be compacted).
+
+    Parameters
+    ----------
+    array_cache: RunArrayCache
+    auto_plot_builder: AutoSRXPlot
+        Plot builder used for live plotting.
+    """
+
+    def __init__(self, array_cache, auto_plot_builder):
+        self._array_cache = array_cache
+        self._auto_plot_builder = auto_plot_builder
+        # Maps run uid -> 'start' document and run uid -> {stream name: descriptor}
+        self._start_docs = {}
+        self._descriptors = {}
+
+    def _collect_columns(self, uid):
+        columns = {}
+        for plot_builder in self._auto_plot_builder.plot_builders:
+            if not any(run.metadata["start"]["uid"] == uid for run in plot_builder._run_manager.runs):
+                continue
+            stream_name = list(plot_builder.needs_streams)[0]
+            stream_columns = columns.setdefault(stream_name, {})
+            if isinstance(plot_builder, LiveImageSRX):
+                stream_columns[plot_builder.field] = plot_builder.data_cache
+            elif isinstance(plot_builder, LivePlotSRX):
+                stream_columns[plot_builder.x] = plot_builder.data_cache_x
+                stream_columns[plot_builder.ys[0]] = plot_builder.data_cache_y
+        return columns
+
+    def __call__(self, name, doc):
+        if name == "start":
+            self._start_docs[doc["uid"]] = doc
+            self._descriptors[doc["uid"]] = {}
+        elif name == "descriptor":
+            descriptors = self._descriptors.get(doc["run_start"], None)
+            if descriptors is not None:
+                descriptors[doc.get("name", "primary")] = doc
+        elif name == "stop":
+            uid = doc["run_start"]
+            start, descriptors = self._start_docs.pop(uid, None), self._descriptors.pop(uid, None)
+            if start is None:
+                return
+            columns = self._collect_columns(uid)
+            if columns:
+                # The buffers are replaced (not modified) by the plots, so they could be saved in the background
+                self._array_cache.save_async(start, doc, descriptors, columns)
@@ -0,0 +1,189 @@
+"""
+Compaction of consumed ``event_page`` documents in the document caches of live runs.
+
+The live plots at SRX bypass the standard document handling and read the pages
+directly from ``run._document_cache`` into their own buffers. Once every reader of
+the run has processed a page, the page payload is no longer needed, but the document
+cache keeps it for the lifetime of the run. The compactor replaces consumed pages
+with lightweight stubs (optionally spilling the original pages to disk), so only
+``start``, ``descriptor`` and ``stop`` documents remain resident. The data of compacted
+pages is no longer available to other consumers of the run (e.g. ``run[stream].read()``),
+so compaction is enabled only on request (``SETTINGS.compact_event_pages``).
+"""
+import os
+import pickle
+import weakref
+
+# Maps DocumentCache -> PageCompactor
+_compactors = weakref.WeakKeyDictionary()
+
+
+def _page_stub(doc):
+    """
+    Returns a copy of the event page without any payload. Only the reference to the descriptor
+    is preserved, so that the stub could still be routed by the readers.
+    """
+    return {
+        "descriptor": doc["descriptor"],
+        "uid": [],
+        "seq_num": [],
+        "time": [],
+        "data": {},
+        "timestamps": {},
+        "filled": {},
+    }
+
+
+class PageCompactor:
+    """
+    Frees the payloads of ``event_page`` documents held in the document cache of a live run
+    once all registered readers have consumed them.
+
+    Readers are objects that process ``run._document_cache._ordered`` incrementally and keep
+    track of the number of processed documents. A reader must call ``register`` before it
+    starts reading and report its progress by calling ``consumed``. The pages are compacted
+    only if there is at least one registered reader and all registered readers consumed them.
+    Readers are referenced weakly, so deleted readers do not block compaction.
+
+    Parameters
+    ----------
+    document_cache: DocumentCache
+        Document cache of a live run.
+    spill_directory: str or None, optional
+        If the directory is specified, then the compacted pages are appended to a file
+        in this directory and could be loaded back using ``page`` method. Otherwise the
+        payloads are discarded.
+    """
+
+    def __init__(self, document_cache, *, spill_directory=None):
+        self._document_cache = document_cache
+        self._spill_directory = spill_directory
+        self._spill_path = None
+        # Maps index of the document in 'document_cache._ordered' -> (offset, size) in the spill file
+        self._spilled = {}
+
+        self._readers = weakref.WeakKeyDictionary()
+        self._n_compacted = 0
+        # Number of compacted pages for each descriptor (pages in 'document_cache.event_pages')
+        self._n_compacted_pages = {}
+
+    @property
+    def n_compacted(self):
+        """The number of documents from the beginning of the cache that were already processed."""
+        return self._n_compacted
+
+    @property
+    def spill_path(self):
+        """Path to the file with spilled pages or None if no pages were spilled."""
+        return self._spill_path
+
+    def register(self, reader):
+        """
+        Register the reader. The reader is expected to read the documents starting from the
+        beginning of the cache, so compaction is not allowed to progress until the reader
+        reports consumed documents.
+        """
+        self._readers[reader] = 0
+
+    def unregister(self, reader):
+        """
+        Unregister the reader. Pages that were consumed by all remaining readers are compacted.
+        """
+        self._readers.pop(reader, None)
+        self._compact()
+
+    def consumed(self, reader, n_documents):
+        """
+        Report that the reader processed the first ``n_documents`` documents of the cache.
+        """
+        if reader in self._readers:
+            self._readers[reader] = n_documents
+            self._compact()
+
+    def page(self, index):
+        """
+        Returns the ``event_page`` document with the given index in the cache. Compacted pages
+        are loaded from the spill file. Returns None if the page was compacted and not spilled.
+        """
+        name, doc = self._document_cache._ordered[index]
+        if name != "event_page":
+            raise ValueError(f"Document #{index} is not an event page: {name!r}")
+        if index >= self._n_compacted:
+            return doc
+        if index not in self._spilled:
+            return None
+        offset, size = self._spilled[index]
+        with open(self._spill_path, "rb") as f:
+            f.seek(offset)
+            return pickle.loads(f.read(size))
+
+    def _spill(self, pages):
+        """
+        Append the list of (index, doc) pairs to the spill file.
+        """
+        if self._spill_path is None:
+            uid = self._document_cache.start_doc["uid"]
+            os.makedirs(self._spill_directory, exist_ok=True)
+            self._spill_path = os.path.join(self._spill_directory, f"{uid}.pages")
+        with open(self._spill_path, "ab") as f:
+            for index, doc in pages:
+                data = pickle.dumps(doc, protocol=pickle.HIGHEST_PROTOCOL)
+                self._spilled[index] = (f.tell(), len(data))
+                f.write(data)
+
+    def _compact(self):
+        if not self._readers:
+            return
+        n_consumed = min(self._readers.values())
+        if n_consumed <= self._n_compacted:
+            return
+
+        dc = self._document_cache
+        with dc.write_lock:
+            ordered = dc._ordered
+            n_consumed = min(n_consumed, len(ordered))
+            pages = []
+            for index in range(self._n_compacted, n_consumed):
+                name, doc = ordered[index]
+                if name != "event_page":
+                    continue
+                pages.append((index, doc))
+
+                stub = _page_stub(doc)
+                ordered[index] = (name, stub)
+
+                # Pages in 'event_pages' are stored in the same order as in '_ordered'
+                descriptor_uid = doc["descriptor"]
+                n_page = self._n_compacted_pages.get(descriptor_uid, 0)
+                descriptor_pages = dc.event_pages[descriptor_uid]
+                if n_page < len(descriptor_pages) and descriptor_pages[n_page] is doc:
+                    descriptor_pages[n_page] = stub
+                self._n_compacted_pages[descriptor_uid] = n_page + 1
+
+            if pages and self._spill_directory:
+                self._spill(pages)
+            self._n_compacted = n_consumed
+
+
+def get_compactor(run, *, spill_directory=None):
+    """
+    Returns the compactor for the document cache of the live run. The compactor is created
+    the first time it is requested, all readers of the run share the same compactor.
+
+    Parameters
+    ----------
+    run: BlueskyRun
+        Live run (must have ``_document_cache`` attribute).
+    spill_directory: str or None, optional
+        Directory for the spilled pages. Used only when the compactor is created.
+
+    Returns
+    -------
+    PageCompactor
+    """
+    document_cache = run._document_cache
+    compactor = _compactors.get(document_cache, None)
+    if compactor is None:
+        compactor = PageCompactor(document_cache, spill_directory=spill_directory)
+        _compactors[document_cache] = compactor
+    return compactor
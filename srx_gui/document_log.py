@@ -0,0 +1,161 @@
+"""
+Recording of the stream of Bluesky documents to a file and replaying the recorded stream.
+
+The log is a sequence of pickled ``(timestamp, name, doc)`` records, where ``timestamp``
+is the time when the document was received. The log is compressed with gzip if the
+file name ends with ``.gz``.
+
+Unpickling may execute arbitrary code, so only the logs from trusted sources should be
+replayed. As a safeguard, the logs are read by the unpickler that loads only the built-in
+types and numpy arrays and scalars (the contents of the documents).
+"""
+import gzip
+import pickle
+import threading
+import time
+
+
+# The classes and functions used to pickle numpy arrays and scalars (numpy 1.x and 2.x)
+_ALLOWED_GLOBALS = {
+    ("numpy", "dtype"),
+    ("numpy", "ndarray"),
+    ("numpy.core.multiarray", "_reconstruct"),
+    ("numpy.core.multiarray", "scalar"),
+    ("numpy.core.numeric", "_frombuffer"),
+    ("numpy._core.multiarray", "_reconstruct"),
+    ("numpy._core.multiarray", "scalar"),
+    ("numpy._core.numeric", "_frombuffer"),
+}
+
+
+class _LogUnpickler(pickle.Unpickler):
+    def find_class(self, module, name):
+        if (module, name) not in _ALLOWED_GLOBALS:
+            raise pickle.UnpicklingError(f"Unsupported type in the document log: {module}.{name}")
+        return super().find_class(module, name)
+
+
+def _open_log(path, mode):
+    if str(path).endswith(".gz"):
+        return gzip.open(path, mode, compresslevel=1)
+    return open(path, mode)
+
+
+def read_document_log(path):
+    """
+    Read the recorded documents.
+
+    Parameters
+    ----------
+    path: str
+        Path to the log file.
+
+    Yields
+    ------
+    (timestamp, name, doc)
+
+    Raises
+    ------
+    pickle.UnpicklingError
+        The log contains objects other than built-in types and numpy arrays.
+    """
+    with _open_log(path, "rb") as f:
+        while True:
+            try:
+                yield _LogUnpickler(f).load()
+            except EOFError:
+                break
+
+
+class DocumentRecorder:
+    """
+    Callback that records the received documents to a log file. The file is opened in 'append'
+    mode, so recording may continue to the existing file.
+
+    Parameters
+    ----------
+    path: str
+        Path to the log file.
+
+    Examples
+    --------
+    >>> recorder = DocumentRecorder("beamtime.log.gz")
+    >>> dispatcher.subscribe(recorder)
+    """
+
+    def __init__(self, path):
+        self._path = path
+        self._file = _open_log(path, "ab")
+        self._lock = threading.Lock()
+
+    @property
+    def path(self):
+        return self._path
+
+    def __call__(self, name, doc):
+        record = (time.time(), name, doc)
+        with self._lock:
+            if self._file is None:
+                return
+            pickle.dump(record, self._file, protocol=pickle.HIGHEST_PROTOCOL)
+            if name == "stop":
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class DocumentReplayer:
+    """
+    Replays the documents from the log file to the subscribed callbacks. The interface is similar
+    to the interface of dispatchers: subscribe the callbacks and call the blocking ``start()``
+    method (typically in a separate thread).
+
+    Parameters
+    ----------
+    path: str
+        Path to the log file.
+    speed: float or None, optional
+        Replay speed relative to the recorded timing: ``1`` - replay in real time, ``N`` - N times
+        faster. If ``speed`` is ``None`` or ``0``, the documents are replayed as fast as possible.
+    """
+
+    def __init__(self, path, *, speed=1.0):
+        self._path = path
+        self._speed = speed or None
+        self._callbacks = []
+        self._stop_requested = threading.Event()
+
+    def subscribe(self, func):
+        """
+        Subscribe the callback. The callback is called as ``func(name, doc)``.
+        """
+        self._callbacks.append(func)
+
+    def stop(self):
+        """
+        Request replaying to stop. The request is processed before the next document is replayed
+        (the delay before the next document is interrupted). Replaying could not be restarted.
+        """
+        self._stop_requested.set()
+
+    def start(self):
+        """
+        Replay the documents. The function returns after all documents are replayed or
+        the ``stop()`` is called.
+        """
+        t_start, ts_start = time.monotonic(), None
+        for timestamp, name, doc in read_document_log(self._path):
+            if self._stop_requested.is_set():
+                break
+            if self._speed:
+                if ts_start is None:
+                    ts_start = timestamp
+                delay = t_start + (timestamp - ts_start) / self._speed - time.monotonic()
+                if delay > 0 and self._stop_requested.wait(delay):
+                    break
+            for func in self._callbacks:
+                func(name, doc)
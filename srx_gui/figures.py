@@ -0,0 +1,84 @@
+"""
+Deferred drawing of figures that are not displayed.
+"""
+
+
+class DeferredDrawingMixin:
+    """
+    Mixin for the views of figures (``QtFigures``, ``HeadlessFigures``) that defers drawing
+    of the figures that could not be seen. The methods ``_update_and_draw`` (legend, limits
+    and redrawing) and ``draw_idle`` (called each time new data is plotted) of the matplotlib
+    axes are replaced. While ``_is_drawing_enabled()`` returns ``False`` for the figure, only
+    the latest update of each axes is saved and the figure is marked for redrawing. The saved
+    updates are applied and the figure is redrawn once by ``_apply_deferred_updates()``.
+
+    The view must call ``_init_deferred_drawing()`` before the figures are added,
+    ``_defer_drawing()`` for each added figure and ``_discard_deferred_updates()`` for each
+    removed figure.
+    """
+
+    def _init_deferred_drawing(self):
+        # Maps figure uuid -> {axes uuid: deferred update function}
+        self._deferred_updates = {}
+        # Maps figure uuid -> function that redraws the figure
+        self._deferred_draws = {}
+
+    def _is_drawing_enabled(self, figure_uuid):
+        """
+        Check if the figure could be drawn immediately (e.g. the figure is visible).
+        """
+        raise NotImplementedError
+
+    def _defer_drawing(self, figure_uuid, axes):
+        """
+        Replace the drawing methods of the axes of the figure.
+
+        Parameters
+        ----------
+        figure_uuid: uuid
+        axes: dict
+            Maps axes uuid -> ``MatplotlibAxes``.
+        """
+        for axes_uuid, mpl_axes in axes.items():
+            mpl_axes._update_and_draw = self._make_deferred_update(
+                figure_uuid, axes_uuid, mpl_axes._update_and_draw
+            )
+            mpl_axes.draw_idle = self._make_deferred_draw(figure_uuid, mpl_axes.draw_idle)
+
+    def _make_deferred_update(self, figure_uuid, axes_uuid, update_and_draw):
+        def deferred_update_and_draw():
+            if self._is_drawing_enabled(figure_uuid):
+                update_and_draw()
+            else:
+                self._deferred_updates.setdefault(figure_uuid, {})[axes_uuid] = update_and_draw
+
+        return deferred_update_and_draw
+
+    def _make_deferred_draw(self, figure_uuid, draw_idle):
+        def deferred_draw_idle():
+            if self._is_drawing_enabled(figure_uuid):
+                draw_idle()
+            else:
+                self._deferred_draws[figure_uuid] = draw_idle
+
+        return deferred_draw_idle
+
+    def _discard_deferred_updates(self, figure_uuid):
+        self._deferred_updates.pop(figure_uuid, None)
+        self._deferred_draws.pop(figure_uuid, None)
+
+    def _has_deferred_updates(self, figure_uuid):
+        return figure_uuid in self._deferred_updates or figure_uuid in self._deferred_draws
+
+    def _apply_deferred_updates(self, figure_uuid, *, draw=True):
+        """
+        Apply the saved updates of the axes of the figure and redraw the figure if it was
+        changed. If ``draw`` is ``False``, the pending redrawing is discarded (e.g. the figure
+        is rendered explicitly by the caller).
+        """
+        for update_and_draw in self._deferred_updates.pop(figure_uuid, {}).values():
+            update_and_draw()
+        # Requests to redraw the visible figure are coalesced by the canvas
+        draw_idle = self._deferred_draws.pop(figure_uuid, None)
+        if draw and draw_idle is not None:
+            draw_idle()
@@ -0,0 +1,211 @@
+"""
+Headless plotting pipeline: documents are ingested by the same plot builders that are used
+by the GUI and the figures are rendered with the Agg backend (no Qt window is created).
+
+The pipeline may be used for benchmarking the complete plotting pipeline (e.g. in CI) or
+for rendering previews of the plots on a server.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+from bluesky_widgets.headless.figures import HeadlessFigures
+from bluesky_widgets.utils.streaming import stream_documents_into_runs
+
+from .figures import DeferredDrawingMixin
+from .metrics import METRICS, figure_label
+from .plots import AutoSRXPlot
+from .settings import SETTINGS
+
+
+class SRXHeadlessFigures(DeferredDrawingMixin, HeadlessFigures):
+    """
+    ``HeadlessFigures`` that does not render the figures on each update. The Agg canvas
+    redraws the figure each time the data is changed, which is wasteful if only the final state
+    of the figures is exported. The updates of the axes (legend, limits) and drawing are deferred
+    (see ``DeferredDrawingMixin``) and the figure is drawn once when it is rendered or exported.
+    The rendering time is recorded (metric ``redraw_time``).
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._init_deferred_drawing()
+        super().__init__(*args, **kwargs)
+
+    def _is_drawing_enabled(self, figure_uuid):
+        # Drawing is done explicitly when the figure is rendered
+        return False
+
+    def _add_figure(self, figure_spec):
+        super()._add_figure(figure_spec)
+        self._defer_drawing(figure_spec.uuid, self._figures[figure_spec.uuid].axes)
+
+    def _on_figure_removed(self, event):
+        self._discard_deferred_updates(event.item.uuid)
+        super()._on_figure_removed(event)
+
+    def render(self, figure_uuid):
+        """
+        Apply the pending updates and render the figure.
+
+        Returns
+        -------
+        numpy.ndarray
+            RGBA image of the figure, shape (height, width, 4)
+        """
+        figure = self._figures[figure_uuid]
+        self._apply_deferred_updates(figure_uuid, draw=False)
+        t_start = time.perf_counter()
+        figure.figure.canvas.draw()
+        histogram = METRICS.histogram("redraw_time", figure=figure_label(figure.model), view="headless")
+        histogram.observe(time.perf_counter() - t_start)
+        return np.asarray(figure.figure.canvas.buffer_rgba()).copy()
+
+    def export_all(self, directory, format="png", **kwargs):
+        for figure_uuid in list(self._figures):
+            self._apply_deferred_updates(figure_uuid, draw=False)
+        return super().export_all(directory, format=format, **kwargs)
+
+
+class HeadlessViewer:
+    """
+    Headless counterpart of ``ViewerModel``. Documents passed to the viewer (the viewer is
+    a callback with signature ``(name, doc)``) are processed by ``AutoSRXPlot`` and the figures
+    could be exported to files or rendered to arrays.
+
+    Parameters
+    ----------
+    export_directory: str or None, optional
+        If the directory is specified, all figures are exported to the directory each time
+        a run is completed ('stop' document is received).
+    format: str, optional
+        Format of the exported files, e.g. ``"png"`` or ``"svg"``.
+
+    Examples
+    --------
+    >>> viewer = HeadlessViewer()
+    >>> replayer = DocumentReplayer("scan.log.gz", speed=0)
+    >>> replayer.subscribe(viewer)
+    >>> replayer.start()
+    >>> viewer.export("previews/")
+    >>> images = viewer.render()
+    """
+
+    def __init__(self, *, export_directory=None, format="png"):
+        self.live_auto_plot_builder = AutoSRXPlot()
+        self.figures = SRXHeadlessFigures(self.live_auto_plot_builder.figures)
+        self._export_directory = export_directory
+        self._format = format
+        self._document_handler = stream_documents_into_runs(self.live_auto_plot_builder.add_run)
+
+    def __call__(self, name, doc):
+        t_start = time.perf_counter()
+        self._document_handler(name, doc)
+        METRICS.histogram("document_handling_time").observe(time.perf_counter() - t_start)
+        METRICS.counter("documents_received").inc()
+        if name == "stop" and self._export_directory:
+            self.export(self._export_directory)
+
+    def put_many(self, documents):
+        """
+        Process the batch of (name, doc) pairs.
+        """
+        for name, doc in documents:
+            self(name, doc)
+
+    def export(self, directory, format=None):
+        """
+        Export all figures to the directory. The files are named by the titles of the figures.
+
+        Returns
+        -------
+        list(str)
+            List of file names.
+        """
+        os.makedirs(directory, exist_ok=True)
+        return self.figures.export_all(directory, format=format or self._format)
+
+    def render(self):
+        """
+        Render all figures to arrays.
+
+        Returns
+        -------
+        dict
+            Maps figure title to RGBA image (numpy array). Duplicate titles are suffixed
+            with "-1", "-2", ... in the order of the figures, the same way as the names of
+            the exported files.
+        """
+        titles_tallied = {}
+        images = {}
+        for figure_spec in self.live_auto_plot_builder.figures:
+            title = figure_spec.title
+            if title in titles_tallied:
+                key = f"{title}-{titles_tallied[title]}"
+                titles_tallied[title] += 1
+            else:
+                key = title
+                titles_tallied[title] = 1
+            images[key] = self.figures.render(figure_spec.uuid)
+        return images
+
+    def close(self):
+        self.figures.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="SRX GUI (headless): render live plots of SRX scans to image files without GUI"
+    )
+    parser.add_argument("--replay", default=None, help="Replay the documents recorded to a file.")
+    parser.add_argument(
+        "--replay-speed",
+        type=float,
+        default=0,
+        help="Replay speed relative to the recorded timing. Default: 0 - as fast as possible.",
+    )
+    parser.add_argument("--zmq", default=None, help="0MQ address")
+    parser.add_argument("--output", default=".", help="Directory for the exported figures. Default: '.'")
+    parser.add_argument("--format", default="png", help="Format of the exported figures. Default: 'png'")
+    parser.add_argument("--metrics-file", default=None, help="Save the metrics to a JSON file on exit.")
+    parser.add_argument(
+        "--compact-event-pages",
+        action="store_true",
+        help="Release the event pages of live runs from memory once they are processed by the plots.",
+    )
+    args = parser.parse_args(argv)
+
+    if bool(args.replay) == bool(args.zmq):
+        parser.error("Exactly one of '--replay' or '--zmq' must be specified")
+
+    SETTINGS.compact_event_pages = args.compact_event_pages
+    output = os.path.abspath(os.path.expanduser(args.output))
+    viewer = HeadlessViewer(export_directory=output, format=args.format)
+
+    if args.replay:
+        from .document_log import DocumentReplayer
+
+        source = DocumentReplayer(os.path.abspath(os.path.expanduser(args.replay)), speed=args.replay_speed)
+        source.subscribe(viewer)
+    else:
+        from .zmq_receiver import ZmqDocumentReceiver
+
+        source = ZmqDocumentReceiver(args.zmq)
+        source.subscribe_batch(viewer.put_many)
+
+    print(f"Exporting figures to {output!r} ...")
+    t_start = time.perf_counter()
+    try:
+        source.start()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"Exported figures: {viewer.export(output)}")
+        print(f"Elapsed time: {time.perf_counter() - t_start:.3f} s")
+        if args.metrics_file:
+            METRICS.save(os.path.abspath(os.path.expanduser(args.metrics_file)))
+        viewer.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+"""
+Consuming Bluesky documents from Kafka with control over the consumed offsets.
+"""
+import json
+import os
+import threading
+import time
+
+from .metrics import METRICS
+
+
+class StartOffsetIndex:
+    """
+    Small local index of the offsets of the most recent 'start' documents for each
+    topic and partition. The index is used to find the run that was still open when
+    the GUI was closed, so that the consumer could seek back to its 'start' document.
+    The 'stop' document of the run is missed if the GUI was not running when the run was
+    completed, so the runs started more than ``max_age`` seconds ago are not considered open
+    (otherwise the completed run and all following documents would be consumed again).
+
+    The index is saved as a JSON file::
+
+        {"<topic>": {"<partition>": {"offset": 1234, "uid": "<start uid>", "time": 1700000000.0, "open": true}}}
+
+    Parameters
+    ----------
+    path: str
+        Path to the index file. The file is created if it does not exist.
+    max_age: float or None, optional
+        Maximum time in seconds since the 'start' document of the open run. There is no limit
+        if ``None``.
+    """
+
+    def __init__(self, path, *, max_age=None):
+        self._path = path
+        self._max_age = max_age
+        self._lock = threading.Lock()
+        self._index = {}
+        if os.path.isfile(path):
+            try:
+                with open(path) as f:
+                    self._index = json.load(f)
+            except Exception as ex:
+                print(f"Failed to load the index of Kafka offsets from {path!r}: {ex}")
+
+    @property
+    def path(self):
+        return self._path
+
+    def open_run_offset(self, topic, partition):
+        """
+        Returns the offset of the 'start' document of the run that is still open in
+        the partition of the topic or ``None`` if there is no open run.
+        """
+        with self._lock:
+            entry = self._index.get(topic, {}).get(str(partition), None)
+        if not entry or not entry["open"]:
+            return None
+        # The entries saved without the time of the 'start' document are too old to be trusted
+        age = time.time() - entry.get("time", 0)
+        if self._max_age is not None and age > self._max_age:
+            print(
+                f"Kafka: the run {entry['uid']!r} in topic {topic!r} (partition {partition}) "
+                f"was started {age / 3600:.1f} hours ago and is not considered open"
+            )
+            return None
+        return entry["offset"]
+
+    def update(self, topic, partition, offset, name, doc):
+        """
+        Update the index with the consumed document. Only 'start' and 'stop' documents
+        change the index.
+        """
+        if name not in ("start", "stop"):
+            return
+        with self._lock:
+            partitions = self._index.setdefault(topic, {})
+            if name == "start":
+                partitions[str(partition)] = {
+                    "offset": offset,
+                    "uid": doc["uid"],
+                    "time": doc.get("time", time.time()),
+                    "open": True,
+                }
+            else:
+                entry = partitions.get(str(partition), None)
+                if not entry or entry["uid"] != doc.get("run_start", None) or not entry["open"]:
+                    return
+                entry["open"] = False
+            self._save()
+
+    def _save(self):
+        directory = os.path.dirname(self._path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        path_tmp = self._path + ".tmp"
+        with open(path_tmp, "w") as f:
+            json.dump(self._index, f)
+        os.replace(path_tmp, self._path)
+
+
+def _deserialize(value):
+    import msgpack
+    import msgpack_numpy as mpn
+
+    return msgpack.loads(value, object_hook=mpn.decode)
+
+
+class KafkaDocumentConsumer:
+    """
+    Consumes Bluesky documents from Kafka topics and passes them to the subscribed callbacks.
+    Messages are consumed in batches, so a backlog of documents is ingested quickly. The interface
+    is similar to the interface of ``bluesky_kafka.RemoteDispatcher``: subscribe the callbacks and
+    call the blocking ``start()`` method in a separate thread.
+
+    Parameters
+    ----------
+    topics: list(str)
+        List of topics.
+    bootstrap_servers: str
+        Comma-separated list of Kafka servers.
+    group_id: str
+        Consumer group ID. If partitions are assigned directly (``assign_partitions=True``),
+        the consumer does not join the group and the ID is used only to satisfy the client.
+    consumer_config: dict, optional
+        Additional configuration options passed to ``confluent_kafka.Consumer``.
+    offset_index: StartOffsetIndex or None, optional
+        If the index is passed, the consumer seeks back to the 'start' document of the run
+        that is still open (if any) when partitions are assigned, and keeps the index updated.
+    batch_size: int, optional
+        Maximum number of messages consumed at once.
+    polling_duration: float, optional
+        Time in seconds to wait for messages.
+    assign_partitions: boolean, optional
+        Assign all partitions of the topics to the consumer directly instead of subscribing
+        to the topics as a member of the consumer group. There is no group coordination
+        (no rebalancing on startup) and no offsets are committed. Consumption starts from
+        the end of each partition (or from the 'start' document of the open run if
+        ``offset_index`` is passed).
+    """
+
+    def __init__(
+        self,
+        topics,
+        bootstrap_servers,
+        group_id,
+        consumer_config=None,
+        *,
+        offset_index=None,
+        batch_size=1000,
+        polling_duration=0.05,
+        assign_partitions=False,
+    ):
+        self._topics = list(topics)
+        self._offset_index = offset_index
+        self._batch_size = batch_size
+        self._polling_duration = polling_duration
+        self._assign_partitions = assign_partitions
+        self._callbacks = []
+        self._batch_callbacks = []
+        self._stop_requested = False
+
+        self._consumer_config = dict(consumer_config or {})
+        self._consumer_config.update({"bootstrap.servers": bootstrap_servers, "group.id": group_id})
+        if assign_partitions:
+            # Offsets are never committed, since the group is not used
+            self._consumer_config["enable.auto.commit"] = False
+
+    def subscribe(self, func):
+        """
+        Subscribe the callback. The callback is called as ``func(name, doc)`` for each document.
+        """
+        self._callbacks.append(func)
+
+    def subscribe_batch(self, func):
+        """
+        Subscribe the batch callback. The callback is called as ``func(documents)``, where
+        ``documents`` is a list of ``(name, doc)`` pairs.
+        """
+        self._batch_callbacks.append(func)
+
+    def stop(self):
+        """
+        Request the polling loop to stop.
+        """
+        self._stop_requested = True
+
+    def _set_start_offsets(self, partitions):
+        """
+        Set the offsets of the partitions to the 'start' document of the open run (if any)
+        or to the end of the partition.
+        """
+        from confluent_kafka import OFFSET_END
+
+        for partition in partitions:
+            offset = None
+            if self._offset_index is not None:
+                offset = self._offset_index.open_run_offset(partition.topic, partition.partition)
+            if offset is not None:
+                print(
+                    f"Kafka: reattaching to the open run in topic {partition.topic!r} "
+                    f"(partition {partition.partition}, offset {offset})"
+                )
+                partition.offset = offset
+            else:
+                partition.offset = OFFSET_END
+        return partitions
+
+    def _on_assign(self, consumer, partitions):
+        consumer.assign(self._set_start_offsets(partitions))
+
+    def _topic_partitions(self, consumer):
+        """
+        Returns the list of all partitions of the topics (based on the cluster metadata).
+        """
+        from confluent_kafka import TopicPartition
+
+        partitions = []
+        for topic in self._topics:
+            metadata = consumer.list_topics(topic, timeout=10).topics.get(topic, None)
+            if metadata is None or metadata.error is not None:
+                error = metadata.error if metadata is not None else "topic not found"
+                print(f"Kafka: failed to load the partitions of the topic {topic!r}: {error}")
+                continue
+            partitions.extend(TopicPartition(topic, _) for _ in sorted(metadata.partitions))
+        return partitions
+
+    def start(self):
+        """
+        Start the polling loop. The function returns after ``stop()`` is called.
+        """
+        from confluent_kafka import Consumer
+
+        self._stop_requested = False
+        consumer = Consumer(self._consumer_config)
+        if self._assign_partitions:
+            consumer.assign(self._set_start_offsets(self._topic_partitions(consumer)))
+        elif self._offset_index is not None:
+            consumer.subscribe(self._topics, on_assign=self._on_assign)
+        else:
+            consumer.subscribe(self._topics)
+
+        try:
+            t_lag_updated = 0
+            while not self._stop_requested:
+                messages = consumer.consume(num_messages=self._batch_size, timeout=self._polling_duration)
+                documents = []
+                for message in messages:
+                    if message.error():
+                        print(f"Kafka: error while consuming a message: {message.error()}")
+                        continue
+                    result = self._process_message(message)
+                    if result is not None:
+                        documents.append(result)
+                if documents:
+                    for func in self._batch_callbacks:
+                        func(documents)
+                    for name, doc in documents:
+                        for func in self._callbacks:
+                            func(name, doc)
+                if time.monotonic() - t_lag_updated > 1:
+                    self._update_lag(consumer)
+                    t_lag_updated = time.monotonic()
+        finally:
+            consumer.close()
+
+    def _update_lag(self, consumer):
+        """
+        Update the consumer lag (the number of messages in the assigned partitions that
+        are not consumed yet) for each topic.
+        """
+        try:
+            lag = {}
+            for partition in consumer.position(consumer.assignment()):
+                _, high = consumer.get_watermark_offsets(partition, cached=True)
+                if partition.offset >= 0 and high >= 0:
+                    lag[partition.topic] = lag.get(partition.topic, 0) + max(high - partition.offset, 0)
+            for topic, value in lag.items():
+                METRICS.gauge("kafka_consumer_lag", topic=topic).set(value)
+        except Exception as ex:
+            print(f"Kafka: failed to compute consumer lag: {ex}")
+
+    def _process_message(self, message):
+        """
+        Returns (name, doc) or None if the message could not be deserialized.
+        """
+        try:
+            name, doc = _deserialize(message.value())
+        except Exception as ex:
+            print(f"Kafka: failed to deserialize a message from topic {message.topic()!r}: {ex}")
+            return None
+
+        if self._offset_index is not None:
+            self._offset_index.update(message.topic(), message.partition(), message.offset(), name, doc)
+
+        return name, doc
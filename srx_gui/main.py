@@ -1,10 +1,9 @@
 import argparse
 import os
 
-from bluesky_widgets.qt import gui_qt
 from pathlib import Path
 
-from .viewer import Viewer
+from .profiling import STARTUP_PROFILER
 from .settings import SETTINGS
 
 
@@ -113,31 +112,178 @@ def main(argv=None):
     parser.add_argument(
         "--kafka-topics", help="Kafka servers, comma-separated string, e.g. bmm.bluesky.runengine.documents"
     )
+    parser.add_argument(
+        "--kafka-reattach",
+        action="store_true",
+        help="Seek back to the start of the run that is still open (e.g. after restarting the GUI "
+        "in the middle of a scan) and ingest the documents up to the present.",
+    )
+    parser.add_argument(
+        "--kafka-no-group",
+        action="store_true",
+        help="Assign the partitions of the topics directly instead of joining a new consumer group. "
+        "No offsets are committed and there are no rebalancing delays on startup.",
+    )
+    parser.add_argument(
+        "--kafka-offset-index",
+        default=None,
+        help="Path to the local index of Kafka offsets of 'start' documents used with '--kafka-reattach'.",
+    )
     parser.add_argument("--catalog", help="Databroker catalog")
+    parser.add_argument(
+        "--run-index",
+        nargs="?",
+        const=os.path.join(SETTINGS.cache_directory, "runs.sqlite"),
+        default=None,
+        help="Keep a local SQLite index of runs for fast filtering of the search results. The index is "
+        "updated from the live documents and from the catalog. Optionally specify the path to the index file.",
+    )
+    parser.add_argument(
+        "--thumbnails",
+        nargs="?",
+        const=os.path.join(SETTINGS.cache_directory, "thumbnails"),
+        default=None,
+        help="Display thumbnails of the completed XRF_FLY maps in the search results and the plan history. "
+        "The thumbnails are cached on disk. Optionally specify the directory of the cache.",
+    )
+    parser.add_argument(
+        "--array-cache",
+        nargs="?",
+        const=os.path.join(SETTINGS.cache_directory, "arrays"),
+        default=None,
+        help="Save the plotted data of the completed live runs to a local cache of memory-mappable arrays. "
+        "Cached runs are opened from the cache instead of the catalog. Optionally specify the directory.",
+    )
+    parser.add_argument(
+        "--record",
+        default=None,
+        help="Record the received documents to a file. The file is compressed if the name ends with '.gz'.",
+    )
+    parser.add_argument(
+        "--replay",
+        default=None,
+        help="Replay the documents recorded to a file (see '--record'). The file is unpickled, "
+        "so replay only the files from trusted sources.",
+    )
+    parser.add_argument(
+        "--replay-speed",
+        type=float,
+        default=1.0,
+        help="Replay speed relative to the recorded timing, e.g. 1 - real time, 10 - ten times faster, "
+        "0 - as fast as possible. Default: 1.",
+    )
+    parser.add_argument(
+        "--no-catch-up",
+        action="store_true",
+        help="Deliver each received document to live plots separately, even if the GUI is lagging. "
+        "By default the accumulated documents are coalesced and applied to the plots in one pass.",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        default=None,
+        help="Periodically save ingestion and rendering metrics (document rates, queue depth, "
+        "consumer lag, handling and redraw times) to a JSON file.",
+    )
+    parser.add_argument(
+        "--compact-event-pages",
+        action="store_true",
+        help="Release the event pages of live runs from memory once they are processed by live plots. "
+        "The data of the released pages is not available to custom plots and 'read()' of live runs.",
+    )
+    parser.add_argument(
+        "--spill-dir",
+        default=None,
+        help="Directory for saving the event pages released from memory (see '--compact-event-pages'). "
+        "The pages are discarded if the directory is not specified.",
+    )
+    parser.add_argument(
+        "--qserver-stand-in",
+        action="store_true",
+        help="Connect to the local stand-in for the queue server started in the same process "
+        "(for load testing of the queue, history and status widgets without RE Manager).",
+    )
+    parser.add_argument(
+        "--stand-in-queue-size", type=int, default=1000, help="The number of items in the queue of the stand-in."
+    )
+    parser.add_argument(
+        "--stand-in-history-size",
+        type=int,
+        default=1000,
+        help="The number of items in the history of the stand-in.",
+    )
+    parser.add_argument(
+        "--stand-in-latency", type=float, default=0.0, help="Response latency of the stand-in in seconds."
+    )
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="Print the time spent importing and constructing the components of the GUI during startup.",
+    )
     args = parser.parse_args(argv)
 
-    with gui_qt("SRX GUI"):
-        if args.catalog:
-            import databroker
+    if args.profile_startup:
+        STARTUP_PROFILER.enable()
 
-            SETTINGS.catalog = databroker.catalog[args.catalog]
+    # Qt, the models and the widgets are imported only after the arguments are parsed
+    with STARTUP_PROFILER.section("import Qt (bluesky_widgets.qt)"):
+        from bluesky_widgets.qt import gui_qt
+    with STARTUP_PROFILER.section("import srx_gui.viewer"):
+        from .viewer import Viewer
+
+    with gui_qt("SRX GUI") as app:
+        if args.catalog:
+            with STARTUP_PROFILER.section("open catalog (databroker)"):
+                import databroker
+
+                SETTINGS.catalog = databroker.catalog[args.catalog]
+
+        if args.run_index:
+            SETTINGS.run_index_path = os.path.abspath(os.path.expanduser(args.run_index))
+        if args.thumbnails:
+            SETTINGS.thumbnail_directory = os.path.abspath(os.path.expanduser(args.thumbnails))
+        if args.array_cache:
+            SETTINGS.array_cache_directory = os.path.abspath(os.path.expanduser(args.array_cache))
+        SETTINGS.catch_up = not args.no_catch_up
+        if args.metrics_file:
+            SETTINGS.metrics_path = os.path.abspath(os.path.expanduser(args.metrics_file))
+        SETTINGS.compact_event_pages = args.compact_event_pages
+        if args.spill_dir:
+            SETTINGS.spill_directory = os.path.abspath(os.path.expanduser(args.spill_dir))
 
         # Optional: Receive live streaming data.
         if args.zmq:
             SETTINGS.subscribe_to.append({"protocol": "zmq", "zmq_addr": args.zmq})
 
-        # Use default path if it is not specififed
-        kafka_config_path = args.kafka_config_path or None
-        if kafka_config_path:
-            kafka_config_path = os.path.expanduser(kafka_config_path)
-            kafka_config_path = os.path.abspath(kafka_config_path)
-        kafka_servers, kafka_config = read_kafka_configuration(kafka_config_path)
-        kafka_servers = kafka_servers or args.kafka_servers
-        kafka_topics = args.kafka_topics
-        kafka_topics = args.kafka_topics.split(",")
+        # Optional: Record the received documents or replay recorded documents
+        if args.record:
+            record_path = os.path.abspath(os.path.expanduser(args.record))
+            SETTINGS.subscribe_to.append({"protocol": "file", "mode": "record", "path": record_path})
+        if args.replay:
+            replay_path = os.path.abspath(os.path.expanduser(args.replay))
+            SETTINGS.subscribe_to.append(
+                {"protocol": "file", "mode": "replay", "path": replay_path, "speed": args.replay_speed}
+            )
+
+        kafka_topics = args.kafka_topics or ""
+        kafka_topics = kafka_topics.split(",")
         kafka_topics = [_.strip() for _ in kafka_topics]
         kafka_topics = [_ for _ in kafka_topics if _]  # Removes empty strings
 
+        # The Kafka configuration is loaded only if the topics are specified
+        kafka_servers, kafka_config = None, {}
+        if kafka_topics:
+            # Use default path if it is not specififed
+            kafka_config_path = args.kafka_config_path or None
+            if kafka_config_path:
+                kafka_config_path = os.path.expanduser(kafka_config_path)
+                kafka_config_path = os.path.abspath(kafka_config_path)
+            with STARTUP_PROFILER.section("load Kafka configuration"):
+                kafka_servers, kafka_config = read_kafka_configuration(kafka_config_path)
+        kafka_servers = kafka_servers or args.kafka_servers
+
+        if args.kafka_offset_index:
+            SETTINGS.kafka_offset_index_path = os.path.abspath(os.path.expanduser(args.kafka_offset_index))
+
         print(f"kafka_servers: {kafka_servers}")
         print(f"kafka_topics: {kafka_topics}")
 
@@ -147,10 +293,36 @@ def main(argv=None):
                 "servers": kafka_servers,
                 "topics": kafka_topics,
                 "config": kafka_config,
+                "reattach": args.kafka_reattach,
+                "assign_partitions": args.kafka_no_group,
             }
             SETTINGS.subscribe_to.append(source)
 
-        viewer = Viewer()  # noqa: 401
+        if args.qserver_stand_in:
+            from .qserver_stand_in import QueueServerStandIn
+
+            qserver_stand_in = QueueServerStandIn(
+                queue_size=args.stand_in_queue_size,
+                history_size=args.stand_in_history_size,
+                latency=args.stand_in_latency,
+            )
+            qserver_stand_in.start()
+            os.environ["QSERVER_ZMQ_CONTROL_ADDRESS"] = qserver_stand_in.zmq_control_addr
+            print(f"Queue server stand-in: {qserver_stand_in.zmq_control_addr}")
+
+        with STARTUP_PROFILER.section("create Viewer"):
+            viewer = Viewer()  # noqa: 401
+        # Recorders, background loaders and caches are closed before the application exits
+        app.aboutToQuit.connect(viewer.close)
+
+        if STARTUP_PROFILER.enabled:
+            from qtpy.QtCore import QTimer
+
+            def report():
+                STARTUP_PROFILER.mark("event loop started (total)", total=True)
+                print(STARTUP_PROFILER.format_report())
+
+            QTimer.singleShot(0, report)
 
 
 if __name__ == "__main__":
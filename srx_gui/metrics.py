@@ -0,0 +1,244 @@
+"""
+Counters, gauges and histograms for monitoring ingestion of documents and rendering of plots.
+
+The metrics are collected in the global registry ``METRICS``. The registry could be
+dumped as a dictionary (or JSON file) suitable for processing by external tools.
+"""
+import bisect
+import collections
+import json
+import math
+import os
+import threading
+import time
+
+
+class Counter:
+    """
+    Monotonically increasing counter. The rate of increase is computed over a sliding window.
+
+    Parameters
+    ----------
+    window: float, optional
+        Duration of the sliding window (in seconds) used to compute the rate.
+    """
+
+    kind = "counter"
+
+    def __init__(self, *, window=5.0):
+        self._value = 0
+        self._window = window
+        # Samples of (time, value) used to compute the rate
+        self._samples = collections.deque()
+        self._lock = threading.Lock()
+
+    @property
+    def value(self):
+        return self._value
+
+    def inc(self, n=1):
+        with self._lock:
+            self._value += n
+            t = time.monotonic()
+            # Limit the number of samples (at most 10 samples per second)
+            if not self._samples or (t - self._samples[-1][0] > 0.1):
+                self._samples.append((t, self._value))
+            else:
+                self._samples[-1] = (self._samples[-1][0], self._value)
+            self._prune(t)
+
+    def _prune(self, t):
+        while len(self._samples) > 1 and (t - self._samples[1][0] > self._window):
+            self._samples.popleft()
+
+    def rate(self):
+        """
+        Rate of increase (per second) over the sliding window.
+        """
+        with self._lock:
+            t = time.monotonic()
+            self._prune(t)
+            if not self._samples:
+                return 0.0
+            t0, v0 = self._samples[0]
+            if self._value == v0:
+                return 0.0
+            return (self._value - v0) / max(t - t0, 1e-3)
+
+    def dump(self):
+        return {"value": self._value, "rate": self.rate()}
+
+
+class Gauge:
+    """
+    Value that may go up and down (e.g. queue depth).
+    """
+
+    kind = "gauge"
+
+    def __init__(self):
+        self._value = 0
+        self._max = 0
+
+    @property
+    def value(self):
+        return self._value
+
+    def set(self, value):
+        self._value = value
+        self._max = max(self._max, value)
+
+    def dump(self):
+        return {"value": self._value, "max": self._max}
+
+
+class Histogram:
+    """
+    Histogram of durations (or other positive values) with logarithmically spaced buckets.
+
+    Parameters
+    ----------
+    min_value, max_value: float, optional
+        The range of values covered by the buckets. Values outside the range are placed in
+        the lowest/highest bucket.
+    n_buckets: int, optional
+        The number of buckets.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, *, min_value=1e-6, max_value=100.0, n_buckets=40):
+        log_min, log_max = math.log10(min_value), math.log10(max_value)
+        step = (log_max - log_min) / (n_buckets - 1)
+        self._bounds = [10 ** (log_min + n * step) for n in range(n_buckets)]
+        self._counts = [0] * (n_buckets + 1)
+        self._count = 0
+        self._sum = 0.0
+        self._min = None
+        self._max = None
+        self._last = None
+        self._lock = threading.Lock()
+
+    @property
+    def count(self):
+        return self._count
+
+    @property
+    def last(self):
+        return self._last
+
+    def observe(self, value):
+        with self._lock:
+            self._counts[bisect.bisect_left(self._bounds, value)] += 1
+            self._count += 1
+            self._sum += value
+            self._min = value if self._min is None else min(self._min, value)
+            self._max = value if self._max is None else max(self._max, value)
+            self._last = value
+
+    def mean(self):
+        return self._sum / self._count if self._count else None
+
+    def quantile(self, q):
+        """
+        Approximate quantile (upper bound of the bucket containing the quantile).
+        """
+        with self._lock:
+            if not self._count:
+                return None
+            threshold, total = q * self._count, 0
+            for n, count in enumerate(self._counts):
+                total += count
+                if total >= threshold:
+                    return self._bounds[n] if n < len(self._bounds) else self._max
+            return self._max
+
+    def dump(self):
+        return {
+            "count": self._count,
+            "sum": self._sum,
+            "min": self._min,
+            "max": self._max,
+            "mean": self.mean(),
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "buckets": [[bound, count] for bound, count in zip(self._bounds + [math.inf], self._counts) if count],
+        }
+
+
+def figure_label(figure_spec):
+    """
+    Returns the label that identifies the figure in the metrics: the title of the figure
+    followed by the prefix of its uuid (figures of the same scan may have the same title).
+    """
+    return f"{figure_spec.title} [{str(figure_spec.uuid)[:8]}]"
+
+
+class Metrics:
+    """
+    Registry of metrics. Metrics are identified by name and (optional) labels and
+    are created the first time they are requested.
+
+    Examples
+    --------
+    >>> METRICS.counter("documents").inc()
+    >>> METRICS.histogram("redraw_time", figure=figure_label(figure_spec), view="qt").observe(0.035)
+    >>> METRICS.dump()
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, labels):
+        key = (name, tuple(sorted(labels.items())))
+        metric = self._metrics.get(key, None)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.setdefault(key, cls())
+        if not isinstance(metric, cls):
+            raise TypeError(f"Metric {name!r} {labels} is a {metric.kind}, not a {cls.kind}")
+        return metric
+
+    def counter(self, name, **labels):
+        return self._get(Counter, name, labels)
+
+    def gauge(self, name, **labels):
+        return self._get(Gauge, name, labels)
+
+    def histogram(self, name, **labels):
+        return self._get(Histogram, name, labels)
+
+    def find(self, name):
+        """
+        Returns the list of (labels, metric) for all metrics with the given name.
+        """
+        return [(dict(labels), metric) for (_name, labels), metric in list(self._metrics.items()) if _name == name]
+
+    def clear(self):
+        with self._lock:
+            self._metrics.clear()
+
+    def dump(self):
+        """
+        Returns the machine-readable representation of all metrics.
+        """
+        metrics = []
+        for (name, labels), metric in sorted(self._metrics.items(), key=lambda _: (_[0][0], _[0][1])):
+            item = {"name": name, "type": metric.kind, "labels": dict(labels)}
+            item.update(metric.dump())
+            metrics.append(item)
+        return {"time": time.time(), "metrics": metrics}
+
+    def save(self, path):
+        """
+        Save the dump of the metrics to a JSON file.
+        """
+        path_tmp = path + ".tmp"
+        with open(path_tmp, "w") as f:
+            json.dump(self.dump(), f, indent=1)
+        os.replace(path_tmp, path)
+
+
+METRICS = Metrics()
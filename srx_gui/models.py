@@ -1,6 +1,12 @@
 """
 Extending and supplementing the models from bluesky-widgets
 """
+import copy
+import json
+import os
+import threading
+
+from bluesky_widgets.models.run_engine_client import RunEngineClient
 from bluesky_widgets.models.search import Search
 from bluesky_widgets.utils.event import Event
 
@@ -15,6 +21,146 @@ class SearchWithButton(Search):
         self.events.add(view=Event)
 
 
+class SRXRunEngineClient(RunEngineClient):
+    """
+    ``RunEngineClient`` that keeps the lists of allowed plans and devices in the file on disk.
+    The lists are loaded from the file when the client is created, so the plan editor could be
+    used immediately, and downloaded from the server only when the uids of the lists reported
+    by the server (``plans_allowed_uid`` and ``devices_allowed_uid`` in RE Manager status) are
+    different from the uids of the cached lists. The lists are cached separately for each server
+    address and user group.
+
+    The event ``status_changed_by_request`` is emitted when the status is changed in the GUI
+    thread (e.g. reloaded after a request sent by the user), as opposed to the changes loaded
+    by periodic polling in the background thread. The event carries the same parameters as
+    ``status_changed``.
+
+    Parameters
+    ----------
+    allowed_items_cache_path: str or None, optional
+        Path to the cache file. The lists are not cached if the path is ``None``.
+    *args, **kwargs
+        Passed to ``RunEngineClient``.
+    """
+
+    def __init__(self, *args, allowed_items_cache_path=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.events.add(status_changed_by_request=Event)
+        # Connected to the model, so the event is not blocked when the widgets are hidden (see 'QtLazyTab')
+        self.events.status_changed.connect(self._on_status_changed)
+        self._allowed_items_cache_path = allowed_items_cache_path
+        server = kwargs.get("http_server_uri", None) or kwargs.get("zmq_control_addr", None) or "default"
+        self._allowed_items_cache_key = f"{server} {self._user_group}"
+        self._load_allowed_items_cache()
+
+    def _on_status_changed(self, event):
+        if threading.current_thread() is threading.main_thread():
+            self.events.status_changed_by_request(status=event.status, is_connected=event.is_connected)
+
+    def _read_allowed_items_cache(self):
+        try:
+            with open(self._allowed_items_cache_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as ex:
+            print(f"Failed to read the cache of allowed plans and devices: {ex}")
+            return {}
+
+    def _load_allowed_items_cache(self):
+        if not self._allowed_items_cache_path:
+            return
+        entry = self._read_allowed_items_cache().get(self._allowed_items_cache_key, None)
+        if not entry:
+            return
+        self._allowed_plans.update(entry["plans_allowed"])
+        self._allowed_plans_uid = entry["plans_allowed_uid"]
+        self._allowed_devices.update(entry["devices_allowed"])
+        self._allowed_devices_uid = entry["devices_allowed_uid"]
+        self.events.allowed_plans_changed(allowed_plans=self._allowed_plans)
+        self.events.allowed_devices_changed(allowed_devices=self._allowed_devices)
+
+    def _save_allowed_items_cache(self):
+        if not self._allowed_items_cache_path:
+            return
+        try:
+            cache = self._read_allowed_items_cache()
+            cache[self._allowed_items_cache_key] = {
+                "plans_allowed": self._allowed_plans,
+                "plans_allowed_uid": self._allowed_plans_uid,
+                "devices_allowed": self._allowed_devices,
+                "devices_allowed_uid": self._allowed_devices_uid,
+            }
+            directory = os.path.dirname(self._allowed_items_cache_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # The file is replaced when it is complete, so the cache is never partially written
+            path_tmp = f"{self._allowed_items_cache_path}.tmp"
+            with open(path_tmp, "w") as f:
+                json.dump(cache, f)
+            os.replace(path_tmp, self._allowed_items_cache_path)
+        except Exception as ex:
+            print(f"Failed to save the cache of allowed plans and devices: {ex}")
+
+    def load_allowed_plans(self):
+        uid = self._allowed_plans_uid
+        super().load_allowed_plans()
+        if self._allowed_plans_uid != uid:
+            self._save_allowed_items_cache()
+
+    def load_allowed_devices(self):
+        uid = self._allowed_devices_uid
+        super().load_allowed_devices()
+        if self._allowed_devices_uid != uid:
+            self._save_allowed_items_cache()
+
+    def load_re_manager_status(self, *, unbuffered=False, reload=False):
+        """
+        Load the status of RE Manager (see ``RunEngineClient.load_re_manager_status()``).
+        The client keeps the loaded status for ``status_expiration_period`` (0.5 s) and returns
+        the same status if it is requested again. If ``reload`` is ``True`` and the manager
+        is connected, the new status is requested from the manager.
+        """
+        if reload and self._re_manager_connected:
+            try:
+                self._client.status(reload=True)
+            except (self._client.RequestTimeoutError, self._client.RequestError, self._client.ClientError):
+                # The failure is processed when the status is loaded again
+                pass
+        super().load_re_manager_status(unbuffered=unbuffered)
+
+    def get_allowed_plans(self):
+        """
+        Returns the copy of the list of allowed plans (as downloaded from RE Manager or loaded
+        from the cache). The list is empty if it was not loaded.
+        """
+        return copy.deepcopy(self._allowed_plans)
+
+    def get_allowed_devices(self):
+        """
+        Returns the copy of the list of allowed devices (see ``get_allowed_plans()``).
+        """
+        return copy.deepcopy(self._allowed_devices)
+
+    def manager_connecting_ops(self):
+        # The uids of the queue, the history and the lists of allowed plans and devices are
+        #   compared with the uids reported by the server, the data is downloaded if they differ.
+        #   The queue and the history are displayed using the plan signatures, so the lists
+        #   that are not cached or changed on the server are loaded first.
+        try:
+            status = self._client.status(reload=True)
+        except (self._client.RequestTimeoutError, self._client.RequestError, self._client.ClientError):
+            status = None
+        if status is not None:
+            if status.get("devices_allowed_uid", "") != self._allowed_devices_uid:
+                self.load_allowed_devices()
+            if status.get("plans_allowed_uid", "") != self._allowed_plans_uid:
+                self.load_allowed_plans()
+        # The status is not requested again while the copy kept by the client is not expired,
+        #   the queue and the history are loaded if their uids changed
+        self.load_re_manager_status(unbuffered=True)
+
+
 class RunAndView:
     def __init__(self, run_engine, live_auto_plot_builder):
         self.run_engine = run_engine
@@ -22,21 +168,67 @@ class RunAndView:
 
 
 class SearchAndView:
-    def __init__(self, databroker_auto_plot_builder):
-        # def __init__(self, search, databroker_auto_plot_builder):
-        # self.search = search
+    """
+    Model of the 'Data Broker' tab. The runs selected in the search results are loaded in
+    the background by ``run_loader`` (see ``RunLoader``) if it is passed, otherwise the runs are
+    added to the plot builder directly. When a run is selected, the run and its neighbours
+    (previous and next scan) are prefetched by ``run_loader`` (the runs are opened from
+    the catalog in the background) and prefetching of the previously selected runs is stopped.
+    The thumbnails of the maps are displayed in the search results if ``thumbnails``
+    (``ThumbnailCache``) is passed.
+    The plotted data of the runs saved in ``array_cache`` (``RunArrayCache``) is displayed
+    from the cache, the fields that are not cached are read from the catalog.
+    """
+
+    def __init__(
+        self, databroker_auto_plot_builder, search=None, run_loader=None, thumbnails=None, array_cache=None
+    ):
+        self.search = search
+        self.run_loader = run_loader
+        self.thumbnails = thumbnails
+        self.array_cache = array_cache
         self.databroker_auto_plot_builder = databroker_auto_plot_builder
-        # self.search.events.view.connect(self._on_view)
+        if self.search is not None:
+            self.search.events.view.connect(self._on_view)
+            if self.run_loader is not None:
+                self.search.events.active_run.connect(self._on_active_run)
 
         self._figures_to_lines = {}
         self.databroker_auto_plot_builder.figures.events.added.connect(self._on_figure_added)
 
-    # def _on_view(self, event):
-    # catalog = self.search.selection_as_catalog
-    # if catalog is None:
-    #     return
-    # for uid, run in catalog.items():
-    #     self.databroker_auto_plot_builder.add_run(run)
+    def _load_run(self, uid):
+        cached_run = None
+        if self.array_cache is not None and self.array_cache.exists(uid):
+            cached_run = self.array_cache.open(uid)
+        try:
+            run = self.search.catalog[uid]
+        except KeyError:
+            if cached_run is None:
+                raise
+            # The run is not in the catalog: only the cached fields are displayed
+            run, cached_run = cached_run, None
+        self.run_loader.load(run, cached_run=cached_run)
+
+    def _on_view(self, event):
+        for uid in event.uids:
+            if self.run_loader is not None:
+                self._load_run(uid)
+            else:
+                self.databroker_auto_plot_builder.add_run(self.search.catalog[uid])
+
+    def _on_active_run(self, event):
+        # The event is emitted by the background thread of the search results
+        if event.run is None:
+            return
+        uids = [event.uid] + self.search.neighbour_uids(event.row)
+        for uid in self.run_loader.prefetching():
+            if uid not in uids:
+                self.run_loader.cancel_prefetch(uid)
+        for uid in uids:
+            if self.array_cache is not None and self.array_cache.exists(uid):
+                # Cached runs are loaded from the disk quickly
+                continue
+            self.run_loader.prefetch(self.search.catalog, uid)
 
     def _on_figure_added(self, event):
         figure = event.item
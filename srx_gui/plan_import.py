@@ -0,0 +1,185 @@
+"""
+Import of batches of plans from CSV or YAML tables.
+
+Each row of the table contains the parameters of one plan (by default ``nano_scan_and_fly``),
+e.g. the CSV file::
+
+    xstart,xstop,xnum,ystart,ystop,ynum,dwell
+    -10,10,101,-5,5,51,0.05
+    -20,20,201,-5,5,51,0.05
+
+or the equivalent YAML file (list of mappings)::
+
+    - {xstart: -10, xstop: 10, xnum: 101, ystart: -5, ystop: 5, ynum: 51, dwell: 0.05}
+    - {xstart: -20, xstop: 20, xnum: 201, ystart: -5, ystop: 5, ynum: 51, dwell: 0.05}
+
+The column ``name`` (optional) overrides the plan name for the row. Empty cells are skipped,
+so the default values of the plan parameters are used. The plans are validated locally
+against the lists of allowed plans and devices downloaded from RE Manager. The signature of
+``nano_scan_and_fly`` accepts any parameters, so the names and types of its parameters are
+also checked against the parameters of ``scan_and_fly_base`` (see ``DEFAULT_PLAN_PARAMETERS``).
+"""
+import ast
+import csv
+import numbers
+import os
+
+DEFAULT_PLAN_NAME = "nano_scan_and_fly"
+
+
+def _is_number(value):
+    return isinstance(value, numbers.Real) and not isinstance(value, bool)
+
+
+def _is_positive_number(value):
+    return _is_number(value) and value > 0
+
+
+def _is_positive_integer(value):
+    return isinstance(value, numbers.Integral) and not isinstance(value, bool) and value > 0
+
+
+def _is_list_of_names(value):
+    return isinstance(value, (list, tuple)) and all(isinstance(_, str) for _ in value)
+
+
+# Parameters of the default plan: maps parameter name -> (required, description of the type, check)
+DEFAULT_PLAN_PARAMETERS = {
+    "xstart": (True, "a number", _is_number),
+    "xstop": (True, "a number", _is_number),
+    "xnum": (True, "a positive integer", _is_positive_integer),
+    "ystart": (True, "a number", _is_number),
+    "ystop": (True, "a number", _is_number),
+    "ynum": (True, "a positive integer", _is_positive_integer),
+    "dwell": (True, "a positive number", _is_positive_number),
+    "extra_dets": (False, "a list of device names", _is_list_of_names),
+    "center": (False, "a boolean", lambda _: isinstance(_, bool)),
+    "snake": (False, "a boolean", lambda _: isinstance(_, bool)),
+    "plot": (False, "a boolean", lambda _: isinstance(_, bool)),
+    "shutter": (False, "a boolean", lambda _: isinstance(_, bool)),
+    "md": (False, "a mapping", lambda _: isinstance(_, dict)),
+}
+
+
+def _parse_value(text):
+    """
+    Convert the text of a CSV cell to a Python value (number, list, boolean etc.).
+    The text that is not a Python literal is treated as a string (e.g. a device name).
+    """
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        return text
+
+
+def read_plan_table(path):
+    """
+    Read the table of plan parameters from a CSV (``.csv``) or YAML (``.yaml``, ``.yml``) file.
+
+    Returns
+    -------
+    list(dict)
+        The list of rows: each row maps parameter name to the value.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        with open(path, newline="") as f:
+            return [
+                {k.strip(): _parse_value(v.strip()) for k, v in row.items() if k and v is not None and v.strip()}
+                for row in csv.DictReader(f)
+            ]
+    elif extension in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError as ex:
+            raise RuntimeError("Import of YAML files requires 'PyYAML' package") from ex
+
+        with open(path) as f:
+            rows = yaml.safe_load(f) or []
+        if not isinstance(rows, list) or not all(isinstance(_, dict) for _ in rows):
+            raise ValueError(f"The YAML file {path!r} must contain a list of mappings of plan parameters")
+        return rows
+    else:
+        raise ValueError(f"Unsupported file type {extension!r}: only CSV and YAML files are supported")
+
+
+def rows_to_items(rows, *, plan_name=DEFAULT_PLAN_NAME):
+    """
+    Convert the rows of the table to queue items. All parameters are passed as keyword arguments.
+    """
+    items = []
+    for row in rows:
+        kwargs = dict(row)
+        name = kwargs.pop("name", None) or plan_name
+        items.append({"item_type": "plan", "name": name, "args": [], "kwargs": kwargs})
+    return items
+
+
+def _check_default_plan_parameters(kwargs, *, allowed_devices):
+    """
+    Check the parameters of the default plan (see ``DEFAULT_PLAN_PARAMETERS``).
+
+    Returns
+    -------
+    str
+        The error message or an empty string if the parameters are valid.
+    """
+    messages = []
+    missing = [k for k, (required, _, _) in DEFAULT_PLAN_PARAMETERS.items() if required and k not in kwargs]
+    if missing:
+        messages.append(f"Missing required parameters: {', '.join(map(repr, missing))}")
+    unknown = [_ for _ in kwargs if _ not in DEFAULT_PLAN_PARAMETERS]
+    if unknown:
+        messages.append(f"Unsupported parameters: {', '.join(map(repr, unknown))}")
+    for k, value in kwargs.items():
+        if k in DEFAULT_PLAN_PARAMETERS:
+            _, description, check = DEFAULT_PLAN_PARAMETERS[k]
+            if not check(value):
+                messages.append(f"Parameter {k!r} must be {description}: {value!r}")
+    extra_dets = kwargs.get("extra_dets", None) or []
+    unknown_devices = [_ for _ in extra_dets if _ not in allowed_devices] if _is_list_of_names(extra_dets) else []
+    if unknown_devices:
+        messages.append(f"Devices are not in the list of allowed devices: {', '.join(map(repr, unknown_devices))}")
+    return "; ".join(messages)
+
+
+def validate_items(items, *, allowed_plans, allowed_devices):
+    """
+    Validate the items against the lists of allowed plans and devices (as downloaded from
+    RE Manager). The names and types of the parameters are checked the same way as
+    by RE Manager when the items are added to the queue. The parameters of the default plan
+    are also checked locally (see ``DEFAULT_PLAN_PARAMETERS``).
+
+    Returns
+    -------
+    list(tuple)
+        The list of ``(row index, error message)`` for the invalid items. The list is empty
+        if all items are valid.
+    """
+    from bluesky_queueserver import validate_plan
+
+    errors = []
+    for n, item in enumerate(items):
+        success, msg = validate_plan(item, allowed_plans=allowed_plans, allowed_devices=allowed_devices)
+        if success and item["name"] == DEFAULT_PLAN_NAME:
+            msg = _check_default_plan_parameters(item.get("kwargs", {}), allowed_devices=allowed_devices)
+            success = not msg
+        if not success:
+            errors.append((n, msg))
+    return errors
+
+
+def load_plan_batch(path, *, allowed_plans, allowed_devices, plan_name=DEFAULT_PLAN_NAME):
+    """
+    Read the table of plan parameters and validate the plans.
+
+    Returns
+    -------
+    items: list(dict)
+        The list of queue items.
+    errors: list(tuple)
+        The list of ``(row index, error message)`` (see ``validate_items()``).
+    """
+    items = rows_to_items(read_plan_table(path), plan_name=plan_name)
+    errors = validate_items(items, allowed_plans=allowed_plans, allowed_devices=allowed_devices)
+    return items, errors
@@ -8,8 +8,74 @@ from bluesky_widgets.models.plot_specs import Axes, Figure, Image
 
 import numpy as np
 
+from .compaction import get_compactor
+from .settings import SETTINGS
 
-class LivePlotSRX(Lines):
+
+def raster_image(data, shape, *, snake=False):
+    """
+    Arrange the data points of a fly scan into the 2D image. Missing points are filled with ``NaN``.
+
+    Parameters
+    ----------
+    data: numpy.ndarray
+        1D array of data points in the order of acquisition.
+    shape: Tuple[Integer]
+        The shape of the scan ``(nx, ny)`` (the value of ``start["scan"]["shape"]``).
+    snake: boolean
+        Indicates that every other row was scanned in the reverse direction.
+
+    Returns
+    -------
+    numpy.ndarray
+        Image with the shape ``(ny, nx)``.
+    """
+    nx, ny = shape
+    n_total = nx * ny
+    data = np.asarray(data, dtype=float)
+    if len(data) > n_total:
+        image_data = data[:n_total].copy()
+    else:
+        image_data = np.pad(data, (0, n_total - len(data)), constant_values=np.nan)
+    image_data = image_data.reshape([ny, nx])
+
+    if snake:
+        ind = np.arange(1, ny, 2)
+        image_data[ind] = np.fliplr(image_data[ind])
+    return image_data
+
+
+class _CompactingReaderMixin:
+    """
+    Mixin for the live plots that read the event pages directly from ``run._document_cache``.
+    If compaction of event pages is enabled (``SETTINGS.compact_event_pages``), the plot is
+    registered as a reader of the document cache of the run and reports the processed documents,
+    so that the consumed pages could be compacted (see ``PageCompactor``).
+    """
+
+    _compactor = None
+
+    def _track_run(self, run):
+        """
+        Register the plot as a reader of the document cache of the run, so that
+        the event pages could be compacted once they are processed.
+        """
+        if self._compactor is not None:
+            self._compactor.unregister(self)
+            self._compactor = None
+        if SETTINGS.compact_event_pages:
+            self._compactor = get_compactor(run, spill_directory=SETTINGS.spill_directory)
+            self._compactor.register(self)
+
+    def _report_consumed(self, run, n_documents):
+        """
+        Report that the first ``n_documents`` documents of the cache of the run were processed.
+        """
+        if SETTINGS.compact_event_pages:
+            get_compactor(run).consumed(self, n_documents)
+
+
+class LivePlotSRX(_CompactingReaderMixin, Lines):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._clear_data_cache()
@@ -27,6 +93,7 @@ class LivePlotSRX(Lines):
         "Add a line."
         super()._add_lines(event)
         self._clear_data_cache()
+        self._track_run(event.run)
 
     def _transform(self, run, x, y):
         # return call_or_eval({"x": x, "y": y}, run, self.needs_streams, self.namespace)
@@ -42,22 +109,26 @@ class LivePlotSRX(Lines):
 
         if n_docs > self.n_processed_documents:
             descriptors = run._document_cache._descriptors
+            # The backlog of pages is concatenated in one pass (not page by page)
+            new_x, new_y = [self.data_cache_x], [self.data_cache_y]
             for name, doc in docs[self.n_processed_documents : n_docs]:
                 if name == "event_page":
                     descriptor = descriptors[doc["descriptor"]]
                     if descriptor["name"] in self.needs_streams:
-                        vals_x = doc["data"].get(x, [])
-                        vals_y = doc["data"].get(y, [])
-                        self.data_cache_x = np.append(self.data_cache_x, vals_x)
-                        self.data_cache_y = np.append(self.data_cache_y, vals_y)
+                        new_x.append(np.asarray(doc["data"].get(x, []), dtype=float))
+                        new_y.append(np.asarray(doc["data"].get(y, []), dtype=float))
+            if len(new_x) > 1:
+                self.data_cache_x = np.concatenate(new_x)
+                self.data_cache_y = np.concatenate(new_y)
             self.n_processed_documents = n_docs
+            self._report_consumed(run, n_docs)
         # END OF HACK
 
         data_x = self.data_cache_x * xstep + xstart  # Computed coordinates
         return {"x": data_x, "y": self.data_cache_y}
 
 
-class LiveImageSRX(RasteredImages):
+class LiveImageSRX(_CompactingReaderMixin, RasteredImages):
     """
     ``RasteredImages`` customized for displaying live plots at SRX beamline.
     The SRX metadata is very specifically structured, so all meaningful methods
@@ -229,6 +300,7 @@ class LiveImageSRX(RasteredImages):
                 self.axes.y_limits = (ny - 0.5, 0.5)
 
         self._clear_data_cache()
+        self._track_run(run)
 
         # TODO Try to make the axes aspect equal unless the extent is highly non-square.
         ...
@@ -245,31 +317,23 @@ class LiveImageSRX(RasteredImages):
         n_docs = len(docs)
         if n_docs > self.n_processed_documents:
             descriptors = run._document_cache._descriptors
+            # The backlog of pages is concatenated in one pass (not page by page)
+            new_data = [self.data_cache]
             for name, doc in docs[self.n_processed_documents : n_docs]:
                 if name == "event_page":
                     descriptor = descriptors[doc["descriptor"]]
                     if descriptor["name"] in self.needs_streams:
-                        vals = doc["data"].get(field, [])
-                        self.data_cache = np.append(self.data_cache, vals)
+                        new_data.append(np.asarray(doc["data"].get(field, []), dtype=float))
+            if len(new_data) > 1:
+                self.data_cache = np.concatenate(new_data)
             self.n_processed_documents = n_docs
+            self._report_consumed(run, n_docs)
         # END OF HACK
 
         data = self.data_cache
 
         md = run.metadata["start"]
-        snake = md["scan"]["snake"]
-        nx, ny = md["scan"]["shape"]
-
-        n_total = nx * ny
-        if len(data) > n_total:
-            image_data = data[:n_total]
-        else:
-            image_data = np.pad(data, (0, n_total - len(data)), constant_values=np.nan)
-        image_data = image_data.reshape([ny, nx])
-
-        if snake:
-            ind = np.arange(1, ny, 2)
-            image_data[ind] = np.fliplr(image_data[ind])
+        image_data = raster_image(data, md["scan"]["shape"], snake=md["scan"]["snake"])
 
         if data.size:
             vmin, vmax = float(np.min(data)), float(np.max(data))
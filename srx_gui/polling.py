@@ -0,0 +1,90 @@
+"""
+Adaptive period of polling of the status of RE Manager.
+"""
+import time
+
+
+class AdaptivePolling:
+    """
+    Selects the period of polling of RE Manager status based on the recent changes of the status.
+    The status is polled frequently for ``fast_duration`` seconds after each change of the state
+    of the manager, the queue or the history (e.g. when a plan is started or completed), with
+    the normal period while the manager is busy and slowly when the manager was idle for
+    ``idle_after`` seconds or is not accessible. The client of RE Manager keeps the loaded status
+    for 0.5 s, so the status must be reloaded when it is polled faster (see ``is_fast()``).
+    The queue and the history are downloaded by ``RunEngineClient.load_re_manager_status()``
+    from bluesky-widgets only when ``plan_queue_uid`` or ``plan_history_uid`` change, so polling
+    of the idle manager is cheap.
+
+    Parameters
+    ----------
+    fast_period, period, idle_period: float
+        The periods (in seconds) of polling around transitions, while the manager is busy
+        and while the manager is idle or not accessible.
+    fast_duration: float
+        The duration of fast polling after the last change of the status.
+    idle_after: float
+        The period of inactivity after which the idle manager is polled slowly.
+
+    Examples
+    --------
+    >>> polling = AdaptivePolling()
+    >>> model.load_re_manager_status()
+    >>> time.sleep(polling.update(model.re_manager_status, model.re_manager_connected))
+    """
+
+    # The keys of the status that indicate transitions of the manager, the queue or the history
+    _transition_keys = (
+        "manager_state",
+        "re_state",
+        "worker_environment_exists",
+        "worker_environment_state",
+        "running_item_uid",
+        "queue_stop_pending",
+        "plan_queue_uid",
+        "plan_history_uid",
+    )
+
+    def __init__(self, *, fast_period=0.25, period=1.0, idle_period=5.0, fast_duration=5.0, idle_after=30.0):
+        self._fast_period = fast_period
+        self._period = period
+        self._idle_period = idle_period
+        self._fast_duration = fast_duration
+        self._idle_after = idle_after
+
+        self._state = None
+        self._last_change_time = time.monotonic()
+        self._fast_until = 0
+
+    def notify(self):
+        """
+        Switch to fast polling (e.g. after the user sent a request to the manager).
+        """
+        now = time.monotonic()
+        self._last_change_time = now
+        self._fast_until = now + self._fast_duration
+
+    def is_fast(self):
+        """
+        Check if the status is polled frequently (around transitions).
+        """
+        return time.monotonic() < self._fast_until
+
+    def update(self, status, is_connected):
+        """
+        Process the status loaded from the manager. Returns the period (in seconds) before
+        the next poll.
+        """
+        state = tuple(status.get(_, None) for _ in self._transition_keys) if is_connected else None
+        if state != self._state:
+            self._state = state
+            self.notify()
+
+        now = time.monotonic()
+        if now < self._fast_until:
+            return self._fast_period
+        if not is_connected:
+            return self._idle_period
+        if status.get("manager_state", None) == "idle" and now - self._last_change_time > self._idle_after:
+            return self._idle_period
+        return self._period
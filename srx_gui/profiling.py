@@ -0,0 +1,106 @@
+"""
+Measuring the time spent importing and constructing the components during startup.
+
+The timings are collected by the global profiler ``STARTUP_PROFILER``, which is disabled
+by default. If the profiler is disabled, the sections are not timed.
+"""
+import contextlib
+import time
+
+
+class StartupProfiler:
+    """
+    Collects the durations of the named sections of the startup sequence. The sections
+    may be nested. The long sequences of steps are timed by calling ``mark()`` after each step,
+    so the code does not need to be indented. The report lists the sections in the order
+    in which they were started.
+
+    Examples
+    --------
+    >>> STARTUP_PROFILER.enable()
+    >>> with STARTUP_PROFILER.section("import viewer"):
+    ...     from .viewer import Viewer
+    >>> with STARTUP_PROFILER.section("create viewer"):
+    ...     model = ViewerModel()
+    ...     STARTUP_PROFILER.mark("create models")
+    ...     widget = QtViewer(model)
+    ...     STARTUP_PROFILER.mark("create widgets")
+    >>> STARTUP_PROFILER.report()
+    """
+
+    def __init__(self):
+        self._enabled = False
+        self._t_start = None
+        # List of [name, depth, duration]. Duration is None while the section is running.
+        self._sections = []
+        self._depth = 0
+        # The time when the last step (section or mark) was started or finished
+        self._t_step = None
+
+    @property
+    def enabled(self):
+        return self._enabled
+
+    def enable(self):
+        """
+        Enable the profiler. The total time is counted from the moment the profiler is enabled.
+        """
+        self._enabled = True
+        self._t_start = time.perf_counter()
+        self._t_step = self._t_start
+
+    @contextlib.contextmanager
+    def section(self, name):
+        """
+        Context manager that measures the time spent in the section.
+        """
+        if not self._enabled:
+            yield
+            return
+
+        entry = [name, self._depth, None]
+        self._sections.append(entry)
+        self._depth += 1
+        t_start = self._t_step = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._t_step = time.perf_counter()
+            entry[2] = self._t_step - t_start
+            self._depth -= 1
+
+    def mark(self, name, *, total=False):
+        """
+        Record the step that was just finished. The duration of the step is the time elapsed
+        since the previous mark or since the start or the end of the last section. If ``total``
+        is ``True``, the time elapsed since the profiler was enabled is recorded instead (e.g.
+        the time when the window was displayed).
+        """
+        if not self._enabled:
+            return
+        t_now = time.perf_counter()
+        if total:
+            self._sections.append([name, 0, t_now - self._t_start])
+        else:
+            self._sections.append([name, self._depth, t_now - self._t_step])
+        self._t_step = t_now
+
+    def report(self):
+        """
+        Returns the report as a list of (name, depth, duration) tuples.
+        """
+        return [tuple(_) for _ in self._sections]
+
+    def format_report(self):
+        """
+        Returns the report as printable text.
+        """
+        lines = ["Startup profile:"]
+        width = max([len(name) + 2 * depth for name, depth, _ in self._sections] + [10])
+        for name, depth, duration in self._sections:
+            duration = "running" if duration is None else f"{duration * 1000:9.1f} ms"
+            lines.append(f"  {'  ' * depth}{name:<{width - 2 * depth}}  {duration:>12}")
+        return "\n".join(lines)
+
+
+STARTUP_PROFILER = StartupProfiler()
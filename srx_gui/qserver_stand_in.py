@@ -0,0 +1,479 @@
+"""
+Local stand-in for the 0MQ control API of the queue server (RE Manager) used for load testing
+of the GUI without the real manager, e.g.
+
+    python -m srx_gui.qserver_stand_in --queue-size 10000 --history-size 10000 --latency 0.01
+
+prints the address of the control socket, which is then passed to the GUI as
+``QSERVER_ZMQ_CONTROL_ADDRESS`` (or start the GUI with ``--qserver-stand-in``, which runs
+the stand-in in the same process). The stand-in keeps the queue and the history in memory
+and supports the requests sent by ``RunEngineClient``: status, loading of the queue,
+the history, the lists of allowed plans and devices and the list of runs, editing of the queue,
+opening and closing of the environment and starting and stopping of the queue. The execution
+of plans is simulated: each plan is 'completed' after ``plan_duration`` seconds.
+"""
+import copy
+import threading
+import time
+import uuid
+
+import zmq
+
+# The default address of the control socket of the standalone stand-in. The port is different
+#   from the default port of RE Manager (60615), so the stand-in is not mistaken for the manager.
+DEFAULT_ZMQ_CONTROL_ADDR = "tcp://127.0.0.1:60715"
+
+# Signature of 'nano_scan_and_fly' in the format of the list of allowed plans
+_ALLOWED_PLANS = {
+    "nano_scan_and_fly": {
+        "name": "nano_scan_and_fly",
+        "description": "Fly scan (stand-in)",
+        "module": "srx_gui.qserver_stand_in",
+        "parameters": [
+            {"name": "args", "kind": {"name": "VAR_POSITIONAL", "value": 2}},
+            {"name": "extra_dets", "kind": {"name": "KEYWORD_ONLY", "value": 3}, "default": "None"},
+            {"name": "center", "kind": {"name": "KEYWORD_ONLY", "value": 3}, "default": "True"},
+            {"name": "kwargs", "kind": {"name": "VAR_KEYWORD", "value": 4}},
+        ],
+        "properties": {"is_generator": True},
+    },
+}
+
+_ALLOWED_DEVICES = {
+    "xs": {"classname": "Xspress3", "is_flyable": False, "is_movable": False, "is_readable": True},
+    "merlin": {"classname": "Merlin", "is_flyable": False, "is_movable": False, "is_readable": True},
+}
+
+
+def _new_uid():
+    return str(uuid.uuid4())
+
+
+def make_item(n, *, user="stand-in", user_group="primary"):
+    """
+    Create the queue item (``nano_scan_and_fly`` plan) with the new item UID.
+    """
+    return {
+        "item_type": "plan",
+        "name": "nano_scan_and_fly",
+        "args": [-10, 10, 101, -5, 5, 51, 0.05],
+        "kwargs": {"extra_dets": [], "center": True},
+        "user": user,
+        "user_group": user_group,
+        "item_uid": _new_uid(),
+        "meta": {"n": n},
+    }
+
+
+class QueueServerStandIn:
+    """
+    In-process stand-in for the 0MQ control API of RE Manager. The requests are processed
+    in a background thread.
+
+    Parameters
+    ----------
+    zmq_control_addr: str or None, optional
+        Address of the control socket. If ``None``, the socket is bound to a random port
+        of the local host (see the ``zmq_control_addr`` property).
+    queue_size, history_size: int, optional
+        The initial numbers of items in the queue and the history.
+    latency: float, optional
+        Delay (in seconds) before each response is sent.
+    plan_duration: float, optional
+        Duration (in seconds) of the simulated execution of each plan.
+
+    Examples
+    --------
+    >>> stand_in = QueueServerStandIn(queue_size=10000, history_size=10000, latency=0.01)
+    >>> stand_in.start()
+    >>> os.environ["QSERVER_ZMQ_CONTROL_ADDRESS"] = stand_in.zmq_control_addr
+    >>> ...
+    >>> stand_in.stop()
+    """
+
+    def __init__(self, zmq_control_addr=None, *, queue_size=0, history_size=0, latency=0.0, plan_duration=1.0):
+        self._zmq_control_addr = zmq_control_addr
+        self._latency = latency
+        self._plan_duration = plan_duration
+
+        self._lock = threading.RLock()
+        self._queue = [make_item(n) for n in range(queue_size)]
+        self._history = [self._completed(make_item(n)) for n in range(history_size)]
+        self._running_item = {}
+        self._running_item_end = None
+        self._queue_stop_pending = False
+        self._environment_exists = False
+        self._run_list = []
+
+        self._plan_queue_uid = _new_uid()
+        self._plan_history_uid = _new_uid()
+        self._run_list_uid = _new_uid()
+        self._plans_allowed_uid = _new_uid()
+        self._devices_allowed_uid = _new_uid()
+        # The status uid is changed only when the status is changed (the same as in RE Manager)
+        self._status_uid = _new_uid()
+        self._last_status = None
+
+        self._n_requests = 0
+        self._thread = None
+        self._stop = threading.Event()
+
+        self._handlers = {
+            "status": self._status,
+            "queue_get": self._queue_get,
+            "history_get": self._history_get,
+            "history_clear": self._history_clear,
+            "plans_allowed": self._plans_allowed,
+            "devices_allowed": self._devices_allowed,
+            "re_runs": self._re_runs,
+            "queue_item_add": self._queue_item_add,
+            "queue_item_add_batch": self._queue_item_add_batch,
+            "queue_item_update": self._queue_item_update,
+            "queue_item_remove": self._queue_item_remove,
+            "queue_item_remove_batch": self._queue_item_remove_batch,
+            "queue_item_move": self._queue_item_move,
+            "queue_item_move_batch": self._queue_item_move_batch,
+            "queue_clear": self._queue_clear,
+            "queue_start": self._queue_start,
+            "queue_stop": self._queue_stop,
+            "queue_stop_cancel": self._queue_stop_cancel,
+            "environment_open": self._environment_open,
+            "environment_close": self._environment_close,
+            "environment_destroy": self._environment_close,
+        }
+
+    @property
+    def zmq_control_addr(self):
+        """
+        Address of the control socket (available after the stand-in is started).
+        """
+        return self._zmq_control_addr
+
+    @property
+    def n_requests(self):
+        """
+        The number of processed requests.
+        """
+        return self._n_requests
+
+    @property
+    def queue(self):
+        with self._lock:
+            return copy.deepcopy(self._queue)
+
+    @property
+    def history(self):
+        with self._lock:
+            return copy.deepcopy(self._history)
+
+    def start(self):
+        """
+        Bind the control socket and start processing requests in the background thread.
+        """
+        ctx = zmq.Context.instance()
+        socket = ctx.socket(zmq.REP)
+        if self._zmq_control_addr is None:
+            port = socket.bind_to_random_port("tcp://127.0.0.1")
+            self._zmq_control_addr = f"tcp://127.0.0.1:{port}"
+        else:
+            socket.bind(self._zmq_control_addr.replace("localhost", "127.0.0.1"))
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._serve, args=(socket,), name="qserver-stand-in", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _serve(self, socket):
+        try:
+            while not self._stop.is_set():
+                self._update_running_plan()
+                if not socket.poll(timeout=50):
+                    continue
+                request = socket.recv_json()
+                response = self.process_request(request.get("method", None), request.get("params", None) or {})
+                if self._latency:
+                    time.sleep(self._latency)
+                socket.send_json(response)
+        finally:
+            socket.close(linger=0)
+
+    def process_request(self, method, params):
+        """
+        Process the request and return the response (the message format of RE Manager).
+        """
+        handler = self._handlers.get(method, None)
+        if handler is None:
+            return {"success": False, "msg": f"Method {method!r} is not supported by the stand-in"}
+        with self._lock:
+            self._n_requests += 1
+            try:
+                response = handler(**params)
+            except Exception as ex:
+                return {"success": False, "msg": str(ex)}
+        response.setdefault("success", True)
+        response.setdefault("msg", "")
+        return response
+
+    # ======================================================================
+    #          Simulated execution of plans
+
+    def _completed(self, item):
+        item = dict(item)
+        item["result"] = {
+            "exit_status": "completed",
+            "run_uids": [_new_uid()],
+            "scan_ids": [],
+            "time_start": time.time() - self._plan_duration,
+            "time_stop": time.time(),
+            "msg": "",
+            "traceback": "",
+        }
+        return item
+
+    def _queue_changed(self):
+        self._plan_queue_uid = _new_uid()
+
+    def _history_changed(self):
+        self._plan_history_uid = _new_uid()
+
+    def _start_next_plan(self):
+        if self._queue and not self._queue_stop_pending:
+            self._running_item = self._queue.pop(0)
+            self._running_item_end = time.monotonic() + self._plan_duration
+        else:
+            self._running_item, self._running_item_end = {}, None
+            self._queue_stop_pending = False
+        self._queue_changed()
+
+    def _update_running_plan(self):
+        with self._lock:
+            if self._running_item_end is not None and time.monotonic() >= self._running_item_end:
+                self._history.append(self._completed(self._running_item))
+                self._history_changed()
+                self._start_next_plan()
+
+    def complete_plan(self):
+        """
+        Move the item at the top of the queue to the history as if the plan was executed
+        (e.g. for benchmarking of the updates of the queue and the history).
+        """
+        with self._lock:
+            if self._queue:
+                self._history.append(self._completed(self._queue.pop(0)))
+                self._queue_changed()
+                self._history_changed()
+
+    # ======================================================================
+    #          Request handlers
+
+    def _status(self):
+        running = bool(self._running_item)
+        status = {
+            "msg": "RE Manager (stand-in)",
+            "items_in_queue": len(self._queue),
+            "items_in_history": len(self._history),
+            "running_item_uid": self._running_item.get("item_uid", None),
+            "manager_state": "executing_queue" if running else "idle",
+            "queue_stop_pending": self._queue_stop_pending,
+            "queue_autostart_enabled": False,
+            "worker_environment_exists": self._environment_exists,
+            "worker_environment_state": "executing_plan" if running else "idle",
+            "worker_background_tasks": 0,
+            "re_state": "running" if running else "idle",
+            "ip_kernel_state": None,
+            "ip_kernel_captured": None,
+            "pause_pending": False,
+            "run_list_uid": self._run_list_uid,
+            "plan_queue_uid": self._plan_queue_uid,
+            "plan_history_uid": self._plan_history_uid,
+            "devices_existing_uid": self._devices_allowed_uid,
+            "plans_existing_uid": self._plans_allowed_uid,
+            "devices_allowed_uid": self._devices_allowed_uid,
+            "plans_allowed_uid": self._plans_allowed_uid,
+            "plan_queue_mode": {"loop": False, "ignore_failures": False},
+            "task_results_uid": None,
+            "lock_info_uid": None,
+            "lock": {"environment": False, "queue": False},
+        }
+        if status != self._last_status:
+            self._last_status = copy.deepcopy(status)
+            self._status_uid = _new_uid()
+        status["status_uid"] = self._status_uid
+        return status
+
+    def _queue_get(self):
+        return {
+            "items": copy.deepcopy(self._queue),
+            "running_item": copy.deepcopy(self._running_item),
+            "plan_queue_uid": self._plan_queue_uid,
+        }
+
+    def _history_get(self):
+        return {"items": copy.deepcopy(self._history), "plan_history_uid": self._plan_history_uid}
+
+    def _history_clear(self, **kwargs):
+        self._history.clear()
+        self._history_changed()
+        return {}
+
+    def _plans_allowed(self, **kwargs):
+        return {"plans_allowed": copy.deepcopy(_ALLOWED_PLANS), "plans_allowed_uid": self._plans_allowed_uid}
+
+    def _devices_allowed(self, **kwargs):
+        return {
+            "devices_allowed": copy.deepcopy(_ALLOWED_DEVICES),
+            "devices_allowed_uid": self._devices_allowed_uid,
+        }
+
+    def _re_runs(self, **kwargs):
+        return {"run_list": copy.deepcopy(self._run_list), "run_list_uid": self._run_list_uid}
+
+    def _find_item(self, uid):
+        for n, item in enumerate(self._queue):
+            if item["item_uid"] == uid:
+                return n
+        raise IndexError(f"Item with UID {uid!r} is not in the queue")
+
+    def _insert_position(self, *, pos=None, before_uid=None, after_uid=None):
+        if before_uid is not None:
+            return self._find_item(before_uid)
+        if after_uid is not None:
+            return self._find_item(after_uid) + 1
+        if pos == "front":
+            return 0
+        if pos in (None, "back"):
+            return len(self._queue)
+        return pos if pos >= 0 else len(self._queue) + pos + 1
+
+    def _new_item(self, item, user, user_group):
+        item = {k: v for k, v in item.items() if k not in ("item_uid", "result")}
+        item.update({"user": user, "user_group": user_group, "item_uid": _new_uid()})
+        return item
+
+    def _queue_item_add(self, *, item, user, user_group, pos=None, before_uid=None, after_uid=None, **kwargs):
+        n = self._insert_position(pos=pos, before_uid=before_uid, after_uid=after_uid)
+        item = self._new_item(item, user, user_group)
+        self._queue.insert(n, item)
+        self._queue_changed()
+        return {"item": copy.deepcopy(item), "qsize": len(self._queue)}
+
+    def _queue_item_add_batch(
+        self, *, items, user, user_group, pos=None, before_uid=None, after_uid=None, **kwargs
+    ):
+        n = self._insert_position(pos=pos, before_uid=before_uid, after_uid=after_uid)
+        items = [self._new_item(_, user, user_group) for _ in items]
+        self._queue[n:n] = items
+        self._queue_changed()
+        results = [{"success": True, "msg": ""} for _ in items]
+        return {"items": copy.deepcopy(items), "results": results, "qsize": len(self._queue)}
+
+    def _queue_item_update(self, *, item, user, user_group, replace=None, **kwargs):
+        n = self._find_item(item["item_uid"])
+        item = copy.deepcopy(item)
+        item.update({"user": user, "user_group": user_group})
+        if replace:
+            item["item_uid"] = _new_uid()
+        self._queue[n] = item
+        self._queue_changed()
+        return {"item": copy.deepcopy(item), "qsize": len(self._queue)}
+
+    def _queue_item_remove(self, *, pos=None, uid=None, **kwargs):
+        if uid is not None:
+            n = self._find_item(uid)
+        else:
+            n = {"front": 0, "back": -1, None: -1}.get(pos, pos)
+        item = self._queue.pop(n)
+        self._queue_changed()
+        return {"item": item, "qsize": len(self._queue)}
+
+    def _queue_item_remove_batch(self, *, uids, **kwargs):
+        uids = set(uids)
+        items = [_ for _ in self._queue if _["item_uid"] in uids]
+        self._queue = [_ for _ in self._queue if _["item_uid"] not in uids]
+        self._queue_changed()
+        return {"items": items, "qsize": len(self._queue)}
+
+    def _queue_item_move(self, *, pos=None, uid=None, pos_dest=None, before_uid=None, after_uid=None, **kwargs):
+        n = self._find_item(uid) if uid is not None else pos
+        item = self._queue.pop(n)
+        self._queue.insert(self._insert_position(pos=pos_dest, before_uid=before_uid, after_uid=after_uid), item)
+        self._queue_changed()
+        return {"item": copy.deepcopy(item), "qsize": len(self._queue)}
+
+    def _queue_item_move_batch(self, *, uids, pos_dest=None, before_uid=None, after_uid=None, **kwargs):
+        items = [self._queue[self._find_item(_)] for _ in uids]
+        uids = set(uids)
+        self._queue = [_ for _ in self._queue if _["item_uid"] not in uids]
+        n = self._insert_position(pos=pos_dest, before_uid=before_uid, after_uid=after_uid)
+        self._queue[n:n] = items
+        self._queue_changed()
+        return {"items": copy.deepcopy(items), "qsize": len(self._queue)}
+
+    def _queue_clear(self, **kwargs):
+        self._queue.clear()
+        self._queue_changed()
+        return {}
+
+    def _queue_start(self, **kwargs):
+        if not self._environment_exists:
+            raise RuntimeError("RE Worker environment does not exist")
+        if not self._running_item:
+            self._start_next_plan()
+        return {}
+
+    def _queue_stop(self, **kwargs):
+        self._queue_stop_pending = bool(self._running_item)
+        return {}
+
+    def _queue_stop_cancel(self, **kwargs):
+        self._queue_stop_pending = False
+        return {}
+
+    def _environment_open(self, **kwargs):
+        self._environment_exists = True
+        return {}
+
+    def _environment_close(self, **kwargs):
+        if self._running_item:
+            raise RuntimeError("The queue is running")
+        self._environment_exists = False
+        return {}
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local stand-in for the 0MQ control API of the queue server")
+    parser.add_argument(
+        "--zmq-control-addr", default=DEFAULT_ZMQ_CONTROL_ADDR, help="Address of the control socket."
+    )
+    parser.add_argument("--queue-size", type=int, default=1000, help="The number of items in the queue.")
+    parser.add_argument("--history-size", type=int, default=1000, help="The number of items in the history.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Response latency in seconds.")
+    parser.add_argument("--plan-duration", type=float, default=5.0, help="Duration of simulated plans in seconds.")
+    args = parser.parse_args(argv)
+
+    stand_in = QueueServerStandIn(
+        args.zmq_control_addr,
+        queue_size=args.queue_size,
+        history_size=args.history_size,
+        latency=args.latency,
+        plan_duration=args.plan_duration,
+    )
+    stand_in.start()
+    print(f"Queue server stand-in: QSERVER_ZMQ_CONTROL_ADDRESS={stand_in.zmq_control_addr}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stand_in.stop()
+
+
+if __name__ == "__main__":
+    main()
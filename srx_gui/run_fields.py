@@ -0,0 +1,84 @@
+"""
+Discovery of the names of the data fields of runs without loading the data.
+"""
+import collections
+import threading
+
+# Maps run uid -> {stream name: list of field names}. Completed runs do not change, so the
+# field names are cached for the most recently used runs.
+_cache = collections.OrderedDict()
+_cache_lock = threading.Lock()
+_cache_size = 100
+
+
+def _stream_descriptors(stream):
+    """
+    Returns the list of the descriptors of the stream (databroker or bluesky-live event stream).
+    """
+    metadata = getattr(stream, "metadata", None)
+    if metadata is not None and metadata.get("descriptors", None) is not None:
+        return list(metadata["descriptors"])
+    # Live runs (bluesky-live) keep the descriptors in the document cache
+    descriptors = getattr(stream, "_descriptors", None)
+    if descriptors is not None:
+        return list(descriptors)
+    return None
+
+
+def get_stream_field_names(run):
+    """
+    Returns the dictionary that maps stream name to the list of the names of the data fields
+    of the stream. The names are taken from ``data_keys`` of the descriptors, the data is not loaded.
+    The result is cached for completed runs.
+
+    Parameters
+    ----------
+    run: BlueskyRun
+        Run (databroker or bluesky-live).
+
+    Returns
+    -------
+    dict
+    """
+    metadata = run.metadata
+    uid = metadata["start"]["uid"]
+    completed = metadata.get("stop", None) is not None
+
+    with _cache_lock:
+        fields = _cache.get(uid, None)
+        if fields is not None:
+            _cache.move_to_end(uid)
+            return fields
+
+    fields = {}
+    for stream_name in run:
+        stream = run[stream_name]
+        descriptors = _stream_descriptors(stream)
+        if descriptors is None:
+            # The descriptors are not available: fall back to loading the data lazily
+            names = list(stream.to_dask().keys())
+        else:
+            names = []
+            for descriptor in descriptors:
+                names.extend(_ for _ in descriptor["data_keys"] if _ not in names)
+        fields[stream_name] = names
+
+    # The new streams may still be added to the runs that are in progress
+    if completed:
+        with _cache_lock:
+            _cache[uid] = fields
+            while len(_cache) > _cache_size:
+                _cache.popitem(last=False)
+
+    return fields
+
+
+def get_field_names(run):
+    """
+    Returns the list of the names of the data fields in all streams of the run
+    (without duplicates).
+    """
+    names = []
+    for stream_names in get_stream_field_names(run).values():
+        names.extend(_ for _ in stream_names if _ not in names)
+    return names
@@ -0,0 +1,266 @@
+"""
+Local SQLite index of the metadata of runs displayed in the table of search results.
+
+The index is updated from the live stream of documents ('start' and 'stop' documents) and
+by backfilling from the catalog. Queries to the index take milliseconds even for large
+catalogs, so the search results could be filtered without querying the catalog.
+"""
+import json
+import os
+import sqlite3
+import threading
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    uid TEXT PRIMARY KEY,
+    scan_id INTEGER,
+    plan_name TEXT,
+    motors TEXT,
+    start_time REAL,
+    stop_time REAL,
+    exit_status TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_start_time ON runs (start_time);
+CREATE INDEX IF NOT EXISTS runs_scan_id ON runs (scan_id);
+CREATE INDEX IF NOT EXISTS runs_plan_name ON runs (plan_name);
+CREATE TABLE IF NOT EXISTS info (key TEXT PRIMARY KEY, value);
+"""
+
+
+class RunIndex:
+    """
+    SQLite index of the fields displayed in the table of search results (scan ID, plan name,
+    motors, start time, duration and uid). The index object is a callback with signature
+    ``(name, doc)``, so it could be subscribed directly to a source of documents.
+
+    Parameters
+    ----------
+    path: str
+        Path to the database file. The file is created if it does not exist.
+        Use ``":memory:"`` for an index that is not saved.
+
+    Examples
+    --------
+    >>> index = RunIndex(os.path.join(SETTINGS.cache_directory, "runs.sqlite"))
+    >>> document_queue.subscribe(index)
+    >>> index.backfill(catalog)
+    >>> uids = index.search(plan_name="nano_scan_and_fly", since=time.time() - 86400)
+    """
+
+    def __init__(self, path):
+        if path != ":memory:":
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        self._path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._connection.executescript(_SCHEMA)
+            self._connection.commit()
+
+    @property
+    def path(self):
+        return self._path
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    @staticmethod
+    def _start_values(start):
+        motors = start.get("motors", None)
+        return (
+            start["uid"],
+            start.get("scan_id", None),
+            start.get("plan_name", None),
+            None if motors is None else json.dumps(list(motors)),
+            start["time"],
+        )
+
+    def __call__(self, name, doc):
+        if name == "start":
+            self.add_runs([(doc, None)])
+        elif name == "stop":
+            with self._lock:
+                self._connection.execute(
+                    "UPDATE runs SET stop_time = ?, exit_status = ? WHERE uid = ?",
+                    (doc["time"], doc.get("exit_status", None), doc["run_start"]),
+                )
+                self._connection.commit()
+
+    def add_runs(self, runs):
+        """
+        Add or replace the runs in the index.
+
+        Parameters
+        ----------
+        runs: iterable(tuple)
+            Sequence of (start, stop) pairs of documents. The 'stop' document is ``None`` for
+            the runs that are not completed.
+        """
+        values = []
+        for start, stop in runs:
+            stop_values = (None, None) if stop is None else (stop["time"], stop.get("exit_status", None))
+            values.append(self._start_values(start) + stop_values)
+        with self._lock:
+            self._connection.executemany("INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, ?)", values)
+            self._connection.commit()
+
+    def backfilled_until(self):
+        """
+        Start time of the most recent run added from the catalog or ``None`` if the runs were
+        never added from the catalog.
+        """
+        with self._lock:
+            row = self._connection.execute("SELECT value FROM info WHERE key = 'backfilled_until'").fetchone()
+            return None if row is None else row[0]
+
+    def _set_backfilled_until(self, value):
+        with self._lock:
+            self._connection.execute("INSERT OR REPLACE INTO info VALUES ('backfilled_until', ?)", (value,))
+            self._connection.commit()
+
+    def open_runs(self):
+        """
+        Returns the list of uids of the indexed runs that are not completed (no 'stop' document).
+        """
+        with self._lock:
+            return [_[0] for _ in self._connection.execute("SELECT uid FROM runs WHERE stop_time IS NULL")]
+
+    def backfill(self, catalog, *, since=None, batch_size=1000):
+        """
+        Add the runs from the catalog to the index. Only the runs started after ``since``
+        are added, by default the runs started after the most recent run added from the catalog
+        during the previous backfill (all runs if the index is new). The runs that were not
+        completed when they were indexed (e.g. the runs that were open during the previous
+        backfill or whose 'stop' document was missed by the live stream) are updated if they
+        are completed in the catalog.
+
+        Returns
+        -------
+        int
+            The number of runs added to the index or updated.
+        """
+        # The runs added below are checked only if they are still open
+        n_runs = self._update_open_runs(catalog, self.open_runs(), batch_size=batch_size)
+
+        if since is None:
+            since = self.backfilled_until()
+        if since is not None:
+            catalog = catalog.search({"time": {"$gte": since}})
+
+        batch, latest_start_time = [], since
+        for _, run in catalog.items():
+            metadata = run.metadata
+            batch.append((metadata["start"], metadata["stop"]))
+            latest_start_time = max(latest_start_time or 0, metadata["start"]["time"])
+            if len(batch) >= batch_size:
+                self.add_runs(batch)
+                n_runs, batch = n_runs + len(batch), []
+        if batch:
+            self.add_runs(batch)
+            n_runs += len(batch)
+        if latest_start_time is not None:
+            self._set_backfilled_until(latest_start_time)
+        return n_runs
+
+    def _update_open_runs(self, catalog, uids, *, batch_size):
+        n_runs = 0
+        for n in range(0, len(uids), batch_size):
+            chunk = uids[n : n + batch_size]
+            completed = []
+            for _, run in catalog.search({"uid": {"$in": chunk}}).items():
+                metadata = run.metadata
+                if metadata["stop"] is not None:
+                    completed.append((metadata["start"], metadata["stop"]))
+            self.add_runs(completed)
+            n_runs += len(completed)
+        return n_runs
+
+    @staticmethod
+    def _where(*, scan_id=None, plan_name=None, since=None, until=None, text=None):
+        conditions, parameters = [], []
+        if scan_id is not None:
+            conditions.append("scan_id = ?")
+            parameters.append(scan_id)
+        if plan_name is not None:
+            conditions.append("plan_name = ?")
+            parameters.append(plan_name)
+        if since is not None:
+            conditions.append("start_time >= ?")
+            parameters.append(since)
+        if until is not None:
+            conditions.append("start_time < ?")
+            parameters.append(until)
+        if text:
+            pattern = f"%{text}%"
+            conditions.append("(plan_name LIKE ? OR motors LIKE ? OR uid LIKE ? OR CAST(scan_id AS TEXT) = ?)")
+            parameters.extend([pattern, pattern, f"{text}%", text])
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return where, parameters
+
+    def search(self, *, limit=None, offset=0, **criteria):
+        """
+        Returns the list of uids of the runs that match the criteria, ordered by start time
+        (the most recent runs first, in the same order as the catalog).
+
+        Parameters
+        ----------
+        scan_id: int, optional
+        plan_name: str, optional
+        since, until: float, optional
+            The range of start times (seconds since the epoch).
+        text: str, optional
+            Text matched against the plan name, motors, uid (prefix) and scan ID.
+        limit, offset: int, optional
+            Return the subset of the results.
+        """
+        where, parameters = self._where(**criteria)
+        query = f"SELECT uid FROM runs {where} ORDER BY start_time DESC"
+        if limit is not None:
+            query += " LIMIT ? OFFSET ?"
+            parameters += [limit, offset]
+        with self._lock:
+            return [_[0] for _ in self._connection.execute(query, parameters)]
+
+    def count(self, **criteria):
+        """
+        Returns the number of runs that match the criteria (see ``search()``).
+        """
+        where, parameters = self._where(**criteria)
+        with self._lock:
+            return self._connection.execute(f"SELECT COUNT(*) FROM runs {where}", parameters).fetchone()[0]
+
+    def metadata(self, uids):
+        """
+        Returns the dictionary uid -> (start, stop) with the indexed subset of the metadata of
+        the runs. The documents contain only the indexed fields. Runs that are not in the index
+        are skipped.
+        """
+        result = {}
+        uids = list(uids)
+        with self._lock:
+            # The number of parameters in a query is limited
+            for n in range(0, len(uids), 500):
+                chunk = uids[n : n + 500]
+                query = f"SELECT * FROM runs WHERE uid IN ({', '.join('?' * len(chunk))})"
+                for (
+                    uid,
+                    scan_id,
+                    plan_name,
+                    motors,
+                    start_time,
+                    stop_time,
+                    exit_status,
+                ) in self._connection.execute(query, chunk):
+                    start = {"uid": uid, "time": start_time}
+                    if scan_id is not None:
+                        start["scan_id"] = scan_id
+                    if plan_name is not None:
+                        start["plan_name"] = plan_name
+                    if motors is not None:
+                        start["motors"] = json.loads(motors)
+                    stop = None if stop_time is None else {"time": stop_time, "exit_status": exit_status}
+                    result[uid] = (start, stop)
+        return result
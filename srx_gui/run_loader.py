@@ -0,0 +1,318 @@
+"""
+Loading of historical runs in background threads.
+"""
+import collections
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .streaming import compose_event_pages
+
+
+def _is_monitored_stream(stream_name):
+    # The plots of SRX scans display the data of the monitored streams (see 'AutoSRXPlot')
+    return stream_name.endswith("_monitor")
+
+
+class _Prefetch:
+    """
+    Run prefetched by ``RunLoader``: the future of the data of the monitored streams, the size
+    of the data in bytes (0 until the data is read) and the event that stops prefetching.
+    """
+
+    def __init__(self):
+        self.future = None
+        self.nbytes = 0
+        self.cancelled = threading.Event()
+
+    def result(self):
+        """
+        Returns the prefetched data or ``None`` if the run was not prefetched (yet).
+        """
+        future = self.future
+        if future is None or not future.done() or future.cancelled() or future.exception() is not None:
+            return None
+        return future.result()
+
+
+class RunLoader:
+    """
+    Loads the documents of historical runs (e.g. opened from the catalog) in a pool of worker
+    threads and puts them in the document queue in chunks. The queue delivers the documents
+    to the plot builders in the GUI thread, so the figures are drawn progressively as the chunks
+    arrive and the GUI is not blocked while the run is loaded. The documents of each run are placed
+    in a separate lane of the queue, so multiple runs are loaded and displayed in parallel.
+
+    Parameters
+    ----------
+    document_queue: DocumentQueue
+        The queue of documents processed in the GUI thread.
+    max_workers: int, optional
+        The number of worker threads.
+    chunk_size: int, optional
+        The number of documents put in the queue at once.
+    max_queued: int, optional
+        Reading of the documents is paused while the queue contains more than ``max_queued``
+        documents, so the memory is not filled with documents that can not be displayed yet.
+    fill: str, optional
+        Passed to ``run.documents()``. By default the external data (e.g. detector images)
+        is not loaded.
+    cache_bytes: int, optional
+        Maximum total size (in bytes) of the data of the runs prefetched in memory
+        (see ``prefetch()``). Prefetching is disabled if the size is 0.
+
+    Examples
+    --------
+    >>> queue = DocumentQueue()
+    >>> queue.subscribe(stream_documents_into_runs(databroker_auto_plot_builder.add_run))
+    >>> loader = RunLoader(queue)
+    >>> loader.load(catalog[uid])
+    >>> loader.progress()
+    """
+
+    def __init__(
+        self, document_queue, *, max_workers=2, chunk_size=200, max_queued=5000, fill="no", cache_bytes=256 * 2**20
+    ):
+        self._document_queue = document_queue
+        self._chunk_size = chunk_size
+        self._max_queued = max_queued
+        self._fill = fill
+        self._cache_bytes = cache_bytes
+        # Maps run uid -> _Prefetch, in the order of use
+        self._prefetched = collections.OrderedDict()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="srx-gui-run-loader")
+        # Prefetching does not occupy the workers that load the runs requested by the user
+        self._prefetch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="srx-gui-run-prefetch")
+        self._lock = threading.Lock()
+        # Notified when the last run is loaded or prefetching of a run is cancelled
+        self._idle = threading.Condition(self._lock)
+        # Maps uid of the run that is being loaded -> {"loaded": <events>, "total": <events or None>}
+        self._progress = {}
+        self._cancelled = set()
+
+    def load(self, run, *, cached_run=None):
+        """
+        Start loading the run in the background. The function returns immediately.
+
+        If ``cached_run`` (``CachedRun``) is passed, the cached streams that contain all
+        fields are displayed first and the rest of the run is read from ``run``.
+
+        Returns
+        -------
+        concurrent.futures.Future
+        """
+        metadata = run.metadata
+        uid = metadata["start"]["uid"]
+        stop = metadata.get("stop", None)
+        total = None
+        if stop is not None and stop.get("num_events", None):
+            total = sum(stop["num_events"].values())
+        with self._lock:
+            self._cancelled.discard(uid)
+            self._progress[uid] = {"loaded": 0, "total": total}
+        return self._executor.submit(self._load, uid, run, cached_run)
+
+    def prefetch(self, catalog, uid):
+        """
+        Read the data of the monitored streams (the data displayed by the plots) of the completed
+        run in the background and keep it in memory, so that the plots are displayed without
+        waiting for the catalog when the run is loaded. The run is opened from the catalog in
+        the background thread. Prefetching has lower priority than loading: the runs are read
+        by a separate worker thread while no runs are loaded. The most recently used runs are
+        kept while their total size does not exceed ``cache_bytes``.
+
+        Returns
+        -------
+        concurrent.futures.Future or None
+            ``None`` if prefetching is disabled. The result of the future is ``None`` if
+            the run is not completed (the runs in progress are not prefetched).
+        """
+        if not self._cache_bytes:
+            return None
+        with self._lock:
+            prefetch = self._prefetched.get(uid, None)
+            if prefetch is None:
+                prefetch = self._prefetched[uid] = _Prefetch()
+                prefetch.future = self._prefetch_executor.submit(self._prefetch, prefetch, catalog, uid)
+            self._prefetched.move_to_end(uid)
+        return prefetch.future
+
+    def _prefetch(self, prefetch, catalog, uid):
+        try:
+            # Wait until the runs requested by the user are loaded
+            with self._idle:
+                self._idle.wait_for(lambda: not self._progress or prefetch.cancelled.is_set())
+            if prefetch.cancelled.is_set():
+                return None
+            run = catalog[uid]
+            if run.metadata.get("stop", None) is None:
+                return None
+            # Maps stream name -> (descriptor, {field: array}, times of the events)
+            streams = {}
+            for stream_name in run:
+                if not _is_monitored_stream(stream_name):
+                    continue
+                stream = run[stream_name]
+                descriptors = stream.metadata["descriptors"]
+                if len(descriptors) != 1:
+                    # The events recorded with different descriptors are loaded from the catalog
+                    continue
+                dataset = stream.read()
+                if prefetch.cancelled.is_set():
+                    return None
+                columns = {field: dataset[field].values for field in dataset.data_vars}
+                streams[stream_name] = (descriptors[0], columns, dataset["time"].values)
+            with self._lock:
+                prefetch.nbytes = sum(
+                    times.nbytes + sum(_.nbytes for _ in columns.values())
+                    for _, columns, times in streams.values()
+                )
+                self._discard_prefetched()
+            return streams
+        except Exception as ex:
+            print(f"Failed to prefetch the run {uid!r}: {ex}")
+            with self._lock:
+                if self._prefetched.get(uid, None) is prefetch:
+                    del self._prefetched[uid]
+            return None
+
+    def _discard_prefetched(self):
+        # The least recently used data is discarded first. Must be called with the lock acquired.
+        nbytes = sum(_.nbytes for _ in self._prefetched.values())
+        for uid, prefetch in list(self._prefetched.items()):
+            if nbytes <= self._cache_bytes:
+                break
+            if prefetch.nbytes:
+                del self._prefetched[uid]
+                nbytes -= prefetch.nbytes
+
+    def is_prefetched(self, uid):
+        """
+        Check if the data of the run was prefetched.
+        """
+        with self._lock:
+            prefetch = self._prefetched.get(uid, None)
+        return prefetch is not None and bool(prefetch.result())
+
+    def cancel_prefetch(self, uid):
+        """
+        Stop prefetching of the run and discard the prefetched data. The stream that is
+        being read from the catalog is discarded when it is read.
+        """
+        with self._lock:
+            prefetch = self._prefetched.pop(uid, None)
+            if prefetch is not None:
+                prefetch.cancelled.set()
+                self._idle.notify_all()
+        if prefetch is not None:
+            prefetch.future.cancel()
+
+    def prefetching(self):
+        """
+        Returns the list of uids of the runs that are being prefetched or waiting to be prefetched.
+        """
+        with self._lock:
+            return [uid for uid, _ in self._prefetched.items() if not _.future.done()]
+
+    def _document_parts(self, uid, run, cached_run=None):
+        """
+        Returns the list of the parts (sequences of documents) of the run. The documents
+        of each part are put in the queue before the next part is read.
+        """
+        with self._lock:
+            prefetch = self._prefetched.get(uid, None)
+            if prefetch is not None:
+                self._prefetched.move_to_end(uid)
+        # The run is not waiting for prefetching, which is not started while the runs are loaded
+        streams = None if prefetch is None else prefetch.result()
+        if not streams and cached_run is not None:
+            stop_time = cached_run.metadata["stop"]["time"]
+            streams = {
+                stream_name: (cached_run.descriptor(stream_name), cached_run.read(stream_name), stop_time)
+                for stream_name in cached_run.complete_streams()
+            }
+        if not streams:
+            return [run.documents(fill=self._fill)]
+
+        # The prefetched (or cached) data is displayed first, the rest of the run is read from the catalog
+        prefetched = [("start", run.metadata["start"])]
+        for descriptor, columns, times in streams.values():
+            prefetched.append(("descriptor", descriptor))
+            for page in compose_event_pages(descriptor, columns, times, page_size=self._chunk_size):
+                prefetched.append(("event_page", page))
+        prefetched_descriptors = {descriptor["uid"] for descriptor, _, _ in streams.values()}
+        return [prefetched, self._remaining_documents(run, prefetched_descriptors)]
+
+    def _remaining_documents(self, run, prefetched_descriptors):
+        for name, doc in run.documents(fill=self._fill):
+            if name == "start":
+                continue
+            if name == "descriptor" and doc["uid"] in prefetched_descriptors:
+                continue
+            if name in ("event", "event_page") and doc["descriptor"] in prefetched_descriptors:
+                continue
+            yield name, doc
+
+    def cancel(self, uid):
+        """
+        Stop loading and prefetching of the run. The documents that are already in the queue
+        are still processed.
+        """
+        with self._lock:
+            self._cancelled.add(uid)
+        self.cancel_prefetch(uid)
+
+    def close(self):
+        """
+        Cancel loading and prefetching of all runs and stop the worker threads.
+        """
+        with self._lock:
+            self._cancelled.update(self._progress)
+        for uid in list(self._prefetched):
+            self.cancel_prefetch(uid)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._prefetch_executor.shutdown(wait=False, cancel_futures=True)
+
+    def progress(self):
+        """
+        Returns the progress of loading of the runs that are being loaded: the dictionary
+        uid -> (number of loaded events, total number of events or None).
+        """
+        with self._lock:
+            return {uid: (p["loaded"], p["total"]) for uid, p in self._progress.items()}
+
+    def _load(self, uid, run, cached_run=None):
+        chunk, n_events = [], 0
+
+        def put_chunk():
+            # Wait until the GUI catches up with the loaded documents
+            while len(self._document_queue) > self._max_queued and uid not in self._cancelled:
+                time.sleep(0.05)
+            self._document_queue.put_many(chunk, source=uid)
+            with self._lock:
+                self._progress[uid]["loaded"] = n_events
+
+        try:
+            for documents in self._document_parts(uid, run, cached_run):
+                for name, doc in documents:
+                    if uid in self._cancelled:
+                        break
+                    chunk.append((name, doc))
+                    if name == "event_page":
+                        n_events += len(doc["seq_num"])
+                    elif name == "event":
+                        n_events += 1
+                    if len(chunk) >= self._chunk_size:
+                        put_chunk()
+                        chunk = []
+                if chunk and uid not in self._cancelled:
+                    put_chunk()
+                    chunk = []
+        except Exception as ex:
+            print(f"Failed to load the run {uid!r}: {ex}")
+        finally:
+            with self._lock:
+                self._progress.pop(uid, None)
+                self._cancelled.discard(uid)
+                if not self._progress:
+                    self._idle.notify_all()
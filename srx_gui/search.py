@@ -0,0 +1,428 @@
+"""
+Loading the rows of the table of search results from a catalog of runs.
+"""
+import collections
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from bluesky_widgets.utils.event import EmitterGroup, Event
+
+from .settings import format_results_row
+
+
+class BulkRowExtractor:
+    """
+    Formats the rows of the table of search results for pages of runs. The metadata for all runs
+    in the page that are not in the cache is loaded with a single catalog query. Formatted rows
+    are cached (the cache is keyed by the run uid), so the rows are formatted only once.
+
+    Parameters
+    ----------
+    catalog: Catalog
+        Catalog of runs (databroker).
+    row_factory: callable, optional
+        Function that formats the row, called as ``row_factory(start, stop)``.
+    cache_size: int, optional
+        Maximum number of cached rows. The least recently used rows are discarded first.
+    run_index: RunIndex or None, optional
+        Local index of runs. If the index is passed, the metadata is loaded from the index
+        and the catalog is queried only for the runs that are not indexed.
+
+    Examples
+    --------
+    >>> extractor = BulkRowExtractor(catalog)
+    >>> rows = extractor.rows(uids[100:200])
+    """
+
+    def __init__(self, catalog, *, row_factory=format_results_row, cache_size=10000, run_index=None):
+        self._catalog = catalog
+        self._run_index = run_index
+        self._row_factory = row_factory
+        self._cache_size = cache_size
+        self._cache = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def catalog(self):
+        return self._catalog
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def _cache_row(self, uid, row):
+        with self._lock:
+            self._cache[uid] = row
+            self._cache.move_to_end(uid)
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+
+    def _cached_row(self, uid):
+        with self._lock:
+            row = self._cache.get(uid, None)
+            if row is not None:
+                self._cache.move_to_end(uid)
+            return row
+
+    def _load_metadata(self, uids):
+        """
+        Load the metadata for the list of runs. Returns the dictionary: uid -> (start, stop).
+        """
+        metadata = {}
+        if self._run_index is not None:
+            metadata = self._run_index.metadata(uids)
+            uids = [_ for _ in uids if _ not in metadata]
+            if not uids:
+                return metadata
+        if len(uids) == 1:
+            results = {uids[0]: self._catalog[uids[0]]}.items()
+        else:
+            results = self._catalog.search({"uid": {"$in": list(uids)}}).items()
+        for uid, run in results:
+            md = run.metadata
+            metadata[md["start"]["uid"]] = (md["start"], md["stop"])
+        return metadata
+
+    def rows(self, uids):
+        """
+        Returns the list of rows for the runs with the given uids. Missing runs are
+        represented by ``None``.
+        """
+        rows = {uid: self._cached_row(uid) for uid in uids}
+        missing = [uid for uid, row in rows.items() if row is None]
+        if missing:
+            for uid, (start, stop) in self._load_metadata(missing).items():
+                row = self._row_factory(start, stop)
+                self._cache_row(uid, row)
+                rows[uid] = row
+        return [rows.get(uid, None) for uid in uids]
+
+    def row(self, uid):
+        """
+        Returns the row for the run with the given uid.
+        """
+        return self.rows([uid])[0]
+
+    def update(self, start, stop=None):
+        """
+        Update the cached row from the 'start' and 'stop' documents (e.g. received from the live
+        stream) without querying the catalog.
+        """
+        self._cache_row(start["uid"], self._row_factory(start, stop))
+
+
+class PagedSearchResults:
+    """
+    Model of the table of search results that loads the rows lazily, one page at a time, when
+    the rows are requested (e.g. when the rows are scrolled into view). The rows of each page
+    are loaded with a single catalog query (see ``BulkRowExtractor``) and only the most recently
+    used pages are kept in memory, so opening a large catalog is fast and the memory use depends
+    on the number of the displayed rows, not on the size of the catalog. The uids of the runs
+    are read from the catalog sequentially up to the last requested row.
+
+    The views running in the GUI thread should load the pages in the background thread
+    (see ``request_row()`` and ``pop_loaded_rows()``), so neither reading the uids nor querying
+    the catalog blocks the GUI. The other methods load the pages in the calling thread.
+    The rows of the catalog are counted in the background thread (``len()`` returns 0 until
+    the rows are counted, see ``pop_row_count()``) and the run in the active row is opened
+    in the background thread (the ``active_run`` event is emitted by the background thread
+    when the run is opened).
+
+    Parameters
+    ----------
+    catalog: Catalog
+        Catalog of runs (databroker).
+    headings: iterable(str)
+        Headings of the columns.
+    row_factory: callable, optional
+        Function that formats the row, called as ``row_factory(start, stop)``.
+    page_size: int, optional
+        Number of rows in a page.
+    max_pages: int, optional
+        Maximum number of pages kept in memory.
+    run_index: RunIndex or None, optional
+        Local index of runs. The rows are loaded from the index and the results could be
+        filtered using the index (see ``filter()``).
+    """
+
+    def __init__(
+        self, catalog, *, headings, row_factory=format_results_row, page_size=100, max_pages=20, run_index=None
+    ):
+        self._root_catalog = catalog
+        self._run_index = run_index
+        self._headings = tuple(headings)
+        self._row_factory = row_factory
+        self._page_size = page_size
+        self._max_pages = max_pages
+        self._active_row = None
+        self._active_run = None
+        # Criteria of the filter applied using the index of runs (None - no filter is applied)
+        self._criteria = None
+        # '_lock' protects the pages, '_iterator_lock' - reading of the uids from the catalog
+        self._lock = threading.Lock()
+        self._iterator_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="srx-gui-search")
+
+        self.events = EmitterGroup(source=self, reset=Event, active_run=Event, view=Event)
+        self._set_catalog(catalog)
+
+    @property
+    def headings(self):
+        return self._headings
+
+    @property
+    def root_catalog(self):
+        return self._root_catalog
+
+    @property
+    def catalog(self):
+        "Catalog of current results"
+        return self._catalog
+
+    @property
+    def run_index(self):
+        return self._run_index
+
+    def _set_catalog(self, catalog, uids=None):
+        """
+        Set the catalog of results. If the list of ``uids`` is passed, the results are limited
+        to the runs from the list (the runs are loaded from the catalog).
+        """
+        extractor = BulkRowExtractor(
+            catalog,
+            row_factory=self._row_factory,
+            cache_size=self._page_size * self._max_pages,
+            run_index=self._run_index,
+        )
+        with self._lock:
+            self._catalog = catalog
+            self._n_rows = None if uids is None else len(uids)
+            self._iterator = iter(catalog) if uids is None else iter(uids)
+            self._uids = []
+            # Maps page index -> list of rows, in the order of use
+            self._pages = collections.OrderedDict()
+            self._extractor = extractor
+            # Pages that are being loaded and pages loaded since the last 'pop_loaded_rows()'
+            self._pending_pages = set()
+            self._loaded_pages = []
+            # The number of rows counted since the last 'pop_row_count()'
+            self._counted_rows = None
+            self._active_row = None
+            self._active_run = None
+        if uids is None:
+            self._executor.submit(self._count_rows_in_background, catalog)
+
+    def search(self, query):
+        """
+        Replace the results with the results of the query applied to the root catalog
+        (``None`` - display all runs of the root catalog).
+        """
+        catalog = self._root_catalog if query is None else self._root_catalog.search(query)
+        self._criteria = None
+        self._set_catalog(catalog)
+        self.events.reset()
+
+    def filter(self, **criteria):
+        """
+        Limit the results to the runs that match the criteria (see ``RunIndex.search()``).
+        The runs are selected using the local index, the catalog is not queried.
+        Call without parameters to display all indexed runs.
+        """
+        if self._run_index is None:
+            raise RuntimeError("Filtering of the search results requires the index of runs")
+        self._criteria = criteria
+        self._set_catalog(self._root_catalog, uids=self._run_index.search(**criteria))
+        self.events.reset()
+
+    def refresh(self):
+        """
+        Reload the results (e.g. after new runs were added to the catalog).
+        """
+        if self._criteria is not None:
+            self.filter(**self._criteria)
+            return
+        self._set_catalog(self._catalog)
+        self.events.reset()
+
+    def __len__(self):
+        # The catalog is not queried: the rows are counted in the background thread
+        return self._n_rows or 0
+
+    def _count_rows(self):
+        """
+        Returns the number of rows. The rows are counted in the calling thread if they are not counted yet.
+        """
+        with self._lock:
+            catalog, n_rows = self._catalog, self._n_rows
+        if n_rows is None:
+            n_rows = len(catalog)
+            with self._lock:
+                if catalog is self._catalog and self._n_rows is None:
+                    self._n_rows = self._counted_rows = n_rows
+        return n_rows
+
+    def _count_rows_in_background(self, catalog):
+        try:
+            if catalog is self._catalog:
+                self._count_rows()
+        except Exception as ex:
+            print(f"Failed to count the runs in the search results: {ex}")
+
+    def pop_row_count(self):
+        """
+        Returns the number of rows if the rows were counted since the last call, otherwise ``None``.
+        """
+        with self._lock:
+            n_rows, self._counted_rows = self._counted_rows, None
+        return n_rows
+
+    def get_uid_by_row(self, row):
+        n_rows = self._count_rows()
+        if row >= n_rows:
+            raise IndexError(f"Cannot get row {row}. Catalog has {n_rows} rows.")
+        with self._lock:
+            iterator, uids = self._iterator, self._uids
+        if row < len(uids):
+            return uids[row]
+        # The uids of the rows of loaded pages are already read
+        with self._iterator_lock:
+            while row >= len(uids):
+                uids.append(next(iterator))
+        return uids[row]
+
+    def _load_page(self, page):
+        with self._lock:
+            pages, extractor = self._pages, self._extractor
+            rows = pages.get(page, None)
+            if rows is not None:
+                pages.move_to_end(page)
+                return rows
+        first_row = page * self._page_size
+        last_row = min(first_row + self._page_size, self._count_rows())
+        uids = [self.get_uid_by_row(_) for _ in range(first_row, last_row)]
+        rows = extractor.rows(uids)
+        with self._lock:
+            # The pages of the replaced results are discarded
+            pages[page] = rows
+            while len(pages) > self._max_pages:
+                pages.popitem(last=False)
+        return rows
+
+    def request_row(self, row):
+        """
+        Check if the page that contains the row is loaded. If the page is not loaded, it is
+        loaded in the background thread and the function returns ``False`` immediately.
+        The rows loaded in the background are returned by ``pop_loaded_rows()``.
+        """
+        page = row // self._page_size
+        with self._lock:
+            if page in self._pages:
+                return True
+            if page not in self._pending_pages:
+                self._pending_pages.add(page)
+                self._executor.submit(self._load_page_in_background, page, self._pages)
+        return False
+
+    def _load_page_in_background(self, page, pages):
+        try:
+            if pages is self._pages:
+                self._load_page(page)
+        except Exception as ex:
+            print(f"Failed to load the page {page} of the search results: {ex}")
+            # The rows of the page are displayed as missing runs
+            with self._lock:
+                pages[page] = [None] * self._page_size
+        finally:
+            with self._lock:
+                if pages is self._pages:
+                    self._pending_pages.discard(page)
+                    self._loaded_pages.append(page)
+
+    def pop_loaded_rows(self):
+        """
+        Returns the list of ranges of rows ``(first_row, last_row)`` (``last_row`` is not
+        included) loaded in the background thread since the last call.
+        """
+        with self._lock:
+            loaded_pages, self._loaded_pages = self._loaded_pages, []
+            n_rows = self._n_rows or 0
+        return [(_ * self._page_size, min((_ + 1) * self._page_size, n_rows)) for _ in loaded_pages]
+
+    def get_row(self, row):
+        """
+        Returns the formatted row (tuple) or ``None`` if the run could not be loaded.
+        """
+        page, n = divmod(row, self._page_size)
+        return self._load_page(page)[n]
+
+    def get_data(self, row, column):
+        """
+        Get data for one item of the display table.
+        """
+        row_content = self.get_row(row)
+        return "-" if row_content is None else row_content[column]
+
+    @property
+    def active_row(self):
+        return self._active_row
+
+    @active_row.setter
+    def active_row(self, active_row):
+        if active_row == self._active_row:
+            return
+        with self._lock:
+            self._active_row = active_row
+            self._active_run = None
+            catalog = self._catalog
+        if active_row is None:
+            self.events.active_run(run=None, uid=None, row=None)
+        else:
+            self._executor.submit(self._open_active_run, active_row, catalog)
+
+    def _open_active_run(self, row, catalog):
+        try:
+            uid = self.get_uid_by_row(row)
+            run = catalog[uid]
+        except Exception as ex:
+            print(f"Failed to open the run in the row {row} of the search results: {ex}")
+            return
+        with self._lock:
+            # The run is discarded if another row was selected while the run was opened
+            if row != self._active_row or catalog is not self._catalog:
+                return
+            self._active_run = run
+        self.events.active_run(run=run, uid=uid, row=row)
+
+    @property
+    def active_uid(self):
+        if self._active_row is not None:
+            return self.get_uid_by_row(self._active_row)
+
+    @property
+    def active_run(self):
+        "The run in the active row, ``None`` until the run is opened in the background thread"
+        return self._active_run
+
+    def neighbour_uids(self, row):
+        """
+        Returns the list of uids of the runs with the previous and the next scan ID relative to
+        the run in the row. The runs are found using the index of runs (the most recent run
+        with the scan ID is selected). If the index is not used or the scan ID is not indexed,
+        the runs in the adjacent rows are returned.
+        """
+        uid = self.get_uid_by_row(row)
+        if self._run_index is not None:
+            start, _ = self._run_index.metadata([uid]).get(uid, (None, None))
+            scan_id = None if start is None else start.get("scan_id", None)
+            if scan_id is not None:
+                return [_ for n in (scan_id - 1, scan_id + 1) for _ in self._run_index.search(scan_id=n)[:1]]
+        return [self.get_uid_by_row(_) for _ in (row - 1, row + 1) if 0 <= _ < self._count_rows()]
+
+    def view(self, rows):
+        """
+        Request the runs displayed in the rows to be opened (plotted).
+        """
+        self.events.view(uids=[self.get_uid_by_row(_) for _ in rows])
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -1,3 +1,5 @@
+import os
+
 headings = (
     "Scan ID",
     "Plan Name",
@@ -8,33 +10,38 @@ headings = (
 )
 
 
-def extract_results_row_from_run(run):
+def format_results_row(start, stop):
     """
-    Given a BlueskyRun, format a row for the table of search results.
+    Format a row for the table of search results from the 'start' and 'stop' documents
+    of the run. The 'stop' document is ``None`` if the run is not completed.
     """
-    from datetime import datetime
+    import time
+    from datetime import timedelta
 
-    metadata = run.describe()["metadata"]
-    start = metadata["start"]
-    stop = metadata["stop"]
-    start_time = datetime.fromtimestamp(start["time"])
+    start_time = start["time"]
     motors = start.get("motors", "-")
     if stop is None:
         str_duration = "-"
     else:
-        duration = datetime.fromtimestamp(stop["time"]) - start_time
-        str_duration = str(duration)
-        str_duration = str_duration[: str_duration.index(".")]
+        str_duration = str(timedelta(seconds=int(stop["time"] - start_time)))
     return (
         start.get("scan_id", "-"),
         start.get("plan_name", "-"),
         ", ".join(motors),
-        start_time.strftime("%Y-%m-%d %H:%M:%S"),
+        time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(start_time)),
         str_duration,
         start["uid"][:8],
     )
 
 
+def extract_results_row_from_run(run):
+    """
+    Given a BlueskyRun, format a row for the table of search results.
+    """
+    metadata = run.metadata
+    return format_results_row(metadata["start"], metadata["stop"])
+
+
 columns = (headings, extract_results_row_from_run)
 
 
@@ -42,6 +49,49 @@ class Settings:
     columns = columns
     catalog = None
     subscribe_to = []
+    # Period (in seconds) of delivering received documents to live plots
+    document_update_period = 0.05
+    # Coalesce the documents accumulated while the GUI was busy, so that they are applied in one pass
+    catch_up = True
+    # Maximum number of documents delivered from each source per update (None - no limit)
+    document_max_batch_size = 5000
+    # Path to the JSON file for saving ingestion and rendering metrics (None - metrics are not saved)
+    metrics_path = None
+    metrics_save_period = 5.0
+    # Directory for local caches and indexes
+    cache_directory = os.path.join(os.path.expanduser("~"), ".cache", "srx-gui")
+    # Index of Kafka offsets of 'start' documents used for reattaching to the open run
+    kafka_offset_index_path = os.path.join(cache_directory, "kafka_start_offsets.json")
+    # The runs started earlier (in seconds) are not reattached: their 'stop' document may have been missed
+    kafka_reattach_max_age = 12 * 3600
+    # Free the payloads of event pages in live runs once they are processed by live plots.
+    #   The compacted pages are no longer available to other consumers of the run (e.g. 'run[stream].read()'
+    #   or custom plots), so compaction is disabled by default.
+    compact_event_pages = False
+    # Directory used to spill compacted event pages. The pages are discarded if None.
+    spill_directory = None
+    # Path to the SQLite index of runs used for filtering search results (None - the index is not used)
+    run_index_path = None
+    # Delay (in seconds) between the last change of the text of the search filter and filtering
+    search_filter_delay = 0.3
+    # Directory of the thumbnails of completed XRF_FLY maps (None - the thumbnails are not displayed)
+    thumbnail_directory = None
+    # Cache of the lists of allowed plans and devices downloaded from RE Manager (None - not cached)
+    allowed_items_cache_path = os.path.join(cache_directory, "allowed_plans_devices.json")
+    # Periods (in seconds) of polling RE Manager status: around transitions, while busy and while idle
+    re_poll_period_fast = 0.25
+    re_poll_period = 1.0
+    re_poll_period_idle = 5.0
+    # Directory of memory-mappable arrays of completed live runs (None - the runs are not cached)
+    array_cache_directory = None
+    # Maximum size (in bytes) of the directory of arrays, the least recently used runs are removed
+    array_cache_max_bytes = 2 * 2**30
+    # Historical runs opened from the catalog are loaded by the worker threads in chunks of documents
+    run_loader_workers = 2
+    run_loader_chunk_size = 200
+    # Maximum size (in bytes) of the data of the runs (the selected run and its neighbours) prefetched
+    #   in memory while browsing the catalog
+    run_prefetch_cache_bytes = 256 * 2**20
 
 
 SETTINGS = Settings()
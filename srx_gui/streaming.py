@@ -0,0 +1,228 @@
+"""
+Buffering of the streams of Bluesky documents between the sources and the GUI.
+"""
+
+import collections
+import threading
+import time
+
+import event_model
+
+from .metrics import METRICS
+
+
+def coalesce_documents(documents):
+    """
+    Merge event pages and events from the list of documents into as few event pages
+    as possible. Consecutive events and event pages are merged by descriptor. Any other
+    document (e.g. 'descriptor' or 'stop') is a barrier: pages are never merged across it,
+    so the order of documents within each run is preserved.
+
+    Parameters
+    ----------
+    documents: iterable(tuple)
+        Sequence of (name, doc) pairs.
+
+    Returns
+    -------
+    list(tuple)
+        List of (name, doc) pairs.
+    """
+    result = []
+    # Maps descriptor uid -> list of event pages in the current sequence of pages
+    pages = {}
+
+    def flush():
+        for descriptor_pages in pages.values():
+            if len(descriptor_pages) == 1:
+                result.append(("event_page", descriptor_pages[0]))
+            else:
+                result.append(("event_page", event_model.merge_event_pages(descriptor_pages)))
+        pages.clear()
+
+    for name, doc in documents:
+        if name == "event_page":
+            pages.setdefault(doc["descriptor"], []).append(doc)
+        elif name == "event":
+            pages.setdefault(doc["descriptor"], []).append(event_model.pack_event_page(doc))
+        else:
+            flush()
+            result.append((name, doc))
+    flush()
+
+    return result
+
+
+def compose_event_pages(descriptor, columns, times, *, page_size=1000):
+    """
+    Generate 'event_page' documents from the columns of data of the stream (e.g. the data read
+    from the catalog or from the cache of arrays). The uids of the events are generated
+    from the uid of the descriptor and the sequence numbers.
+
+    Parameters
+    ----------
+    descriptor: dict
+        'descriptor' document of the stream.
+    columns: dict
+        Maps field name -> 1D array of data. The columns are truncated to the same length.
+    times: array or float
+        The times of the events. The same time is used for all events if the time is a number.
+    page_size: int, optional
+        The number of events per page.
+    """
+    n_events = min((len(_) for _ in columns.values()), default=0)
+    for n in range(0, n_events, page_size):
+        seq_num = list(range(n + 1, min(n + page_size, n_events) + 1))
+        n_page = len(seq_num)
+        page_times = [times] * n_page if isinstance(times, (int, float)) else list(times[n : n + n_page])
+        yield {
+            "descriptor": descriptor["uid"],
+            "uid": [f"{descriptor['uid']}-{_}" for _ in seq_num],
+            "seq_num": seq_num,
+            "time": page_times,
+            "data": {field: data[n : n + n_page] for field, data in columns.items()},
+            "timestamps": {field: page_times for field in columns},
+            "filled": {},
+        }
+
+
+class DocumentQueue:
+    """
+    Thread-safe queue of documents. Sources of documents (typically dispatchers running
+    in background threads) put documents in the queue by calling the queue as a callback.
+    The documents are delivered to the subscribed callbacks each time ``process()`` is called,
+    which is expected to be done periodically in the GUI thread.
+
+    Documents from different sources (e.g. Kafka topics consumed in separate threads) are kept
+    in separate lanes. The order of documents within each lane (and therefore within each run)
+    is preserved, while the lanes are drained in round-robin fashion: at most ``max_batch_size``
+    documents are taken from each lane per call to ``process()``, so a busy source can not
+    starve the others.
+
+    If multiple documents accumulated in the queue (the GUI is lagging), the queue is switched
+    to the catch-up mode: the backlog is coalesced, so that all the pages from each run are
+    applied to the live plots in a single pass and intermediate redraws are skipped.
+
+    Parameters
+    ----------
+    catch_up: boolean, optional
+        Enable coalescing of the accumulated documents. Default: ``True``.
+    max_batch_size: int or None, optional
+        Maximum number of documents taken from each lane per call to ``process()``.
+        If ``None``, all accumulated documents are processed.
+
+    Examples
+    --------
+    >>> queue = DocumentQueue()
+    >>> queue.subscribe(stream_documents_into_runs(model.add_run))
+    >>> dispatcher.subscribe(queue)
+    >>> timer.timeout.connect(queue.process)
+    """
+
+    def __init__(self, *, catch_up=True, max_batch_size=None):
+        self._catch_up = catch_up
+        self._max_batch_size = max_batch_size
+        # Maps source -> deque of (name, doc). The order of the lanes is rotated after
+        #   each call to 'process()', so that no lane is always processed first. The lane is
+        #   removed once it is emptied after the 'stop' document (e.g. the run loaded from the catalog
+        #   is complete) and created again if more documents are put in it.
+        self._lanes = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._callbacks = []
+
+    def __call__(self, name, doc):
+        self.put(name, doc)
+
+    def __len__(self):
+        return sum(len(_) for _ in list(self._lanes.values()))
+
+    @property
+    def catch_up(self):
+        return self._catch_up
+
+    @catch_up.setter
+    def catch_up(self, enable):
+        self._catch_up = bool(enable)
+
+    def _lane(self, source):
+        lane = self._lanes.get(source, None)
+        if lane is None:
+            lane = self._lanes[source] = collections.deque()
+        return lane
+
+    def put(self, name, doc, *, source=None):
+        """
+        Put the document in the lane of the ``source``.
+        """
+        with self._lock:
+            self._lane(source).append((name, doc))
+
+    def put_many(self, documents, *, source=None):
+        """
+        Put the batch of (name, doc) pairs in the lane of the ``source``.
+        """
+        with self._lock:
+            self._lane(source).extend(documents)
+
+    def subscribe(self, func):
+        """
+        Subscribe the callback. The callback is called as ``func(name, doc)``.
+        """
+        self._callbacks.append(func)
+
+    def _take(self):
+        """
+        Remove the documents from the lanes. Returns the list of batches (one batch per lane).
+        """
+        batches, completed = [], []
+        with self._lock:
+            for source in list(self._lanes):
+                lane = self._lanes[source]
+                if self._max_batch_size is None or len(lane) <= self._max_batch_size:
+                    documents = list(lane)
+                    lane.clear()
+                else:
+                    documents = [lane.popleft() for _ in range(self._max_batch_size)]
+                if documents:
+                    batches.append(documents)
+                    if not lane and documents[-1][0] == "stop":
+                        completed.append(source)
+            if len(self._lanes) > 1:
+                self._lanes.move_to_end(next(iter(self._lanes)))
+            for source in completed:
+                del self._lanes[source]
+        return batches
+
+    def process(self):
+        """
+        Deliver the accumulated documents to the subscribed callbacks.
+
+        Returns
+        -------
+        int
+            The number of documents removed from the queue.
+        """
+        batches = self._take()
+
+        n_documents = sum(len(_) for _ in batches)
+        METRICS.gauge("queue_depth").set(n_documents + len(self))
+        if not n_documents:
+            return 0
+        METRICS.counter("documents_received").inc(n_documents)
+
+        handling_time = METRICS.histogram("document_handling_time")
+        latency = METRICS.histogram("document_latency")
+        for documents in batches:
+            if self._catch_up and len(documents) > 1:
+                documents = coalesce_documents(documents)
+
+            for name, doc in documents:
+                t_start = time.perf_counter()
+                for func in self._callbacks:
+                    func(name, doc)
+                handling_time.observe(time.perf_counter() - t_start)
+                if name == "event_page" and doc["time"]:
+                    # Time between acquisition of the last event in the page and its delivery
+                    latency.observe(max(time.time() - doc["time"][-1], 0))
+
+        return n_documents
@@ -0,0 +1,33 @@
+"""
+Helpers for testing and benchmarking the widgets.
+"""
+
+
+def table_contents(widget):
+    """
+    Returns the text displayed in the table of the plan queue or the plan history widget
+    as a list of rows (tuples of strings).
+    """
+    table = widget._table
+    return [
+        tuple(table.item(nr, nc).text() if table.item(nr, nc) else "" for nc in range(table.columnCount()))
+        for nr in range(table.rowCount())
+    ]
+
+
+def expected_table_contents(widget, items):
+    """
+    Returns the contents of the table of the plan queue or the plan history widget that
+    displays the list of ``items`` (see ``table_contents()``).
+    """
+    labels = widget._table_column_labels
+    contents = []
+    for item in items:
+        row = []
+        for label in labels:
+            try:
+                row.append(widget.model.get_item_value_for_label(item=item, label=label))
+            except KeyError:
+                row.append("")
+        contents.append(tuple(row))
+    return contents
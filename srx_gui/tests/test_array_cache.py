@@ -0,0 +1,94 @@
+import os
+
+import event_model
+import numpy as np
+import pytest
+
+from srx_gui.array_cache import RunArrayCache
+
+
+def _run_metadata(n_events=25):
+    """
+    Returns the 'start' and 'stop' documents, the descriptors and the columns of the run.
+    Only the field 'x' of the stream 'primary' is cached.
+    """
+    run = event_model.compose_run()
+    descriptors, columns = {}, {}
+    data_keys = {"xs_roi": {"dtype": "number", "shape": [], "source": ""}}
+    descriptors["xs_roi_monitor"] = run.compose_descriptor(
+        name="xs_roi_monitor", data_keys=data_keys
+    ).descriptor_doc
+    columns["xs_roi_monitor"] = {"xs_roi": np.arange(n_events, dtype=float) * 2}
+    data_keys = {_: {"dtype": "number", "shape": [], "source": ""} for _ in ("x", "y")}
+    descriptors["primary"] = run.compose_descriptor(name="primary", data_keys=data_keys).descriptor_doc
+    columns["primary"] = {"x": np.arange(n_events + 5, dtype=float)}
+    return run.start_doc, run.compose_stop(), descriptors, columns
+
+
+def _set_last_use(cache, uid, t):
+    os.utime(os.path.join(cache.path(uid), "metadata.json"), (t, t))
+
+
+def test_array_cache_save_and_open(tmp_path):
+    "The saved run is reopened with memory-mapped columns and the documents with the cached fields."
+    cache = RunArrayCache(str(tmp_path))
+    start, stop, descriptors, columns = _run_metadata()
+    cache.save(start, stop, descriptors, columns)
+    uid = start["uid"]
+
+    # The format on disk
+    assert cache.exists(uid)
+    assert sorted(os.listdir(cache.path(uid))) == ["metadata.json", "primary", "xs_roi_monitor"]
+    assert os.listdir(os.path.join(cache.path(uid), "primary")) == ["x.npy"]
+
+    run = cache.open(uid)
+    assert run.metadata == {"start": start, "stop": stop}
+    assert sorted(run) == ["primary", "xs_roi_monitor"]
+    assert run.fields("primary") == ["x"]
+    assert run.descriptor("primary") == descriptors["primary"]
+    assert run.complete_streams() == ["xs_roi_monitor"]
+
+    data = run.read("xs_roi_monitor")["xs_roi"]
+    assert isinstance(data, np.memmap)
+    np.testing.assert_array_equal(data, columns["xs_roi_monitor"]["xs_roi"])
+    np.testing.assert_array_equal(run.read("primary")["x"], columns["primary"]["x"])
+
+    documents = list(run.documents(page_size=10))
+    names = [name for name, _ in documents]
+    assert names[0] == "start" and names[-1] == "stop"
+    assert names.count("descriptor") == 2
+    cached_descriptors = {doc["name"]: doc for name, doc in documents if name == "descriptor"}
+    assert list(cached_descriptors["primary"]["data_keys"]) == ["x"]
+    pages = {}
+    for name, doc in documents:
+        if name == "event_page":
+            pages.setdefault(doc["descriptor"], []).append(doc)
+    xs_roi = np.concatenate([page["data"]["xs_roi"] for page in pages[descriptors["xs_roi_monitor"]["uid"]]])
+    np.testing.assert_array_equal(xs_roi, columns["xs_roi_monitor"]["xs_roi"])
+    assert [len(page["seq_num"]) for page in pages[descriptors["xs_roi_monitor"]["uid"]]] == [10, 10, 5]
+
+    with pytest.raises(KeyError):
+        cache.open("missing-uid")
+
+
+def test_array_cache_removes_least_recently_used(tmp_path):
+    "The least recently used (saved or opened) runs are removed, the saved run is always kept."
+    cache = RunArrayCache(str(tmp_path))
+    runs = [_run_metadata() for _ in range(3)]
+    for n, (start, stop, descriptors, columns) in enumerate(runs[:2]):
+        cache.save(start, stop, descriptors, columns)
+        _set_last_use(cache, start["uid"], 1000 + n)
+    uid_1, uid_2, uid_3 = (_[0]["uid"] for _ in runs)
+    run_files = [os.path.join(root, name) for root, _, files in os.walk(cache.path(uid_1)) for name in files]
+    run_size = sum(os.path.getsize(_) for _ in run_files)
+
+    # The run 1 is opened, so the run 2 is the least recently used one
+    cache.open(uid_1)
+    cache = RunArrayCache(str(tmp_path), max_bytes=int(run_size * 2.5))
+    cache.save(*runs[2])
+    assert [cache.exists(_) for _ in (uid_1, uid_2, uid_3)] == [True, False, True]
+
+    # The saved run is kept even if it does not fit
+    cache = RunArrayCache(str(tmp_path), max_bytes=1)
+    cache.save(*runs[1])
+    assert [cache.exists(_) for _ in (uid_1, uid_2, uid_3)] == [False, True, False]
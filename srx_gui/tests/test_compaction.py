@@ -0,0 +1,126 @@
+import gc
+import os
+from types import SimpleNamespace
+
+import event_model
+import pytest
+from bluesky_live.bluesky_run import DocumentCache
+
+from srx_gui.compaction import PageCompactor
+from srx_gui.plots import _CompactingReaderMixin
+from srx_gui.settings import SETTINGS
+
+
+def _document_cache(n_pages=3):
+    """
+    Returns the document cache of the live run: 'start', 'descriptor' and ``n_pages`` event pages.
+    """
+    run = event_model.compose_run()
+    bundle = run.compose_descriptor(
+        name="primary", data_keys={"x": {"dtype": "number", "shape": [], "source": ""}}
+    )
+    dc = DocumentCache()
+    dc("start", run.start_doc)
+    dc("descriptor", bundle.descriptor_doc)
+    for n in range(n_pages):
+        dc(
+            "event_page",
+            bundle.compose_event_page(data={"x": [n]}, timestamps={"x": [n]}, seq_num=[n + 1], time=[n]),
+        )
+    return dc
+
+
+class _Reader:
+    pass
+
+
+class _Plot(_CompactingReaderMixin):
+    pass
+
+
+def _is_stub(doc):
+    return doc["data"] == {} and doc["seq_num"] == []
+
+
+def test_page_compactor_consumed_pages_become_stubs():
+    "The pages consumed by the reader are replaced by stubs in the ordered documents and in the stream pages."
+    dc = _document_cache()
+    pages = [doc for name, doc in dc if name == "event_page"]
+    descriptor_uid = pages[0]["descriptor"]
+    compactor = PageCompactor(dc)
+    reader = _Reader()
+    compactor.register(reader)
+    compactor.consumed(reader, 4)
+
+    assert compactor.n_compacted == 4
+    assert [_is_stub(doc) for name, doc in dc._ordered[2:]] == [True, True, False]
+    assert [_is_stub(_) for _ in dc.event_pages[descriptor_uid]] == [True, True, False]
+    assert dc._ordered[2][1]["descriptor"] == descriptor_uid
+    # The compacted pages are not spilled
+    assert compactor.page(2) is None and compactor.spill_path is None
+    assert compactor.page(4) is pages[2]
+    with pytest.raises(ValueError):
+        compactor.page(1)
+
+
+def test_page_compactor_spills_pages(tmp_path):
+    "The compacted pages are appended to '<uid>.pages' in the spill directory and could be loaded back."
+    dc = _document_cache()
+    pages = [doc for name, doc in dc if name == "event_page"]
+    compactor = PageCompactor(dc, spill_directory=str(tmp_path / "spill"))
+    reader = _Reader()
+    compactor.register(reader)
+    compactor.consumed(reader, 3)
+    compactor.consumed(reader, 5)
+
+    assert compactor.spill_path == os.path.join(str(tmp_path / "spill"), f"{dc.start_doc['uid']}.pages")
+    assert [compactor.page(_) for _ in (2, 3, 4)] == pages
+
+
+def test_page_compactor_waits_for_all_readers():
+    "The pages are compacted only when they are consumed by all readers, deleted readers are ignored."
+    dc = _document_cache()
+    compactor = PageCompactor(dc)
+    reader_1, reader_2 = _Reader(), _Reader()
+    compactor.register(reader_1)
+    compactor.register(reader_2)
+    compactor.consumed(reader_1, 5)
+    assert compactor.n_compacted == 0
+    assert not any(_is_stub(doc) for name, doc in dc._ordered[2:])
+
+    compactor.consumed(reader_2, 3)
+    assert compactor.n_compacted == 3
+    del reader_2
+    gc.collect()
+    compactor.consumed(reader_1, 5)
+    assert compactor.n_compacted == 5
+
+
+def test_compacting_reader_mixin(tmp_path, monkeypatch):
+    "The plots reading the same run share the compactor, the pages not consumed by one of the plots are kept."
+    monkeypatch.setattr(SETTINGS, "compact_event_pages", True)
+    monkeypatch.setattr(SETTINGS, "spill_directory", str(tmp_path))
+    run = SimpleNamespace(_document_cache=_document_cache())
+    plot_1, plot_2 = _Plot(), _Plot()
+    plot_1._track_run(run)
+    plot_2._track_run(run)
+
+    plot_1._report_consumed(run, 5)
+    assert not any(_is_stub(doc) for name, doc in run._document_cache._ordered[2:])
+    assert os.listdir(tmp_path) == []
+
+    # The plot displays another run: the pages are consumed by the remaining plot
+    plot_2._track_run(SimpleNamespace(_document_cache=_document_cache()))
+    assert all(_is_stub(doc) for name, doc in run._document_cache._ordered[2:])
+    assert os.listdir(tmp_path) == [f"{run._document_cache.start_doc['uid']}.pages"]
+
+
+def test_compacting_reader_mixin_disabled(monkeypatch):
+    "The pages are not compacted unless compaction is enabled."
+    monkeypatch.setattr(SETTINGS, "compact_event_pages", False)
+    run = SimpleNamespace(_document_cache=_document_cache())
+    plot = _Plot()
+    plot._track_run(run)
+    plot._report_consumed(run, 5)
+    assert plot._compactor is None
+    assert not any(_is_stub(doc) for name, doc in run._document_cache._ordered[2:])
@@ -0,0 +1,105 @@
+import pickle
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from srx_gui import document_log
+from srx_gui.document_log import DocumentRecorder, DocumentReplayer, read_document_log
+
+
+def _documents():
+    page = {
+        "descriptor": "descriptor-uid",
+        "data": {"xs_roi": np.arange(5, dtype=float), "n": [1, 2, 3, 4, 5]},
+        "timestamps": {"xs_roi": [0.0] * 5, "n": [0.0] * 5},
+        "seq_num": [1, 2, 3, 4, 5],
+        "time": [0.0] * 5,
+        "uid": "page-uid",
+    }
+    return [
+        ("start", {"uid": "start-uid", "time": 0.0, "scan_id": np.int64(3)}),
+        ("descriptor", {"uid": "descriptor-uid", "run_start": "start-uid", "data_keys": {}}),
+        ("event_page", page),
+        ("stop", {"uid": "stop-uid", "run_start": "start-uid", "time": 1.0}),
+    ]
+
+
+def _record(path, documents, timestamps=None):
+    "Record the documents, optionally with the given times of receiving the documents."
+    recorder = DocumentRecorder(path)
+    for n, (name, doc) in enumerate(documents):
+        if timestamps is None:
+            recorder(name, doc)
+        else:
+            with pytest.MonkeyPatch.context() as mp:
+                mp.setattr(document_log.time, "time", lambda: timestamps[n])
+                recorder(name, doc)
+    recorder.close()
+
+
+def _assert_documents_equal(received, expected):
+    assert [name for name, _ in received] == [name for name, _ in expected]
+    page, expected_page = received[2][1], expected[2][1]
+    np.testing.assert_array_equal(page["data"]["xs_roi"], expected_page["data"]["xs_roi"])
+    assert page["data"]["n"] == expected_page["data"]["n"]
+    assert received[0][1] == expected[0][1]
+    assert received[3][1] == expected[3][1]
+
+
+@pytest.mark.parametrize("file_name", ["documents.log", "documents.log.gz"])
+def test_record_and_replay(tmp_path, file_name):
+    "The recorded documents are replayed unchanged, recording continues to the existing file."
+    path = str(tmp_path / file_name)
+    documents = _documents()
+    _record(path, documents[:2])
+    _record(path, documents[2:])
+
+    assert len(list(read_document_log(path))) == 4
+    received = []
+    replayer = DocumentReplayer(path, speed=None)
+    replayer.subscribe(lambda name, doc: received.append((name, doc)))
+    replayer.start()
+    _assert_documents_equal(received, documents)
+
+
+def test_replay_speed(tmp_path):
+    "The documents are replayed with the recorded timing scaled by the replay speed, replaying could be stopped."
+    path = str(tmp_path / "documents.log")
+    documents = _documents()
+    _record(path, documents, timestamps=[100.0, 100.5, 101.0, 102.0])
+
+    received = []
+    replayer = DocumentReplayer(path, speed=10)
+    replayer.subscribe(lambda name, doc: received.append((time.monotonic(), name)))
+    t_start = time.monotonic()
+    replayer.start()
+    delays = [t - t_start for t, _ in received]
+    assert [name for _, name in received] == [name for name, _ in documents]
+    assert delays == pytest.approx([0, 0.05, 0.1, 0.2], abs=0.04)
+
+    # Replaying is stopped during the delay before the next document
+    received.clear()
+    replayer = DocumentReplayer(path, speed=0.1)
+    replayer.subscribe(lambda name, doc: received.append((time.monotonic(), name)))
+    thread = threading.Thread(target=replayer.start)
+    thread.start()
+    time.sleep(0.1)
+    replayer.stop()
+    thread.join(timeout=1)
+    assert not thread.is_alive()
+    assert [name for _, name in received] == ["start"]
+
+
+def test_read_document_log_rejects_unsupported_objects(tmp_path):
+    "The objects other than built-in types and numpy arrays are not unpickled."
+    path = str(tmp_path / "documents.log")
+    with open(path, "wb") as f:
+        pickle.dump((0.0, "start", {"uid": "start-uid", "time": 0.0}), f)
+        pickle.dump((1.0, "stop", {"uid": "stop-uid", "exit_status": threading.Event}), f)
+
+    records = read_document_log(path)
+    assert next(records)[1] == "start"
+    with pytest.raises(pickle.UnpicklingError, match="threading.Event"):
+        next(records)
@@ -0,0 +1,67 @@
+import time
+from types import SimpleNamespace
+
+from srx_gui.kafka_consumer import KafkaDocumentConsumer, StartOffsetIndex
+
+
+def _start(uid, t_start=None):
+    return {"uid": uid, "time": time.time() if t_start is None else t_start}
+
+
+def _stop(uid):
+    return {"uid": f"{uid}-stop", "run_start": uid}
+
+
+def test_start_offset_index_open_run(tmp_path):
+    "The offset of the 'start' document is returned until the 'stop' of the same run is consumed."
+    path = str(tmp_path / "offsets.json")
+    index = StartOffsetIndex(path)
+    assert index.open_run_offset("topic", 0) is None
+
+    index.update("topic", 0, 10, "start", _start("run-1"))
+    index.update("topic", 0, 11, "event_page", {})
+    index.update("topic", 0, 12, "stop", _stop("run-0"))  # The 'stop' of another run is ignored
+    assert index.open_run_offset("topic", 0) == 10
+    assert index.open_run_offset("topic", 1) is None
+
+    # The index is saved after each change
+    assert StartOffsetIndex(path).open_run_offset("topic", 0) == 10
+
+    index.update("topic", 0, 20, "stop", _stop("run-1"))
+    assert index.open_run_offset("topic", 0) is None
+    assert StartOffsetIndex(path).open_run_offset("topic", 0) is None
+
+
+def test_start_offset_index_max_age(tmp_path):
+    "The runs started earlier than 'max_age' seconds ago are not considered open."
+    path = str(tmp_path / "offsets.json")
+    index = StartOffsetIndex(path, max_age=3600)
+    index.update("topic", 0, 10, "start", _start("run-1", time.time() - 7200))
+    index.update("topic", 1, 30, "start", _start("run-2", time.time() - 60))
+
+    assert index.open_run_offset("topic", 0) is None
+    assert index.open_run_offset("topic", 1) == 30
+    assert StartOffsetIndex(path).open_run_offset("topic", 0) == 10
+
+
+def test_consumer_start_offsets(tmp_path):
+    "On reattaching, the consumer seeks to the 'start' of the recent open run or to the end of the partition."
+    from confluent_kafka import OFFSET_END
+
+    index = StartOffsetIndex(str(tmp_path / "offsets.json"), max_age=3600)
+    index.update("topic", 0, 10, "start", _start("run-1"))
+    index.update("topic", 1, 20, "start", _start("run-2"))
+    index.update("topic", 1, 25, "stop", _stop("run-2"))
+    index.update("topic", 2, 30, "start", _start("run-3", time.time() - 7200))
+
+    consumer = KafkaDocumentConsumer(["topic"], "localhost:9092", "test", offset_index=index)
+    # The consumer of the client that records the assigned partitions
+    assigned = []
+    kafka_consumer = SimpleNamespace(assign=assigned.extend)
+    partitions = [SimpleNamespace(topic="topic", partition=n, offset=None) for n in range(4)]
+    consumer._on_assign(kafka_consumer, partitions)
+    assert [_.offset for _ in assigned] == [10, OFFSET_END, OFFSET_END, OFFSET_END]
+
+    consumer = KafkaDocumentConsumer(["topic"], "localhost:9092", "test")
+    partitions = [SimpleNamespace(topic="topic", partition=0, offset=None)]
+    assert [_.offset for _ in consumer._set_start_offsets(partitions)] == [OFFSET_END]
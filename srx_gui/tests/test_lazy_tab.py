@@ -0,0 +1,74 @@
+import os
+import threading
+
+import pytest
+from bluesky_widgets.utils.event import EmitterGroup, Event
+
+
+@pytest.fixture(scope="module")
+def qapp():
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from qtpy.QtWidgets import QApplication
+
+    return QApplication.instance() or QApplication([])
+
+
+def _create_tab(qapp):
+    from qtpy.QtWidgets import QLabel
+
+    from srx_gui.widgets import QtLazyTab
+
+    events = EmitterGroup(source=None, status_changed=Event)
+    received = []
+
+    def factory():
+        events.status_changed.connect(lambda event: received.append(event.status))
+        return QLabel("status")
+
+    tab = QtLazyTab(factory, model_events=events)
+    tab.show()
+    qapp.processEvents()
+    return tab, events, received
+
+
+def _emit_in_thread(events, status):
+    thread = threading.Thread(target=lambda: events.status_changed(status=status))
+    thread.start()
+    thread.join()
+
+
+def test_lazy_tab_delivers_latest_event_when_shown(qapp):
+    "The events emitted while the tab is hidden are not delivered, the latest one is delivered when it is shown."
+    tab, events, received = _create_tab(qapp)
+    events.status_changed(status=1)
+    assert received == [1]
+
+    tab.hide()
+    _emit_in_thread(events, 2)
+    _emit_in_thread(events, 3)
+    assert received == [1]
+
+    tab.show()
+    assert received == [1, 3]
+    events.status_changed(status=4)
+    assert received == [1, 3, 4]
+    tab.close()
+
+
+def test_lazy_tab_delivers_event_emitted_while_resuming(qapp):
+    "The event emitted while the callbacks are unblocked is not lost."
+    tab, events, received = _create_tab(qapp)
+    tab.hide()
+
+    emitter = events.status_changed
+    unblock = emitter.unblock
+
+    def unblock_after_event(callback=None):
+        # The event is emitted by the polling thread just before the callback is unblocked
+        _emit_in_thread(events, 2)
+        unblock(callback)
+
+    emitter.unblock = unblock_after_event
+    tab.show()
+    assert received[-1] == 2
+    tab.close()
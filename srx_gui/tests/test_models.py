@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+from srx_gui.models import SRXRunEngineClient
+from srx_gui.qserver_stand_in import QueueServerStandIn
+
+
+@pytest.fixture
+def stand_in():
+    stand_in = QueueServerStandIn(queue_size=5, history_size=5)
+    # Methods of the requests received by the stand-in
+    stand_in.methods = []
+    process_request = stand_in.process_request
+
+    def recorded_process_request(method, params):
+        stand_in.methods.append(method)
+        return process_request(method, params)
+
+    stand_in.process_request = recorded_process_request
+    stand_in.start()
+    yield stand_in
+    stand_in.stop()
+
+
+@pytest.mark.parametrize(
+    "cache, expected_lists",
+    [
+        ("none", ["devices_allowed", "plans_allowed"]),
+        ("current", []),
+        ("stale", ["plans_allowed"]),
+    ],
+)
+def test_manager_connecting_ops(tmp_path, stand_in, cache, expected_lists):
+    "The status is requested once, the lists that are not cached or stale are loaded before the queue."
+    cache_path = str(tmp_path / "allowed_items.json")
+    if cache != "none":
+        model = SRXRunEngineClient(zmq_control_addr=stand_in.zmq_control_addr, allowed_items_cache_path=cache_path)
+        model.manager_connecting_ops()
+        model._client.close()
+    if cache == "stale":
+        with open(cache_path) as f:
+            contents = json.load(f)
+        for entry in contents.values():
+            entry["plans_allowed_uid"] = "stale-uid"
+        with open(cache_path, "w") as f:
+            json.dump(contents, f)
+
+    model = SRXRunEngineClient(zmq_control_addr=stand_in.zmq_control_addr, allowed_items_cache_path=cache_path)
+    stand_in.methods.clear()
+    model.manager_connecting_ops()
+    model._client.close()
+
+    assert stand_in.methods[0] == "status"
+    assert stand_in.methods.count("status") == 1
+    assert stand_in.methods[1 : len(expected_lists) + 1] == expected_lists
+    assert {"queue_get", "history_get"} <= set(stand_in.methods[len(expected_lists) + 1 :])
+
+
+@pytest.mark.parametrize("reload, expected_requests", [(False, 0), (True, 3)])
+def test_load_re_manager_status_reload(stand_in, reload, expected_requests):
+    "The status kept by the client is not used if the status is reloaded."
+    model = SRXRunEngineClient(zmq_control_addr=stand_in.zmq_control_addr)
+    model.load_re_manager_status(unbuffered=True)
+    stand_in.methods.clear()
+    for _ in range(3):
+        model.load_re_manager_status(unbuffered=True, reload=reload)
+    model._client.close()
+    assert stand_in.methods.count("status") == expected_requests
+
+
+def test_status_changed_only_on_changes(stand_in):
+    "The status uid of the stand-in changes only with the status, so polling is not reported as a change."
+    model = SRXRunEngineClient(zmq_control_addr=stand_in.zmq_control_addr)
+    changes = []
+    model.events.status_changed.connect(lambda event: changes.append(event.status["status_uid"]))
+    model.load_re_manager_status(unbuffered=True)
+    for _ in range(3):
+        model.load_re_manager_status(unbuffered=True, reload=True)
+    assert len(changes) == 1
+
+    stand_in.process_request("queue_clear", {})
+    model.load_re_manager_status(unbuffered=True, reload=True)
+    model._client.close()
+    assert len(changes) == 2 and changes[0] != changes[1]
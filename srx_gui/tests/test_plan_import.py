@@ -0,0 +1,49 @@
+import pytest
+
+from srx_gui.plan_import import rows_to_items, validate_items
+from srx_gui.qserver_stand_in import QueueServerStandIn
+
+
+@pytest.fixture(scope="module")
+def allowed_items():
+    # The lists in the format downloaded from RE Manager
+    stand_in = QueueServerStandIn()
+    allowed_plans = stand_in.process_request("plans_allowed", {})["plans_allowed"]
+    allowed_devices = stand_in.process_request("devices_allowed", {})["devices_allowed"]
+    return allowed_plans, allowed_devices
+
+
+_ROW = {"xstart": -10, "xstop": 10, "xnum": 101, "ystart": -5, "ystop": 5, "ynum": 51, "dwell": 0.05}
+
+
+@pytest.mark.parametrize(
+    "changes, message",
+    [
+        ({}, ""),
+        ({"extra_dets": ["xs"], "shutter": False}, ""),
+        ({"dwell": None}, "Missing required parameters: 'dwell'"),
+        ({"xtsart": 0}, "Unsupported parameters: 'xtsart'"),
+        ({"xnum": 10.5}, "Parameter 'xnum' must be a positive integer"),
+        ({"ystop": "5"}, "Parameter 'ystop' must be a number"),
+        ({"center": 1}, "Parameter 'center' must be a boolean"),
+        ({"extra_dets": ["xs", "det_x"]}, "Devices are not in the list of allowed devices: 'det_x'"),
+    ],
+)
+def test_validate_items_default_plan(allowed_items, changes, message):
+    "The parameters of the default plan are checked locally, since the plan accepts any parameters."
+    allowed_plans, allowed_devices = allowed_items
+    row = {k: v for k, v in {**_ROW, **changes}.items() if v is not None}
+    errors = validate_items(rows_to_items([row]), allowed_plans=allowed_plans, allowed_devices=allowed_devices)
+    if message:
+        assert len(errors) == 1 and errors[0][0] == 0
+        assert message in errors[0][1]
+    else:
+        assert errors == []
+
+
+def test_validate_items_unknown_plan(allowed_items):
+    "The rows with plans that are not allowed are rejected by the plan validation of RE Manager."
+    allowed_plans, allowed_devices = allowed_items
+    items = rows_to_items([_ROW, {**_ROW, "name": "count"}])
+    errors = validate_items(items, allowed_plans=allowed_plans, allowed_devices=allowed_devices)
+    assert [n for n, _ in errors] == [1]
@@ -0,0 +1,59 @@
+import pytest
+
+from srx_gui import polling
+from srx_gui.polling import AdaptivePolling
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    "The clock used by 'AdaptivePolling', the time is advanced by assigning 'clock.time'."
+
+    class Clock:
+        time = 1000.0
+
+    clock = Clock()
+    monkeypatch.setattr(polling.time, "monotonic", lambda: clock.time)
+    return clock
+
+
+def _status(manager_state="idle", running_item_uid=None):
+    return {"manager_state": manager_state, "running_item_uid": running_item_uid, "plan_queue_uid": "q"}
+
+
+def test_adaptive_polling_periods(clock):
+    "Fast polling after transitions, normal polling while busy and slow polling while idle or disconnected."
+    p = AdaptivePolling(fast_period=0.5, period=1.0, idle_period=5.0, fast_duration=5.0, idle_after=30.0)
+
+    # The first status is a transition
+    assert p.update(_status(), True) == 0.5
+    assert p.is_fast()
+    clock.time += 6
+    assert not p.is_fast()
+    assert p.update(_status(), True) == 1.0
+    clock.time += 30
+    assert p.update(_status(), True) == 5.0
+
+    # The plan is started: fast polling, then normal polling while the plan is running
+    assert p.update(_status("executing_queue", "item-1"), True) == 0.5
+    clock.time += 6
+    assert p.update(_status("executing_queue", "item-1"), True) == 1.0
+    clock.time += 60
+    assert p.update(_status("executing_queue", "item-1"), True) == 1.0
+
+    # The manager is not accessible: the transition is polled fast, then slowly
+    assert p.update({}, False) == 0.5
+    clock.time += 6
+    assert p.update({}, False) == 5.0
+
+
+def test_adaptive_polling_notify(clock):
+    "Polling is switched to fast mode when the user sends a request."
+    p = AdaptivePolling(fast_period=0.5, period=1.0, idle_period=5.0, fast_duration=5.0, idle_after=30.0)
+    p.update(_status(), True)
+    clock.time += 60
+    assert p.update(_status(), True) == 5.0
+
+    p.notify()
+    assert p.update(_status(), True) == 0.5
+    clock.time += 6
+    assert p.update(_status(), True) == 1.0
@@ -0,0 +1,87 @@
+import copy
+import os
+import uuid
+
+import pytest
+
+from srx_gui.testing import expected_table_contents, table_contents
+
+
+@pytest.fixture(scope="module")
+def qapp():
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from qtpy.QtWidgets import QApplication
+
+    return QApplication.instance() or QApplication([])
+
+
+def _make_item(n):
+    return {
+        "item_type": "plan",
+        "name": "nano_scan_and_fly",
+        "args": [-10, 10, 101, -5, 5, 51, 0.05 * (n + 1)],
+        "kwargs": {"shutter": True},
+        "user": "test",
+        "user_group": "primary",
+        "item_uid": str(uuid.uuid4()),
+        "result": {"run_uids": [str(uuid.uuid4())], "exit_status": "completed"},
+    }
+
+
+def _edit(items, n):
+    items = copy.deepcopy(items)
+    items[n]["args"] = items[n]["args"] + [1]
+    return items
+
+
+def _move(items, n_from, n_to):
+    items = list(items)
+    items.insert(n_to, items.pop(n_from))
+    return items
+
+
+# Each case returns the lists of items before and after the update
+_CASES = {
+    "append": lambda items: (items, items + [_make_item(10)]),
+    "pop_front_and_append": lambda items: (items, items[1:] + [_make_item(10)]),
+    "move_down": lambda items: (items, _move(items, 1, 3)),
+    "move_up": lambda items: (items, _move(items, 3, 1)),
+    "edit": lambda items: (items, _edit(items, 2)),
+    "clear": lambda items: (items, []),
+    "empty_to_non_empty": lambda items: ([], items),
+}
+
+
+def _emit_items(model, widget_type, items):
+    if widget_type == "queue":
+        model.events.plan_queue_changed(plan_queue_items=copy.deepcopy(items), selected_item_uids=[])
+    else:
+        model.events.plan_history_changed(plan_history_items=copy.deepcopy(items), selected_item_pos=[])
+
+
+@pytest.mark.parametrize("case", list(_CASES))
+@pytest.mark.parametrize("widget_type", ["queue", "history"])
+def test_diff_table_update(qapp, widget_type, case):
+    "The table updated by replacing the changed rows is the same as the table reloaded by the original widget."
+    from bluesky_widgets.models.run_engine_client import RunEngineClient
+    from bluesky_widgets.qt.run_engine_client import QtRePlanHistory, QtRePlanQueue
+
+    from srx_gui.widgets import QtSRXPlanHistory, QtSRXPlanQueue
+
+    reload_class, diff_class = {
+        "queue": (QtRePlanQueue, QtSRXPlanQueue),
+        "history": (QtRePlanHistory, QtSRXPlanHistory),
+    }[widget_type]
+    model = RunEngineClient()
+    reload_widget, diff_widget = reload_class(model), diff_class(model)
+
+    old_items, new_items = _CASES[case]([_make_item(n) for n in range(5)])
+    for items in (old_items, new_items):
+        _emit_items(model, widget_type, items)
+        qapp.processEvents()
+        assert table_contents(diff_widget) == table_contents(reload_widget)
+        assert table_contents(diff_widget) == expected_table_contents(diff_widget, items)
+
+    reload_widget.close()
+    diff_widget.close()
+    model._client.close()
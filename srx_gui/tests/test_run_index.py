@@ -0,0 +1,123 @@
+from types import SimpleNamespace
+
+import pytest
+
+from srx_gui.run_index import RunIndex
+
+
+class _FakeCatalog:
+    """
+    Catalog with the subset of the search queries used by ``RunIndex.backfill()``.
+    """
+
+    def __init__(self, runs):
+        # Maps uid -> (start, stop)
+        self._runs = dict(runs)
+        self.queries = []
+
+    def search(self, query):
+        self.queries.append(query)
+        runs = self._runs.items()
+        if "time" in query:
+            runs = [(uid, (start, stop)) for uid, (start, stop) in runs if start["time"] >= query["time"]["$gte"]]
+        if "uid" in query:
+            runs = [(uid, _) for uid, _ in runs if uid in query["uid"]["$in"]]
+        return _FakeCatalog(runs)
+
+    def items(self):
+        for uid, (start, stop) in sorted(self._runs.items(), key=lambda _: -_[1][0]["time"]):
+            yield uid, SimpleNamespace(metadata={"start": start, "stop": stop})
+
+
+def _start(n, plan_name="nano_scan_and_fly", motors=("nano_stage_sx", "nano_stage_sy")):
+    return {
+        "uid": f"uid-{n:05d}",
+        "time": 1000.0 + n,
+        "scan_id": n,
+        "plan_name": plan_name,
+        "motors": list(motors),
+    }
+
+
+def _stop(n, exit_status="success"):
+    return {"uid": f"stop-{n:05d}", "run_start": f"uid-{n:05d}", "time": 1000.5 + n, "exit_status": exit_status}
+
+
+@pytest.fixture
+def index():
+    index = RunIndex(":memory:")
+    yield index
+    index.close()
+
+
+def test_run_index_live_documents(index):
+    "The run is added with the 'start' document and completed with the 'stop' document."
+    index("start", _start(1))
+    index("descriptor", {"uid": "descriptor", "run_start": "uid-00001"})
+    assert index.open_runs() == ["uid-00001"]
+    assert index.metadata(["uid-00001"])["uid-00001"][1] is None
+
+    index("stop", _stop(1, exit_status="abort"))
+    assert index.open_runs() == []
+    start, stop = index.metadata(["uid-00001"])["uid-00001"]
+    assert start == {
+        "uid": "uid-00001",
+        "time": 1001.0,
+        "scan_id": 1,
+        "plan_name": "nano_scan_and_fly",
+        "motors": ["nano_stage_sx", "nano_stage_sy"],
+    }
+    assert stop == {"time": 1001.5, "exit_status": "abort"}
+
+
+def test_run_index_backfill(index):
+    "The runs are added from the catalog after the watermark, the open runs are updated when completed."
+    runs = {f"uid-{n:05d}": (_start(n), _stop(n)) for n in range(5)}
+    # The run 3 is open in the catalog, the 'stop' of the run 2 was missed by the live stream
+    runs["uid-00003"] = (_start(3), None)
+    index("start", _start(2))
+    catalog = _FakeCatalog(runs)
+
+    # The open run 2 is updated and all runs are added
+    assert index.backfill(catalog, batch_size=2) == 6
+    assert index.backfilled_until() == 1004.0
+    assert index.open_runs() == ["uid-00003"]
+    assert index.count() == 5
+
+    # The run 3 is completed and a new run is added: only the open run and the new runs are queried
+    runs["uid-00003"] = (_start(3), _stop(3))
+    runs["uid-00005"] = (_start(5), _stop(5))
+    catalog = _FakeCatalog(runs)
+    assert index.backfill(catalog) == 3  # The open run, the most recent run (the watermark) and the new run
+    assert catalog.queries == [{"uid": {"$in": ["uid-00003"]}}, {"time": {"$gte": 1004.0}}]
+    assert index.backfilled_until() == 1005.0
+    assert index.open_runs() == []
+    assert index.count() == 6
+
+
+def test_run_index_search(index):
+    "The runs are filtered by text, plan name and start time and ordered newest first."
+    index.add_runs((_start(n), _stop(n)) for n in range(10))
+    index.add_runs([(_start(10, plan_name="count", motors=()), None), (_start(11, plan_name="xy_fly"), None)])
+
+    assert index.search() == [f"uid-{n:05d}" for n in reversed(range(12))]
+    assert index.search(limit=3, offset=2) == ["uid-00009", "uid-00008", "uid-00007"]
+    assert index.search(plan_name="count") == ["uid-00010"]
+    assert index.search(since=1008.0, until=1011.0) == ["uid-00010", "uid-00009", "uid-00008"]
+    assert index.count(since=1008.0, until=1011.0) == 3
+    # The text is matched against the plan name, motors, uid prefix and scan ID
+    assert index.search(text="fly") == [f"uid-{n:05d}" for n in (11, *reversed(range(10)))]
+    assert index.search(text="count") == ["uid-00010"]
+    assert index.search(text="uid-0000") == [f"uid-{n:05d}" for n in reversed(range(10))]
+    assert index.search(text="7") == ["uid-00007"]
+    assert index.count(text="fly", plan_name="nano_scan_and_fly", since=1005.0) == 5
+    assert index.search(scan_id=3) == ["uid-00003"]
+
+
+def test_run_index_metadata_many_uids(index):
+    "The metadata of more runs than the limit of parameters of a single query is returned."
+    index.add_runs((_start(n), _stop(n)) for n in range(1200))
+    uids = [f"uid-{n:05d}" for n in range(0, 1200, 2)] + ["missing-uid"]
+    metadata = index.metadata(uids)
+    assert sorted(metadata) == sorted(uids[:-1])
+    assert all(metadata[uid][0]["uid"] == uid for uid in metadata)
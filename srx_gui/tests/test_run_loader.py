@@ -0,0 +1,142 @@
+import threading
+
+import event_model
+import numpy as np
+import xarray as xr
+
+from srx_gui.run_loader import RunLoader
+
+
+class _FakeStream:
+    def __init__(self, descriptor, columns, times):
+        self.metadata = {"descriptors": [descriptor]}
+        self._columns = columns
+        self._times = times
+
+    def read(self):
+        return xr.Dataset({k: ("time", v) for k, v in self._columns.items()}, coords={"time": self._times})
+
+
+class _FakeRun:
+    """
+    Completed run with the monitored stream 'xs_roi_monitor' and the stream 'primary'.
+    Reading of the documents is blocked until ``release`` is set.
+    """
+
+    def __init__(self, n_events=10):
+        run = event_model.compose_run()
+        self.metadata = {"start": run.start_doc, "stop": None}
+        self._documents = [("start", run.start_doc)]
+        self._streams = {}
+        for stream_name, field, n in (("xs_roi_monitor", "xs_roi", n_events), ("primary", "x", 3)):
+            data_keys = {field: {"dtype": "number", "shape": [], "source": ""}}
+            bundle = run.compose_descriptor(name=stream_name, data_keys=data_keys)
+            columns = {field: np.arange(n, dtype=float)}
+            times = np.arange(n, dtype=float) + 1000
+            self._streams[stream_name] = _FakeStream(bundle.descriptor_doc, columns, times)
+            self._documents.append(("descriptor", bundle.descriptor_doc))
+            page = bundle.compose_event_page(
+                data=columns, timestamps={field: times}, seq_num=list(range(1, n + 1)), time=times
+            )
+            self._documents.append(("event_page", page))
+        self.metadata["stop"] = run.compose_stop()
+        self._documents.append(("stop", self.metadata["stop"]))
+        self.release = threading.Event()
+        self.release.set()
+
+    @property
+    def uid(self):
+        return self.metadata["start"]["uid"]
+
+    def __iter__(self):
+        return iter(self._streams)
+
+    def __getitem__(self, stream_name):
+        return self._streams[stream_name]
+
+    def documents(self, fill="no"):
+        assert self.release.wait(5)
+        yield from self._documents
+
+
+class _FakeCatalog(dict):
+    def __init__(self, runs):
+        super().__init__({run.uid: run for run in runs})
+        self.requested = []
+
+    def __getitem__(self, uid):
+        self.requested.append(uid)
+        return super().__getitem__(uid)
+
+
+class _Queue(list):
+    def put_many(self, documents, source=None):
+        self.extend(documents)
+
+    def __len__(self):
+        return 0
+
+
+def test_run_loader_uses_prefetched_data():
+    "The prefetched data of the monitored streams is loaded first, the rest of the run is read from the run."
+    run = _FakeRun()
+    catalog = _FakeCatalog([run])
+    queue = _Queue()
+    loader = RunLoader(queue, chunk_size=4)
+    assert loader.prefetch(catalog, run.uid).result(timeout=5)
+    assert loader.is_prefetched(run.uid)
+
+    loader.load(run).result(timeout=5)
+    names = [name for name, _ in queue]
+    assert names.count("start") == 1 and names.count("descriptor") == 2 and names[-1] == "stop"
+    monitor_descriptor = run["xs_roi_monitor"].metadata["descriptors"][0]["uid"]
+    pages = [doc for name, doc in queue if name == "event_page"]
+    monitor_pages = [_ for _ in pages if _["descriptor"] == monitor_descriptor]
+    # The pages composed from the prefetched columns (the uids are generated from the descriptor uid)
+    assert [len(_["seq_num"]) for _ in monitor_pages] == [4, 4, 2]
+    assert monitor_pages[0]["uid"][0] == f"{monitor_descriptor}-1"
+    assert len(pages) == 4
+    loader.close()
+
+
+def test_run_loader_prefetching_waits_for_loading():
+    "Prefetching waits until the runs are loaded and stops when it is cancelled."
+    loaded_run, run_1, run_2 = _FakeRun(), _FakeRun(), _FakeRun()
+    catalog = _FakeCatalog([run_1, run_2])
+    loader = RunLoader(_Queue())
+    loaded_run.release.clear()
+    load_future = loader.load(loaded_run)
+
+    future_1 = loader.prefetch(catalog, run_1.uid)
+    assert loader.prefetching() == [run_1.uid]
+    loader.cancel_prefetch(run_1.uid)
+    assert future_1.result(timeout=5) is None
+    future_2 = loader.prefetch(catalog, run_2.uid)
+    assert not future_2.done() and catalog.requested == []
+
+    loaded_run.release.set()
+    load_future.result(timeout=5)
+    assert future_2.result(timeout=5)
+    assert catalog.requested == [run_2.uid]
+    loader.close()
+
+
+def test_run_loader_prefetch_cache_bytes():
+    "The least recently used prefetched runs are discarded when the total size exceeds 'cache_bytes'."
+    runs = [_FakeRun() for _ in range(3)]
+    catalog = _FakeCatalog(runs)
+    # The size of the prefetched data of each run: the column and the times of 10 events
+    run_bytes = 2 * 10 * 8
+    loader = RunLoader(_Queue(), cache_bytes=int(run_bytes * 2.5))
+    for run in runs:
+        loader.prefetch(catalog, run.uid).result(timeout=5)
+    assert [loader.is_prefetched(_.uid) for _ in runs] == [False, True, True]
+
+    loader.cancel_prefetch(runs[2].uid)
+    assert [loader.is_prefetched(_.uid) for _ in runs] == [False, True, False]
+    assert loader.prefetching() == []
+    loader.close()
+
+    loader = RunLoader(_Queue(), cache_bytes=0)
+    assert loader.prefetch(catalog, runs[0].uid) is None
+    loader.close()
@@ -0,0 +1,76 @@
+import threading
+from types import SimpleNamespace
+
+from srx_gui.search import PagedSearchResults
+
+
+class _FakeCatalog:
+    """
+    Catalog of runs that blocks counting and opening of the runs until ``release`` is set.
+    """
+
+    def __init__(self, n_runs):
+        self._uids = [f"uid-{n:05d}" for n in range(n_runs)]
+        self.release = threading.Event()
+        self.threads = []
+
+    def _wait(self):
+        self.threads.append(threading.current_thread())
+        assert self.release.wait(5)
+
+    def __len__(self):
+        self._wait()
+        return len(self._uids)
+
+    def __iter__(self):
+        return iter(self._uids)
+
+    def __getitem__(self, uid):
+        self._wait()
+        return SimpleNamespace(metadata={"start": {"uid": uid, "scan_id": 1}, "stop": None})
+
+
+def _results(catalog):
+    return PagedSearchResults(catalog, headings=["Scan ID"], row_factory=lambda start, stop: (start["scan_id"],))
+
+
+def _wait_for_executor(results):
+    results._executor.submit(lambda: None).result(timeout=5)
+
+
+def test_search_results_rows_counted_in_background():
+    "The length is 0 until the rows are counted in the background, the count is reported once."
+    catalog = _FakeCatalog(250)
+    results = _results(catalog)
+    assert len(results) == 0
+    assert results.pop_row_count() is None
+
+    catalog.release.set()
+    _wait_for_executor(results)
+    assert len(results) == 250
+    assert results.pop_row_count() == 250
+    assert results.pop_row_count() is None
+    assert threading.current_thread() not in catalog.threads
+    results.close()
+
+
+def test_search_results_active_run_opened_in_background():
+    "The active run is opened in the background, the run of the previously selected row is discarded."
+    catalog = _FakeCatalog(10)
+    results = _results(catalog)
+    received = []
+    results.events.active_run.connect(lambda event: received.append((event.uid, event.row)))
+
+    results.active_row = 2
+    results.active_row = 3
+    assert results.active_run is None and received == []
+
+    catalog.release.set()
+    _wait_for_executor(results)
+    assert received == [("uid-00003", 3)]
+    assert results.active_run.metadata["start"]["uid"] == "uid-00003"
+    assert threading.current_thread() not in catalog.threads
+
+    results.active_row = None
+    assert results.active_run is None and received[-1] == (None, None)
+    results.close()
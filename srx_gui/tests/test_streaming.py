@@ -0,0 +1,138 @@
+import event_model
+import pytest
+
+from srx_gui.streaming import DocumentQueue, coalesce_documents
+
+
+def _run_documents(n_pages=3, page_size=2, streams=("primary",)):
+    """
+    Generate the documents of a run with event pages from one or more streams. The pages
+    of different streams are interleaved.
+    """
+    run = event_model.compose_run()
+    documents = [("start", run.start_doc)]
+    data_keys = {"x": {"dtype": "number", "shape": [], "source": ""}}
+    descriptors = []
+    for stream in streams:
+        bundle = run.compose_descriptor(name=stream, data_keys=data_keys)
+        documents.append(("descriptor", bundle.descriptor_doc))
+        descriptors.append(bundle)
+    for n in range(n_pages):
+        for bundle in descriptors:
+            seq_num = list(range(n * page_size + 1, (n + 1) * page_size + 1))
+            page = bundle.compose_event_page(
+                data={"x": [float(_) for _ in seq_num]},
+                timestamps={"x": [0.0] * page_size},
+                seq_num=seq_num,
+                time=[0.0] * page_size,
+            )
+            documents.append(("event_page", page))
+    documents.append(("stop", run.compose_stop()))
+    return documents
+
+
+def _pages(documents):
+    return [doc for name, doc in documents if name == "event_page"]
+
+
+def test_coalesce_documents_merges_pages_per_descriptor():
+    "Consecutive pages are merged into one page per descriptor, the data is preserved."
+    documents = _run_documents(n_pages=4, streams=("primary", "xs_roi_monitor"))
+    coalesced = coalesce_documents(documents)
+
+    pages = _pages(coalesced)
+    assert len(pages) == 2
+    assert len({_["descriptor"] for _ in pages}) == 2
+    for page in pages:
+        assert page["seq_num"] == list(range(1, 9))
+        assert page["data"]["x"] == [float(_) for _ in range(1, 9)]
+
+
+def test_coalesce_documents_preserves_order_across_descriptors():
+    "Pages are merged only between barriers, the order of all other documents is preserved."
+    documents = _run_documents(n_pages=2, streams=("primary", "xs_roi_monitor"))
+    coalesced = coalesce_documents(documents)
+
+    names = [name for name, _ in coalesced]
+    assert names == ["start", "descriptor", "descriptor", "event_page", "event_page", "stop"]
+    # The merged pages are in the order of the first page of each descriptor
+    descriptor_uids = [doc["uid"] for name, doc in coalesced if name == "descriptor"]
+    assert [_["descriptor"] for _ in _pages(coalesced)] == descriptor_uids
+    assert [name for name, _ in documents if name != "event_page"] == [
+        name for name, _ in coalesced if name != "event_page"
+    ]
+
+
+def test_coalesce_documents_stop_flushes_pages():
+    "Pages of a run are emitted before its 'stop' and are not merged with the pages of the next run."
+    run_1, run_2 = _run_documents(n_pages=2), _run_documents(n_pages=3)
+    coalesced = coalesce_documents(run_1 + run_2)
+
+    names = [name for name, _ in coalesced]
+    assert names == ["start", "descriptor", "event_page", "stop"] * 2
+    assert [len(_["seq_num"]) for _ in _pages(coalesced)] == [4, 6]
+
+
+def test_coalesce_documents_packs_events():
+    "Single events are packed into pages and merged with the neighbouring pages."
+    documents = _run_documents(n_pages=2)
+    events = list(event_model.unpack_event_page(documents[2][1]))
+    documents = documents[:2] + [("event", _) for _ in events] + documents[3:]
+    coalesced = coalesce_documents(documents)
+
+    assert [len(_["seq_num"]) for _ in _pages(coalesced)] == [4]
+
+
+@pytest.mark.parametrize("catch_up", [True, False])
+def test_document_queue_delivers_documents(catch_up):
+    "The documents are delivered in order. In catch-up mode the backlog of pages is coalesced."
+    received = []
+    queue = DocumentQueue(catch_up=catch_up)
+    queue.subscribe(lambda name, doc: received.append((name, doc)))
+
+    documents = _run_documents(n_pages=3)
+    for name, doc in documents:
+        queue(name, doc)
+    assert len(queue) == len(documents)
+    assert queue.process() == len(documents)
+    assert len(queue) == 0
+
+    if catch_up:
+        assert [name for name, _ in received] == ["start", "descriptor", "event_page", "stop"]
+    else:
+        assert received == documents
+    assert sum(len(_["seq_num"]) for _ in _pages(received)) == 6
+
+
+def test_document_queue_max_batch_size():
+    "At most 'max_batch_size' documents are taken from each lane, the lanes are processed round-robin."
+    received = []
+    queue = DocumentQueue(catch_up=False, max_batch_size=2)
+    queue.subscribe(lambda name, doc: received.append(doc["uid"]))
+
+    queue.put_many([("start", {"uid": f"a{n}"}) for n in range(3)], source="a")
+    queue.put_many([("start", {"uid": f"b{n}"}) for n in range(3)], source="b")
+    assert queue.process() == 4
+    assert received == ["a0", "a1", "b0", "b1"]
+    assert queue.process() == 2
+    assert received[4:] == ["b2", "a2"]
+
+
+def test_document_queue_removes_completed_lanes():
+    "The lane is removed once it is emptied after the 'stop' document, the other lanes are kept."
+    queue = DocumentQueue(catch_up=False, max_batch_size=3)
+    queue.subscribe(lambda name, doc: None)
+
+    documents = _run_documents(n_pages=2)
+    queue.put_many(documents, source="run")
+    queue.put_many(documents[:2], source="live")
+    while queue.process():
+        pass
+    assert list(queue._lanes) == ["live"]
+
+    # The lane is created again when the documents are put in it
+    queue.put_many(documents, source="run")
+    assert queue.process() == 3
+    assert sorted(queue._lanes) == ["live", "run"]
+    assert queue.process() == 2
+    assert list(queue._lanes) == ["live"]
@@ -0,0 +1,26 @@
+import os
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def qapp():
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from qtpy.QtWidgets import QApplication
+
+    return QApplication.instance() or QApplication([])
+
+
+def test_viewer_close_stops_all_receivers(qapp, monkeypatch):
+    "The threads of all 0MQ receivers are stopped when the viewer is closed."
+    from srx_gui.settings import SETTINGS
+    from srx_gui.viewer import Viewer
+
+    sources = [{"protocol": "zmq", "zmq_addr": ("127.0.0.1", port)} for port in (60721, 60722)]
+    monkeypatch.setattr(SETTINGS, "subscribe_to", sources)
+    viewer = Viewer(show=False)
+    assert len(viewer.zmq_receiver_threads) == 2
+    assert all(_.isRunning() for _ in viewer.zmq_receiver_threads)
+
+    viewer.close()
+    assert all(_.isFinished() for _ in viewer.zmq_receiver_threads)
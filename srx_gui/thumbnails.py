@@ -0,0 +1,225 @@
+"""
+On-disk cache of small thumbnails of completed ``XRF_FLY`` maps.
+
+The thumbnails are generated when a live run is completed (from the data already accumulated
+by the live image plot) or by reading the run from the catalog in a background thread.
+The thumbnails are saved as PNG files named by the run uid, so they could be displayed in
+the search results and the plan history without loading the data of the runs.
+"""
+import os
+import threading
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .plots import LiveImageSRX, raster_image
+
+
+def downsample_image(image, size):
+    """
+    Reduce the image so that none of the dimensions exceeds ``size``. The pixels are averaged
+    over square blocks, ``NaN`` values (points that were not acquired) are ignored.
+    """
+    image = np.asarray(image, dtype=float)
+    factor = int(np.ceil(max(image.shape) / size))
+    if factor <= 1:
+        return image
+    ny, nx = image.shape
+    ny_pad, nx_pad = -ny % factor, -nx % factor
+    image = np.pad(image, ((0, ny_pad), (0, nx_pad)), constant_values=np.nan)
+    blocks = image.reshape(image.shape[0] // factor, factor, image.shape[1] // factor, factor)
+    with warnings.catch_warnings():
+        # Blocks that contain only NaN
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        return np.nanmean(blocks, axis=(1, 3))
+
+
+def _monitor_stream_data(documents):
+    """
+    Collect the data points of the monitored field (stream ``<field>_monitor``) from
+    the documents of the ``XRF_FLY`` run.
+    """
+    descriptors, field, pages = {}, None, []
+    for name, doc in documents:
+        if name == "descriptor" and doc.get("name", "").endswith("_monitor"):
+            descriptors[doc["uid"]] = doc
+            if field is None:
+                field = "_".join(doc["name"].split("_")[:-1])
+        elif name == "event_page" and doc["descriptor"] in descriptors:
+            if field in doc["data"]:
+                pages.append(np.asarray(doc["data"][field], dtype=float))
+        elif name == "event" and doc["descriptor"] in descriptors:
+            if field in doc["data"]:
+                pages.append(np.asarray([doc["data"][field]], dtype=float))
+    return np.concatenate(pages) if pages else np.array([])
+
+
+class ThumbnailCache:
+    """
+    Directory of thumbnails of ``XRF_FLY`` maps keyed by the run uid.
+
+    Parameters
+    ----------
+    directory: str
+        Path to the directory of the cache. The directory is created if it does not exist.
+    catalog: Catalog or None, optional
+        Catalog used for generating the missing thumbnails (see ``request()``).
+    size: int, optional
+        Maximum size (in pixels) of the thumbnails.
+    cmap: str, optional
+        Color map of the thumbnails.
+
+    Examples
+    --------
+    >>> thumbnails = ThumbnailCache(os.path.join(SETTINGS.cache_directory, "thumbnails"), catalog=catalog)
+    >>> thumbnails.request(uid)  # Generated in the background
+    >>> if thumbnails.exists(uid):
+    ...     pixmap = QPixmap(thumbnails.path(uid))
+    """
+
+    def __init__(self, directory, *, catalog=None, size=64, cmap="viridis"):
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._catalog = catalog
+        self._size = size
+        self._cmap = cmap
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="srx-gui-thumbnails")
+        self._lock = threading.Lock()
+        # Runs that are being processed and runs that have no thumbnails (not XRF_FLY maps)
+        self._pending = set()
+        self._unavailable = set()
+
+    @property
+    def directory(self):
+        return self._directory
+
+    @property
+    def catalog(self):
+        return self._catalog
+
+    def path(self, uid):
+        return os.path.join(self._directory, f"{uid}.png")
+
+    def exists(self, uid):
+        return os.path.isfile(self.path(uid))
+
+    def is_unavailable(self, uid):
+        """
+        Check if the thumbnail could not be generated for the run (e.g. the run is not a map).
+        """
+        with self._lock:
+            return uid in self._unavailable
+
+    def save(self, uid, image):
+        """
+        Downsample the image (2D array) and save it as the thumbnail of the run.
+        """
+        import matplotlib.image
+
+        image = downsample_image(image, self._size)
+        finite = image[np.isfinite(image)]
+        vmin, vmax = np.percentile(finite, [2, 98]) if finite.size else (0, 1)
+        # The file is renamed when it is complete, so partially written files are never displayed
+        path = self.path(uid)
+        path_tmp = f"{path}.{threading.get_ident()}.tmp"
+        matplotlib.image.imsave(path_tmp, image, cmap=self._cmap, vmin=vmin, vmax=vmax, format="png")
+        os.replace(path_tmp, path)
+
+    def save_async(self, uid, image):
+        """
+        Save the thumbnail in the background thread.
+        """
+        return self._executor.submit(self._save_logged, uid, image)
+
+    def _save_logged(self, uid, image):
+        try:
+            self.save(uid, image)
+        except Exception as ex:
+            print(f"Failed to save the thumbnail of the run {uid!r}: {ex}")
+
+    def request(self, uid):
+        """
+        Generate the thumbnail of the run from the catalog in the background thread
+        if the thumbnail does not exist. The function returns immediately.
+        """
+        if self._catalog is None:
+            return
+        with self._lock:
+            if uid in self._pending or uid in self._unavailable:
+                return
+            self._pending.add(uid)
+        self._executor.submit(self._generate_from_catalog, uid)
+
+    def _generate_from_catalog(self, uid):
+        try:
+            if self.exists(uid):
+                return
+            run = self._catalog[uid]
+            start = run.metadata["start"]
+            scan = start.get("scan", {})
+            if scan.get("type", None) != "XRF_FLY" or run.metadata.get("stop", None) is None:
+                with self._lock:
+                    self._unavailable.add(uid)
+                return
+            data = _monitor_stream_data(run.documents(fill="no"))
+            if not data.size:
+                with self._lock:
+                    self._unavailable.add(uid)
+                return
+            self.save(uid, raster_image(data, scan["shape"], snake=scan.get("snake", False)))
+        except Exception as ex:
+            print(f"Failed to generate the thumbnail of the run {uid!r}: {ex}")
+            with self._lock:
+                self._unavailable.add(uid)
+        finally:
+            with self._lock:
+                self._pending.discard(uid)
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class LiveThumbnails:
+    """
+    Callback with signature ``(name, doc)`` that saves the thumbnail of the map when the live
+    ``XRF_FLY`` run is completed. The data is taken from the live image plot of the run, so
+    the run is not read from the catalog. If the plot is not found (e.g. the run was replaced
+    in the plot), the thumbnail is generated from the catalog.
+
+    Parameters
+    ----------
+    thumbnail_cache: ThumbnailCache
+    auto_plot_builder: AutoSRXPlot
+        Plot builder used for live plotting.
+    """
+
+    def __init__(self, thumbnail_cache, auto_plot_builder):
+        self._thumbnail_cache = thumbnail_cache
+        self._auto_plot_builder = auto_plot_builder
+        self._start_docs = {}
+
+    def _find_image(self, uid):
+        for plot_builder in self._auto_plot_builder.plot_builders:
+            if not isinstance(plot_builder, LiveImageSRX):
+                continue
+            for run in plot_builder._run_manager.runs:
+                start = run.metadata["start"]
+                if start["uid"] == uid and plot_builder.data_cache.size:
+                    scan = start["scan"]
+                    return raster_image(plot_builder.data_cache, scan["shape"], snake=scan.get("snake", False))
+        return None
+
+    def __call__(self, name, doc):
+        if name == "start":
+            if doc.get("scan", {}).get("type", None) == "XRF_FLY":
+                self._start_docs[doc["uid"]] = doc
+        elif name == "stop":
+            uid = doc["run_start"]
+            if self._start_docs.pop(uid, None) is None:
+                return
+            image = self._find_image(uid)
+            if image is not None:
+                self._thumbnail_cache.save_async(uid, image)
+            else:
+                self._thumbnail_cache.request(uid)
@@ -1,21 +1,73 @@
 import os
 import copy
+import functools
 import pprint
 import uuid
 
-from bluesky_widgets.models.run_engine_client import RunEngineClient
-from bluesky_widgets.qt import Window
+from qtpy.QtCore import QThread, QTimer
 
 # from bluesky_widgets.models.plot_specs import Axes, Figure
 # from bluesky_widgets.models.plot_builders import Lines
 # from bluesky_widgets.models.auto_plot_builders import AutoPlotter
 
-from .widgets import QtViewer
-
 # from .models import SearchWithButton
 from .settings import SETTINGS
 
 from .plots import AutoSRXPlot
+from .streaming import DocumentQueue
+from .run_loader import RunLoader
+from .metrics import METRICS
+from .profiling import STARTUP_PROFILER
+
+
+def _stream_documents_into_runs(add_run):
+    """
+    The same as ``stream_documents_into_runs`` from bluesky-widgets, except that the module
+    (which imports dask and xarray) is imported when the first document is received, so it is
+    not imported at startup.
+    """
+    handler = None
+
+    def handle_document(name, doc):
+        nonlocal handler
+        if handler is None:
+            from bluesky_widgets.utils.streaming import stream_documents_into_runs
+
+            handler = stream_documents_into_runs(add_run)
+        return handler(name, doc)
+
+    return handle_document
+
+
+class _DispatcherStart(QThread):
+    """
+    Runs the blocking ``start()`` method of a dispatcher in a separate thread.
+    """
+
+    def __init__(self, dispatcher):
+        super().__init__()
+        self._dispatcher = dispatcher
+
+    def run(self):
+        self._dispatcher.start()
+
+
+class _RunIndexBackfill(QThread):
+    """
+    Adds the runs from the catalog to the index of runs in a separate thread.
+    """
+
+    def __init__(self, run_index, catalog):
+        super().__init__()
+        self._run_index = run_index
+        self._catalog = catalog
+
+    def run(self):
+        try:
+            n_runs = self._run_index.backfill(self._catalog)
+            print(f"Index of runs: {n_runs} runs were added from the catalog")
+        except Exception as ex:
+            print(f"Failed to update the index of runs from the catalog: {ex}")
 
 
 class ViewerModel:
@@ -25,12 +77,51 @@ class ViewerModel:
 
     def __init__(self):
         # self.search = SearchWithButton(SETTINGS.catalog, columns=SETTINGS.columns)
+        # Optional local index of runs, updated from live documents and from the catalog
+        self.run_index = None
+        if SETTINGS.run_index_path:
+            from .run_index import RunIndex
+
+            self.run_index = RunIndex(SETTINGS.run_index_path)
+
+        # Optional on-disk cache of thumbnails of completed maps
+        self.thumbnails = None
+        if SETTINGS.thumbnail_directory:
+            from .thumbnails import ThumbnailCache
+
+            self.thumbnails = ThumbnailCache(SETTINGS.thumbnail_directory, catalog=SETTINGS.catalog)
+
+        # Optional cache of the data of completed runs (memory-mappable arrays)
+        self.array_cache = None
+        if SETTINGS.array_cache_directory:
+            from .array_cache import RunArrayCache
+
+            self.array_cache = RunArrayCache(
+                SETTINGS.array_cache_directory, max_bytes=SETTINGS.array_cache_max_bytes
+            )
+
+        # Search results are loaded page by page as the table is scrolled
+        self.search = None
+        if SETTINGS.catalog is not None:
+            from .search import PagedSearchResults
+
+            headings, _ = SETTINGS.columns
+            self.search = PagedSearchResults(SETTINGS.catalog, headings=headings, run_index=self.run_index)
+        STARTUP_PROFILER.mark("create caches and search")
+
         # auto_plot_builder for live plotting
         self.live_auto_plot_builder = AutoSRXPlot()
         # auto_plot_builder for databroker plotting
         self.databroker_auto_plot_builder = AutoSRXPlot()
+        STARTUP_PROFILER.mark("create plot builders")
+
+        from .models import SRXRunEngineClient
 
-        self.run_engine = RunEngineClient(zmq_control_addr=os.environ.get("QSERVER_ZMQ_CONTROL_ADDRESS", None))
+        self.run_engine = SRXRunEngineClient(
+            zmq_control_addr=os.environ.get("QSERVER_ZMQ_CONTROL_ADDRESS", None),
+            allowed_items_cache_path=SETTINGS.allowed_items_cache_path,
+        )
+        STARTUP_PROFILER.mark("create RunEngineClient")
 
 
 class Viewer(ViewerModel):
@@ -43,26 +134,99 @@ class Viewer(ViewerModel):
     def __init__(self, *, show=True, title="Demo App"):
         # TODO Where does title thread through?
         super().__init__()
+
+        # Documents from all sources are delivered to the live plots in the GUI thread
+        self.document_queue = DocumentQueue(
+            catch_up=SETTINGS.catch_up, max_batch_size=SETTINGS.document_max_batch_size
+        )
+        self.document_queue.subscribe(_stream_documents_into_runs(self.live_auto_plot_builder.add_run))
+        self._document_queue_timer = QTimer()
+        self._document_queue_timer.timeout.connect(self.document_queue.process)
+        self._document_queue_timer.start(int(SETTINGS.document_update_period * 1000))
+
+        # Historical runs opened from the catalog are read by the worker threads and delivered
+        # to the plots in chunks, so the plots are drawn progressively and the GUI is not blocked
+        self.databroker_document_queue = DocumentQueue(
+            catch_up=SETTINGS.catch_up, max_batch_size=SETTINGS.document_max_batch_size
+        )
+        self.databroker_document_queue.subscribe(
+            _stream_documents_into_runs(self.databroker_auto_plot_builder.add_run)
+        )
+        self._document_queue_timer.timeout.connect(self.databroker_document_queue.process)
+        self.run_loader = RunLoader(
+            self.databroker_document_queue,
+            max_workers=SETTINGS.run_loader_workers,
+            chunk_size=SETTINGS.run_loader_chunk_size,
+            cache_bytes=SETTINGS.run_prefetch_cache_bytes,
+        )
+
+        if self.thumbnails is not None:
+            from .thumbnails import LiveThumbnails
+
+            self.document_queue.subscribe(LiveThumbnails(self.thumbnails, self.live_auto_plot_builder))
+
+        if self.array_cache is not None:
+            from .array_cache import LiveArrayCache
+
+            self.document_queue.subscribe(LiveArrayCache(self.array_cache, self.live_auto_plot_builder))
+
+        if self.run_index is not None:
+            self.document_queue.subscribe(self.run_index)
+            if self.search is not None:
+                # Add the runs that are missing in the index from the catalog
+                self._run_index_backfill = _RunIndexBackfill(self.run_index, self.search.root_catalog)
+                self._run_index_backfill.finished.connect(self._on_run_index_backfill_finished)
+                self._run_index_backfill.start()
+
+        # Periodically save the metrics to a file (machine-readable dump)
+        if SETTINGS.metrics_path:
+            self._metrics_timer = QTimer()
+            self._metrics_timer.timeout.connect(lambda: METRICS.save(SETTINGS.metrics_path))
+            self._metrics_timer.start(int(SETTINGS.metrics_save_period * 1000))
+
+        # Recorders are subscribed to all other sources of documents
+        self.recorders = []
+        for source in SETTINGS.subscribe_to:
+            if source["protocol"] == "file" and source.get("mode", "replay") == "record":
+                from .document_log import DocumentRecorder
+
+                print(f"Recording documents to file {source['path']!r} ...")
+                self.recorders.append(DocumentRecorder(source["path"]))
+        recorders = self.recorders
+        self.replayer, self.replayer_thread = None, None
+        STARTUP_PROFILER.mark("create document queues and recorders")
+
+        # The receivers and the consumers are stopped and their threads are joined when the viewer is closed
+        self.zmq_receivers, self.zmq_receiver_threads = [], []
+        self.kafka_consumers, self.kafka_consumer_threads = [], []
         for source in SETTINGS.subscribe_to:
             if source["protocol"] == "zmq":
-                from bluesky_widgets.qt.zmq_dispatcher import RemoteDispatcher
-                from bluesky_widgets.utils.streaming import stream_documents_into_runs
+                from .zmq_receiver import ZmqDocumentReceiver
 
                 zmq_addr = source["zmq_addr"]
 
-                dispatcher = RemoteDispatcher(zmq_addr)
-                dispatcher.subscribe(stream_documents_into_runs(self.live_auto_plot_builder.add_run))
-                dispatcher.start()
+                # Documents are received and decoded in a separate thread and put in the queue in batches
+                zmq_receiver = ZmqDocumentReceiver(zmq_addr)
+                zmq_receiver.subscribe_batch(self.document_queue.put_many)
+                for recorder in recorders:
+                    zmq_receiver.subscribe(recorder)
+
+                zmq_receiver_thread = _DispatcherStart(zmq_receiver)
+                zmq_receiver_thread.start()
+                self.zmq_receivers.append(zmq_receiver)
+                self.zmq_receiver_threads.append(zmq_receiver_thread)
 
             elif source["protocol"] == "kafka":
-                from bluesky_kafka import RemoteDispatcher
-                from bluesky_widgets.utils.streaming import stream_documents_into_runs
-                from qtpy.QtCore import QThread
 
                 bootstrap_servers = source["servers"]
                 topics = source["topics"]
                 consumer_config = source["config"]
-                consumer_config.update({"auto.commit.interval.ms": 100, "auto.offset.reset": "latest"})
+                # Partitions are assigned directly: no consumer group and no committed offsets
+                assign_partitions = source.get("assign_partitions", False)
+                if assign_partitions:
+                    consumer_config.update({"enable.auto.commit": False})
+                else:
+                    consumer_config.update({"auto.commit.interval.ms": 100, "auto.offset.reset": "latest"})
 
                 # We do not want to print passwords
                 consumer_config_copy = copy.deepcopy(consumer_config)
@@ -74,29 +238,61 @@ class Viewer(ViewerModel):
                 print(f"Topics: {topics}")
                 print(f"Consumer configuration: {pprint.pformat(consumer_config_copy)}")
 
-                self.dispatcher = RemoteDispatcher(
-                    topics=topics,
-                    bootstrap_servers=bootstrap_servers,
-                    group_id="widgets_test_" + str(uuid.uuid4()).split("-")[-1],  # Random group name
-                    consumer_config=consumer_config,
-                )
+                from .kafka_consumer import KafkaDocumentConsumer, StartOffsetIndex
+
+                offset_index = None
+                if source.get("reattach", False):
+                    # Seek back to the start of the run that is still open
+                    print(f"Index of Kafka offsets: {SETTINGS.kafka_offset_index_path}")
+                    offset_index = StartOffsetIndex(
+                        SETTINGS.kafka_offset_index_path, max_age=SETTINGS.kafka_reattach_max_age
+                    )
+
+                # Each topic is consumed in a separate thread and put in a separate lane of the
+                #   document queue, so that a busy topic does not delay the documents from other topics.
+                for topic in topics:
+                    if assign_partitions:
+                        # The group is not joined, so there is no need for a unique name
+                        group_id = "srx-gui"
+                    else:
+                        group_id = "widgets_test_" + str(uuid.uuid4()).split("-")[-1]  # Random group name
+                    consumer = KafkaDocumentConsumer(
+                        topics=[topic],
+                        bootstrap_servers=bootstrap_servers,
+                        group_id=group_id,
+                        consumer_config=consumer_config,
+                        offset_index=offset_index,
+                        assign_partitions=assign_partitions,
+                    )
+                    consumer.subscribe_batch(functools.partial(self.document_queue.put_many, source=topic))
+                    for recorder in recorders:
+                        consumer.subscribe(recorder)
+
+                    consumer_thread = _DispatcherStart(consumer)
+                    consumer_thread.start()
+                    self.kafka_consumers.append(consumer)
+                    self.kafka_consumer_threads.append(consumer_thread)
+
+            elif source["protocol"] == "file":
+                if source.get("mode", "replay") != "replay":
+                    continue
 
-                self.dispatcher.subscribe(stream_documents_into_runs(self.live_auto_plot_builder.add_run))
+                from .document_log import DocumentReplayer
 
-                class DispatcherStart(QThread):
-                    def __init__(self, dispatcher):
-                        super().__init__()
-                        self._dispatcher = dispatcher
+                speed = source.get("speed", 1.0)
+                print(f"Replaying documents from file {source['path']!r} (speed: {speed or 'max'}) ...")
 
-                    def run(self):
-                        self._dispatcher.start()
+                self.replayer = DocumentReplayer(source["path"], speed=speed)
+                self.replayer.subscribe(self.document_queue)
 
-                self.dispatcher_thread = DispatcherStart(self.dispatcher)
-                self.dispatcher_thread.start()
+                self.replayer_thread = _DispatcherStart(self.replayer)
+                self.replayer_thread.start()
 
             else:
                 print(f"Unknown protocol: {source['protocol']}")
 
+        STARTUP_PROFILER.mark("connect document sources")
+
         # Customize Run Engine model for BMM:
         #   - name of the module that contains custom code modules
         #     (conversion of spreadsheets to sequences of plans)
@@ -104,8 +300,21 @@ class Viewer(ViewerModel):
         #   - list of names of spreadsheet types
         # self.run_engine.plan_spreadsheet_data_types = ["wheel_xafs"]
 
+        # The widgets (and the matplotlib Qt backend) are imported only when the window is created
+        from bluesky_widgets.qt import Window
+
+        from .widgets import QtViewer
+
+        STARTUP_PROFILER.mark("import srx_gui.widgets")
+
         widget = QtViewer(self)
+        STARTUP_PROFILER.mark("create QtViewer")
+
         self._window = Window(widget, show=show)
+        STARTUP_PROFILER.mark("create and show window (first tab)")
+
+    def _on_run_index_backfill_finished(self):
+        self.search.refresh()
 
     @property
     def window(self):
@@ -117,4 +326,24 @@ class Viewer(ViewerModel):
 
     def close(self):
         """Close the window."""
+        # All sources are requested to stop first, so their threads exit in parallel
+        dispatchers = self.zmq_receivers + self.kafka_consumers
+        threads = self.zmq_receiver_threads + self.kafka_consumer_threads
+        if self.replayer is not None:
+            dispatchers.append(self.replayer)
+            threads.append(self.replayer_thread)
+        for dispatcher in dispatchers:
+            dispatcher.stop()
+        for thread in threads:
+            thread.wait()
+        # The recorded logs are flushed and closed (compressed logs are incomplete until closed)
+        for recorder in self.recorders:
+            recorder.close()
+        self.run_loader.close()
+        if self.search is not None:
+            self.search.close()
+        if self.thumbnails is not None:
+            self.thumbnails.close()
+        if self.array_cache is not None:
+            self.array_cache.close()
         self._window.close()
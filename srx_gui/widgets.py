@@ -1,6 +1,10 @@
 """
 Extendeding and supplementing the widgets import bluesky-widgets
 """
+import copy
+import threading
+import time
+
 from bluesky_widgets.models.plot_builders import Lines
 from bluesky_widgets.models.plot_specs import Figure, Axes
 from bluesky_widgets.qt.search import QtSearch
@@ -18,21 +22,33 @@ from bluesky_widgets.qt.run_engine_client import (
 )
 from qtpy.QtWidgets import (
     QWidget,
+    QTableView,
+    QAbstractItemView,
+    QHeaderView,
     QPushButton,
     QHBoxLayout,
     QVBoxLayout,
     QGridLayout,
     QComboBox,
     QLabel,
+    QLineEdit,
+    QFileDialog,
+    QProgressBar,
+    QTableWidgetItem,
     QTabWidget,
     QSplitter,
     QFrame,
 )
-from qtpy.QtCore import Qt
-
-from .models import RunAndView
+from qtpy.QtCore import Qt, QTimer, QThread, Signal, QAbstractTableModel, QModelIndex
+from qtpy.QtGui import QIcon
 
-# from .models import SearchAndView
+from .figures import DeferredDrawingMixin
+from .metrics import METRICS, figure_label
+from .models import RunAndView, SearchAndView
+from .plan_import import load_plan_batch
+from .polling import AdaptivePolling
+from .run_fields import get_stream_field_names
+from .settings import SETTINGS
 
 
 class QtSearchWithButton(QWidget):
@@ -60,6 +76,9 @@ class QtSearchWithButton(QWidget):
 
 
 class QtAddCustomPlot(QWidget):
+    # The run selected in the search results is opened by the background thread
+    _active_run_selected = Signal(object)
+
     def __init__(self, model, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.model = model
@@ -90,15 +109,21 @@ class QtAddCustomPlot(QWidget):
         self.add_button.clicked.connect(self._on_add_button_clicked)
         active_search_model = self.model.search
         active_search_model.events.active_run.connect(self._on_active_run_selected)
+        self._active_run_selected.connect(self._update_field_selectors)
         self.model.databroker_auto_plot_builder.figures.events.active_index.connect(self._on_active_figure_changed)
         self.x_selector.currentTextChanged.connect(self._on_x_selector_text_changed)
 
     def _on_active_run_selected(self, event):
+        self._active_run_selected.emit(event.run)
+
+    def _update_field_selectors(self, run):
         self.x_selector.clear()
         self.y_selector.clear()
-        for stream in self.model.search.active_run:
-            self.x_selector.addItems(self.model.search.active_run[stream].to_dask().keys())
-            self.y_selector.addItems(self.model.search.active_run[stream].to_dask().keys())
+        if run is not None:
+            # Field names are taken from the descriptors, the data is not loaded
+            for stream_field_names in get_stream_field_names(run).values():
+                self.x_selector.addItems(stream_field_names)
+                self.y_selector.addItems(stream_field_names)
         self.x_selector.addItem("time")
         self.y_selector.addItem("time")
 
@@ -141,6 +166,361 @@ class QtAddCustomPlot(QWidget):
             self.add_button.setEnabled(True)
 
 
+class QtSRXFigures(DeferredDrawingMixin, QtFigures):
+    """
+    ``QtFigures`` that records the time spent redrawing each figure (metric ``redraw_time``
+    labeled by the figure title and uuid prefix, see ``figure_label()``).
+
+    Figures that are not visible (the view is hidden or the figure is in an inactive tab) are
+    not redrawn (see ``DeferredDrawingMixin``). The updates of the axes (legend, limits) are
+    deferred and applied once to the latest state of the figure, which is redrawn once when
+    it becomes visible.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._init_deferred_drawing()
+        super().__init__(*args, **kwargs)
+        self.currentChanged.connect(self._schedule_deferred_updates)
+
+    def _is_drawing_enabled(self, figure_uuid):
+        qt_figure = self._figures.get(figure_uuid, None)
+        return qt_figure is not None and qt_figure.isVisible()
+
+    def _add_figure(self, figure_spec):
+        super()._add_figure(figure_spec)
+        qt_figure = self._figures[figure_spec.uuid]
+        canvas = qt_figure.figure.canvas
+        draw = canvas.draw
+        histogram = METRICS.histogram("redraw_time", figure=figure_label(figure_spec), view="qt")
+
+        def timed_draw(*args, **kwargs):
+            t_start = time.perf_counter()
+            try:
+                return draw(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - t_start)
+
+        canvas.draw = timed_draw
+        self._defer_drawing(figure_spec.uuid, qt_figure._axes)
+
+    def _on_figure_removed(self, event):
+        self._discard_deferred_updates(event.item.uuid)
+        super()._on_figure_removed(event)
+
+    def _schedule_deferred_updates(self, *args):
+        # The figures are checked for visibility after the pending events are processed
+        QTimer.singleShot(0, self._apply_visible_deferred_updates)
+
+    def _apply_visible_deferred_updates(self):
+        for figure_uuid in list(self._figures):
+            if self._has_deferred_updates(figure_uuid) and self._is_drawing_enabled(figure_uuid):
+                self._apply_deferred_updates(figure_uuid)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self._schedule_deferred_updates()
+
+
+class QtIngestMetrics(QWidget):
+    """
+    Compact status widget displaying the ingestion and rendering metrics.
+    """
+
+    def __init__(self, *args, update_period=1.0, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self._lb_metrics = QLabel("")
+        self._lb_metrics.setTextInteractionFlags(Qt.TextSelectableByMouse)
+
+        vbox = QVBoxLayout()
+        vbox.addWidget(self._lb_metrics)
+        self.setLayout(vbox)
+
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self._update_metrics)
+        self._timer.start(int(update_period * 1000))
+        self._update_metrics()
+
+    @staticmethod
+    def _format_time(value):
+        return "-" if value is None else f"{value * 1000:.1f} ms"
+
+    def _update_metrics(self):
+        documents = METRICS.counter("documents_received")
+        handling_time = METRICS.histogram("document_handling_time")
+        latency = METRICS.histogram("document_latency")
+        lag = sum(gauge.value for _, gauge in METRICS.find("kafka_consumer_lag"))
+        redraw_times = {
+            labels["figure"]: h.mean()
+            for labels, h in METRICS.find("redraw_time")
+            if h.count and labels.get("view", None) == "qt"
+        }
+        max_redraw_time = max(redraw_times.values()) if redraw_times else None
+
+        lines = [
+            f"Docs/s: {documents.rate():.1f}   Total: {documents.value}",
+            f"Queue: {METRICS.gauge('queue_depth').value}   Kafka lag: {lag}",
+            f"Handling: {self._format_time(handling_time.mean())}   Latency: {self._format_time(latency.last)}",
+            f"Redraw: {self._format_time(max_redraw_time)}",
+        ]
+        self._lb_metrics.setText("\n".join(lines))
+
+        tooltip = [f"{figure}: {self._format_time(value)}" for figure, value in redraw_times.items()]
+        self._lb_metrics.setToolTip("Average redraw time:\n" + "\n".join(tooltip))
+
+
+def _thumbnail_tooltip(thumbnails, uid):
+    return f'<img src="{thumbnails.path(uid)}">'
+
+
+class _PagedSearchResultsTableModel(QAbstractTableModel):
+    """
+    Qt table model for ``PagedSearchResults``. The view requests the data only for the visible
+    cells, so the rows are loaded from the catalog as they are scrolled into view. The rows are
+    counted and loaded in the background thread and displayed as placeholders until they are loaded
+    (see ``update_loaded_rows()``). If the cache of thumbnails is passed, the thumbnails of
+    the maps are displayed in the first column. The missing thumbnails of the visible rows
+    are generated in the background.
+    """
+
+    def __init__(self, model, *args, thumbnails=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.model = model
+        self.model.events.reset.connect(self._on_reset)
+        self._thumbnails = thumbnails
+        # Maps uid -> row for the runs with the thumbnails being generated
+        self._pending_thumbnails = {}
+
+    def _on_reset(self, event):
+        self.beginResetModel()
+        self._pending_thumbnails.clear()
+        self.endResetModel()
+
+    def update_thumbnails(self):
+        """
+        Update the rows for which the thumbnails were generated since the last update.
+        """
+        for uid, row in list(self._pending_thumbnails.items()):
+            if self._thumbnails.exists(uid):
+                index = self.index(row, 0)
+                self.dataChanged.emit(index, index, [Qt.DecorationRole, Qt.ToolTipRole])
+            elif not self._thumbnails.is_unavailable(uid):
+                continue
+            del self._pending_thumbnails[uid]
+
+    def update_loaded_rows(self):
+        """
+        Update the rows loaded in the background since the last update.
+        """
+        if self.model.pop_row_count() is not None:
+            # The rows of the results were counted in the background
+            self.beginResetModel()
+            self.endResetModel()
+        for first_row, last_row in self.model.pop_loaded_rows():
+            if last_row > first_row:
+                self.dataChanged.emit(self.index(first_row, 0), self.index(last_row - 1, self.columnCount() - 1))
+
+    def _thumbnail_data(self, row, role):
+        uid = self.model.get_uid_by_row(row)
+        if not self._thumbnails.exists(uid):
+            if not self._thumbnails.is_unavailable(uid):
+                self._pending_thumbnails[uid] = row
+                self._thumbnails.request(uid)
+            return None
+        if role == Qt.DecorationRole:
+            return QIcon(self._thumbnails.path(uid))
+        return _thumbnail_tooltip(self._thumbnails, uid)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.model)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.model.headings)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.model.headings[section]
+        return str(section + 1)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if not self.model.request_row(index.row()):
+            # The row is being loaded in the background
+            return "..." if role == Qt.DisplayRole else None
+        if role in (Qt.DecorationRole, Qt.ToolTipRole):
+            if self._thumbnails is not None and index.column() == 0:
+                return self._thumbnail_data(index.row(), role)
+            return None
+        if role != Qt.DisplayRole:
+            return None
+        return str(self.model.get_data(index.row(), index.column()))
+
+
+class QtPagedSearchResults(QWidget):
+    """
+    A view for ``PagedSearchResults``: table of runs with the button that opens the selected runs.
+    The thumbnails of the maps are displayed if the cache of thumbnails is passed.
+    """
+
+    def __init__(self, model, *args, thumbnails=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.model = model
+
+        self._table_model = _PagedSearchResultsTableModel(model, self, thumbnails=thumbnails)
+        self._table = QTableView()
+        self._table.setModel(self._table_model)
+        self._table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self._table.setHorizontalScrollMode(QAbstractItemView.ScrollPerPixel)
+        # Rows have the same height: the height is not computed from the contents of all rows
+        self._table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self._table.horizontalHeader().setStretchLastSection(True)
+        self._table.selectionModel().currentRowChanged.connect(self._on_current_row_changed)
+        self._table.doubleClicked.connect(self._on_double_clicked)
+
+        self._pb_refresh = QPushButton("Refresh")
+        self._pb_refresh.clicked.connect(self._on_refresh_clicked)
+        self._pb_view = QPushButton("View Selected Runs")
+        self._pb_view.clicked.connect(self._on_view_clicked)
+
+        hbox = QHBoxLayout()
+        hbox.addWidget(self._pb_refresh)
+        hbox.addStretch()
+        hbox.addWidget(self._pb_view)
+
+        vbox = QVBoxLayout()
+        # The results could be filtered only if the local index of runs is available
+        if model.run_index is not None:
+            self._le_filter = QLineEdit()
+            self._le_filter.setPlaceholderText("Filter: scan ID, plan name, motor or UID")
+            self._le_filter.setClearButtonEnabled(True)
+            self._le_filter.textChanged.connect(self._on_filter_text_changed)
+            vbox.addWidget(self._le_filter)
+            # The filter is applied when the user stops typing
+            self._filter_timer = QTimer(self)
+            self._filter_timer.setSingleShot(True)
+            self._filter_timer.setInterval(int(SETTINGS.search_filter_delay * 1000))
+            self._filter_timer.timeout.connect(self._apply_filter)
+        vbox.addWidget(self._table)
+        vbox.addLayout(hbox)
+        self.setLayout(vbox)
+
+        self._rows_timer = QTimer(self)
+        self._rows_timer.timeout.connect(self._table_model.update_loaded_rows)
+        self._rows_timer.start(50)
+
+        if thumbnails is not None:
+            self._thumbnail_timer = QTimer(self)
+            self._thumbnail_timer.timeout.connect(self._table_model.update_thumbnails)
+            self._thumbnail_timer.start(500)
+
+    def _on_current_row_changed(self, current, previous):
+        self.model.active_row = current.row() if current.isValid() else None
+
+    def _on_double_clicked(self, index):
+        self.model.view([index.row()])
+
+    def _on_filter_text_changed(self, text):
+        self._filter_timer.start()
+
+    def _apply_filter(self):
+        text = self._le_filter.text().strip()
+        if text:
+            self.model.filter(text=text)
+        else:
+            self.model.search(None)
+
+    def _on_refresh_clicked(self):
+        self.model.refresh()
+
+    def _on_view_clicked(self):
+        rows = sorted(_.row() for _ in self._table.selectionModel().selectedRows())
+        if rows:
+            self.model.view(rows)
+
+
+class QtSRXReManagerConnection(QtReManagerConnection):
+    """
+    ``QtReManagerConnection`` that polls RE Manager status with the adaptive period
+    (see ``AdaptivePolling``): frequently around transitions (e.g. start or completion of a plan)
+    and slowly while the manager is idle. Polling is resumed immediately when the status is
+    changed by the user (the request is sent from the GUI) or the client is disconnected.
+    """
+
+    def __init__(self, model, parent=None):
+        self._polling = AdaptivePolling(
+            fast_period=SETTINGS.re_poll_period_fast,
+            period=SETTINGS.re_poll_period,
+            idle_period=SETTINGS.re_poll_period_idle,
+        )
+        self._wake_up = threading.Event()
+        super().__init__(model, parent)
+        # The changes of the status loaded by the polling thread are processed in '_reload_status'.
+        # The event is not suspended by 'QtLazyTab', so the requests sent from the other tabs wake up polling.
+        self.model.events.status_changed_by_request.connect(self._on_status_changed)
+
+    def _on_status_changed(self, event):
+        self._polling.notify()
+        self._wake_up.set()
+
+    def _pb_re_manager_disconnect_clicked(self):
+        super()._pb_re_manager_disconnect_clicked()
+        self._wake_up.set()
+
+    def _reload_status(self):
+        self._wake_up.clear()
+        # The status kept by the client is not used while the status is polled faster than it expires
+        self.model.load_re_manager_status(reload=self._polling.is_fast())
+        period = self._polling.update(self.model.re_manager_status, self.model.re_manager_connected)
+        METRICS.gauge("re_poll_period").set(period)
+        METRICS.counter("re_status_polls").inc()
+        # Changes of the status loaded by this thread do not interrupt the pause
+        self._wake_up.clear()
+        self._wake_up.wait(period)
+
+
+class QtRunLoaderProgress(QWidget):
+    """
+    Progress of loading of historical runs (see ``RunLoader``). The widget is hidden
+    while no runs are loaded.
+    """
+
+    def __init__(self, run_loader, *args, update_period=0.2, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._run_loader = run_loader
+
+        self._lb_status = QLabel("")
+        self._progress_bar = QProgressBar()
+
+        hbox = QHBoxLayout()
+        hbox.setContentsMargins(0, 0, 0, 0)
+        hbox.addWidget(self._lb_status)
+        hbox.addWidget(self._progress_bar, stretch=1)
+        self.setLayout(hbox)
+        self.setVisible(False)
+
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self._update_progress)
+        self._timer.start(int(update_period * 1000))
+
+    def _update_progress(self):
+        progress = self._run_loader.progress()
+        self.setVisible(bool(progress))
+        if not progress:
+            return
+        loaded = sum(n for n, _ in progress.values())
+        totals = [total for _, total in progress.values()]
+        self._lb_status.setText(f"Loading {len(progress)} run(s): {loaded} events")
+        if None in totals:
+            # The number of events is unknown: display the 'busy' indicator
+            self._progress_bar.setRange(0, 0)
+        else:
+            self._progress_bar.setRange(0, max(sum(totals), 1))
+            self._progress_bar.setValue(min(loaded, sum(totals)))
+
+
 class QtSearchAndView(QWidget):
     def __init__(self, model, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -148,9 +528,14 @@ class QtSearchAndView(QWidget):
         layout = QHBoxLayout()
         self.setLayout(layout)
         # layout.addWidget(QtSearchWithButton(model.search))
+        if model.search is not None:
+            layout.addWidget(QtPagedSearchResults(model.search, thumbnails=model.thumbnails))
         plot_layout = QVBoxLayout()
-        # plot_layout.addWidget(QtAddCustomPlot(self.model))
-        plot_layout.addWidget(QtFigures(model.databroker_auto_plot_builder.figures))
+        if model.search is not None:
+            plot_layout.addWidget(QtAddCustomPlot(self.model))
+        if model.run_loader is not None:
+            plot_layout.addWidget(QtRunLoaderProgress(model.run_loader))
+        plot_layout.addWidget(QtSRXFigures(model.databroker_auto_plot_builder.figures))
         layout.addLayout(plot_layout)
 
 
@@ -160,11 +545,12 @@ class QtRunExperiment(QWidget):
         self.model = model
         vbox = QVBoxLayout()
         hbox = QHBoxLayout()
-        hbox.addWidget(QtReManagerConnection(model.run_engine))
+        hbox.addWidget(QtSRXReManagerConnection(model.run_engine))
         hbox.addWidget(QtReEnvironmentControls(model.run_engine))
         hbox.addWidget(QtReQueueControls(model.run_engine))
         hbox.addWidget(QtReExecutionControls(model.run_engine))
         hbox.addWidget(QtReStatusMonitor(model.run_engine))
+        hbox.addWidget(QtIngestMetrics())
 
         hbox.addStretch()
         vbox.addLayout(hbox)
@@ -173,10 +559,10 @@ class QtRunExperiment(QWidget):
 
         vbox1 = QVBoxLayout()
         vbox1.addWidget(QtReRunningPlan(model.run_engine), stretch=1)
-        vbox1.addWidget(QtRePlanQueue(model.run_engine), stretch=2)
+        vbox1.addWidget(QtSRXPlanQueue(model.run_engine), stretch=2)
         hbox.addLayout(vbox1)
         vbox2 = QVBoxLayout()
-        vbox2.addWidget(QtFigures(model.live_auto_plot_builder.figures))
+        vbox2.addWidget(QtSRXFigures(model.live_auto_plot_builder.figures))
         # vbox2.addWidget(QtRePlanEditor(model), stretch=1)
         hbox.addLayout(vbox2)
 
@@ -184,6 +570,294 @@ class QtRunExperiment(QWidget):
         self.setLayout(vbox)
 
 
+def _same_item(item_1, item_2):
+    return item_1.get("item_uid", None) == item_2.get("item_uid", None) and item_1 == item_2
+
+
+def _diff_items(old_items, new_items):
+    """
+    Compare two lists of queue (history) items. Returns the lengths of the common prefix and
+    the common suffix of the lists: only the items between the prefix and the suffix were changed.
+    """
+    n_old, n_new = len(old_items), len(new_items)
+    n_prefix = 0
+    while n_prefix < min(n_old, n_new) and _same_item(old_items[n_prefix], new_items[n_prefix]):
+        n_prefix += 1
+    n_suffix = 0
+    while n_suffix < min(n_old, n_new) - n_prefix and _same_item(
+        old_items[n_old - n_suffix - 1], new_items[n_new - n_suffix - 1]
+    ):
+        n_suffix += 1
+    return n_prefix, n_suffix
+
+
+class _DiffTableUpdateMixin:
+    """
+    Mixin for ``QtRePlanQueue`` and ``QtRePlanHistory`` that updates the table by replacing
+    only the rows that were changed instead of reloading the contents of the table. The lists
+    of items are compared by ``item_uid`` (and contents), so adding, removing, moving or editing
+    an item updates O(changes) rows in the queue or the history with thousands of items.
+    """
+
+    def _set_table_row(self, nr, item):
+        for nc, col_name in enumerate(self._table_column_labels):
+            try:
+                value = self.model.get_item_value_for_label(item=item, label=col_name)
+            except KeyError:
+                value = ""
+            table_item = QTableWidgetItem(value)
+            table_item.setFlags(table_item.flags() & ~Qt.ItemIsEditable)
+            self._table.setItem(nr, nc, table_item)
+
+    def _update_table_rows(self, old_items, new_items):
+        """
+        Update the table displaying ``old_items`` to display ``new_items``. Returns the list of
+        displayed items: the unchanged items are reused from ``old_items``, the changed items
+        are copied from ``new_items``.
+        """
+        n_prefix, n_suffix = _diff_items(old_items, new_items)
+        n_removed = len(old_items) - n_prefix - n_suffix
+        n_added = len(new_items) - n_prefix - n_suffix
+        old_changed = old_items[n_prefix : n_prefix + n_removed]
+        new_changed = new_items[n_prefix : n_prefix + n_added]
+
+        if n_added == n_removed > 1 and old_changed[1:] == new_changed[:-1]:
+            # One item was moved down: the rows between the old and the new position are not changed
+            self._table.removeRow(n_prefix)
+            self._table.insertRow(n_prefix + n_added - 1)
+            moved_item = copy.deepcopy(new_changed[-1])
+            self._set_table_row(n_prefix + n_added - 1, moved_item)
+            changed_items = old_changed[1:] + [moved_item]
+        elif n_added == n_removed > 1 and old_changed[:-1] == new_changed[1:]:
+            # One item was moved up
+            self._table.removeRow(n_prefix + n_removed - 1)
+            self._table.insertRow(n_prefix)
+            moved_item = copy.deepcopy(new_changed[0])
+            self._set_table_row(n_prefix, moved_item)
+            changed_items = [moved_item] + old_changed[:-1]
+        else:
+            changed_items = copy.deepcopy(new_changed)
+            # The existing rows are reused, then the missing rows are inserted or the extra rows removed
+            n_replaced = min(n_removed, n_added)
+            if n_added > n_removed:
+                for _ in range(n_added - n_removed):
+                    self._table.insertRow(n_prefix + n_replaced)
+            else:
+                for _ in range(n_removed - n_added):
+                    self._table.removeRow(n_prefix + n_replaced)
+            for n, item in enumerate(changed_items):
+                self._set_table_row(n_prefix + n, item)
+
+        if bool(old_items) != bool(new_items):
+            # Stretch the header if the table is empty
+            resize_mode = QHeaderView.ResizeToContents if new_items else QHeaderView.Stretch
+            self._table.horizontalHeader().setSectionResizeMode(resize_mode)
+
+        return old_items[:n_prefix] + changed_items + old_items[len(old_items) - n_suffix :]
+
+    def _is_scrolled_to_bottom(self):
+        scroll_bar = self._table.verticalScrollBar()
+        return scroll_bar.value() == scroll_bar.maximum()
+
+    def _end_table_update(self, n_items):
+        self._n_table_items = n_items
+        # Advance scrollbar if the table is scrolled all the way down.
+        if self._table_scrolled_to_bottom:
+            scroll_maximum_new = self._table.verticalScrollBar().maximum()
+            self._table.verticalScrollBar().setValue(scroll_maximum_new)
+
+
+class QtSRXPlanQueue(_DiffTableUpdateMixin, QtRePlanQueue):
+    """
+    ``QtRePlanQueue`` with diff-based updates of the table (see ``_DiffTableUpdateMixin``).
+    """
+
+    def slot_plan_queue_changed(self, plan_queue_items, selected_item_uids):
+        self._block_table_selection_processing = True
+
+        # If the top plan is visible, it should remain visible even if plans are added to the queue
+        scroll_value = self._table.verticalScrollBar().value()
+        self._table_scrolled_to_bottom = bool(scroll_value) and self._is_scrolled_to_bottom()
+
+        # Local copy of the plan queue items for operations performed locally within the widget
+        self._plan_queue_items = self._update_table_rows(self._plan_queue_items, plan_queue_items)
+        self._end_table_update(len(plan_queue_items))
+
+        self._block_table_selection_processing = False
+
+        self.slot_change_selection(selected_item_uids)
+        self._update_button_states()
+
+
+class QtSRXPlanHistory(_DiffTableUpdateMixin, QtRePlanHistory):
+    """
+    ``QtRePlanHistory`` with diff-based updates of the table (see ``_DiffTableUpdateMixin``).
+    The thumbnails of the maps acquired by the plans (the first run of the plan that has
+    a thumbnail) are displayed if the cache of thumbnails is passed. The thumbnails that
+    are generated in the background are displayed once they are ready.
+    """
+
+    def __init__(self, model, parent=None, *, thumbnails=None):
+        self._thumbnails = thumbnails
+        self._plan_history_items = []
+        # Maps item uid -> list of run uids for the items without thumbnails
+        self._pending_thumbnails = {}
+        super().__init__(model, parent)
+
+        if thumbnails is not None:
+            self._thumbnail_timer = QTimer(self)
+            self._thumbnail_timer.timeout.connect(self._update_thumbnails)
+            self._thumbnail_timer.start(1000)
+
+    def _set_table_row(self, nr, item):
+        super()._set_table_row(nr, item)
+        if self._thumbnails is None:
+            return
+        run_uids = (item.get("result", None) or {}).get("run_uids", None) or []
+        # The missing thumbnails could be generated only if the catalog is available
+        if not self._set_thumbnail(nr, run_uids) and run_uids and self._thumbnails.catalog is not None:
+            for uid in run_uids:
+                self._thumbnails.request(uid)
+            self._pending_thumbnails[item.get("item_uid", None)] = run_uids
+
+    def _set_thumbnail(self, nr, run_uids):
+        for uid in run_uids:
+            if self._thumbnails.exists(uid):
+                table_item = self._table.item(nr, 0)
+                table_item.setIcon(QIcon(self._thumbnails.path(uid)))
+                table_item.setToolTip(_thumbnail_tooltip(self._thumbnails, uid))
+                return True
+        return False
+
+    def _update_thumbnails(self):
+        for item_uid, run_uids in list(self._pending_thumbnails.items()):
+            if any(self._thumbnails.exists(_) for _ in run_uids):
+                for nr, item in enumerate(self._plan_history_items):
+                    if item.get("item_uid", None) == item_uid:
+                        self._set_thumbnail(nr, run_uids)
+                del self._pending_thumbnails[item_uid]
+            elif all(self._thumbnails.is_unavailable(_) for _ in run_uids):
+                del self._pending_thumbnails[item_uid]
+
+    def slot_plan_history_changed(self, plan_history_items, selected_item_pos):
+        self._table_scrolled_to_bottom = self._is_scrolled_to_bottom()
+        self._plan_history_items = self._update_table_rows(self._plan_history_items, plan_history_items)
+        self._end_table_update(len(plan_history_items))
+
+        # Call function directly
+        self.slot_change_selection(selected_item_pos)
+        self._update_button_states()
+
+
+class _PlanBatchValidation(QThread):
+    """
+    Reads and validates the table of plan parameters in a separate thread.
+    """
+
+    validated = Signal(object, object, str)
+
+    def __init__(self, path, allowed_plans, allowed_devices):
+        super().__init__()
+        self._path = path
+        self._allowed_plans = allowed_plans
+        self._allowed_devices = allowed_devices
+
+    def run(self):
+        try:
+            items, errors = load_plan_batch(
+                self._path, allowed_plans=self._allowed_plans, allowed_devices=self._allowed_devices
+            )
+            self.validated.emit(items, errors, "")
+        except Exception as ex:
+            self.validated.emit([], [], f"Failed to read the file {self._path!r}: {ex}")
+
+
+class QtPlanBatchImport(QWidget):
+    """
+    Import of the batch of plans from CSV or YAML table (see ``read_plan_table()``). The plans
+    are validated in the background thread against the lists of allowed plans and devices
+    downloaded from RE Manager (or loaded from the local cache), and all plans are added
+    to the queue in a single request only if every row of the table is valid.
+    """
+
+    def __init__(self, model, *args, max_displayed_errors=5, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.model = model
+        self._max_displayed_errors = max_displayed_errors
+        self._items = []
+        self._validation = None
+
+        self._pb_import = QPushButton("Import Plans ...")
+        self._pb_import.clicked.connect(self._pb_import_clicked)
+        self._pb_submit = QPushButton("Submit Plans")
+        self._pb_submit.setEnabled(False)
+        self._pb_submit.clicked.connect(self._pb_submit_clicked)
+        self._lb_status = QLabel("")
+        self._lb_status.setWordWrap(True)
+
+        hbox = QHBoxLayout()
+        hbox.setContentsMargins(0, 0, 0, 0)
+        hbox.addWidget(self._pb_import)
+        hbox.addWidget(self._pb_submit)
+        hbox.addWidget(self._lb_status, stretch=1)
+        self.setLayout(hbox)
+
+    def _set_items(self, items, status):
+        self._items = items
+        self._pb_submit.setText(f"Submit {len(items)} Plans" if items else "Submit Plans")
+        self._pb_submit.setEnabled(bool(items))
+        self._lb_status.setText(status)
+
+    def _pb_import_clicked(self):
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Import Plans", "", "Plan tables (*.csv *.yaml *.yml);;All files (*)"
+        )
+        if path:
+            self.import_file(path)
+
+    def import_file(self, path):
+        """
+        Read and validate the table of plans in the background thread.
+        """
+        # The copies are validated: the lists may be updated by the polling thread
+        allowed_plans = self.model.get_allowed_plans()
+        if not allowed_plans:
+            self._set_items([], "The list of allowed plans is not loaded: connect to RE Manager")
+            return
+        self._set_items([], f"Validating plans from {path!r} ...")
+        self._pb_import.setEnabled(False)
+        self._validation = _PlanBatchValidation(path, allowed_plans, self.model.get_allowed_devices())
+        self._validation.validated.connect(self._on_validated)
+        self._validation.start()
+
+    def _on_validated(self, items, errors, error_message):
+        self._pb_import.setEnabled(True)
+        if error_message:
+            self._set_items([], error_message)
+        elif errors:
+            # The messages are followed by the contents of the plan, which is displayed in the table
+            lines = [f"Row {n + 1}: {msg.splitlines()[0]}" for n, msg in errors[: self._max_displayed_errors]]
+            if len(errors) > self._max_displayed_errors:
+                lines.append(f"... ({len(errors) - self._max_displayed_errors} more)")
+            self._set_items([], f"{len(errors)} of {len(items)} plans are invalid:\n" + "\n".join(lines))
+        elif not items:
+            self._set_items([], "The file contains no plans")
+        else:
+            self._set_items(items, f"{len(items)} plans are valid")
+
+    def _pb_submit_clicked(self):
+        items = self._items
+        if not items:
+            return
+        self._set_items([], f"Submitting {len(items)} plans ...")
+        try:
+            self.model.queue_item_add_batch(items=items)
+            self._set_items([], f"{len(items)} plans were added to the queue")
+        except Exception as ex:
+            # The items could be submitted again
+            self._set_items(items, str(ex))
+
+
 class QtOrganizeQueueLeft(QSplitter):
     def __init__(self, model, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -200,13 +874,15 @@ class QtOrganizeQueueLeft(QSplitter):
         # self.addWidget(self._frame_top)
         self.addWidget(self._frame_bottom)
 
-        self._plan_history = QtRePlanQueue(model)
+        self._plan_history = QtSRXPlanQueue(model)
+        self._plan_import = QtPlanBatchImport(model)
 
         # vbox = QVBoxLayout()
         # vbox.addWidget(self._plan_editor, stretch=1)
         # self._frame_top.setLayout(vbox)
 
         vbox = QVBoxLayout()
+        vbox.addWidget(self._plan_import)
         vbox.addWidget(self._plan_history, stretch=1)
         self._frame_bottom.setLayout(vbox)
 
@@ -215,7 +891,7 @@ class QtOrganizeQueueLeft(QSplitter):
 
 
 class QtOrganizeQueueRight(QSplitter):
-    def __init__(self, model, *args, **kwargs):
+    def __init__(self, model, *args, thumbnails=None, **kwargs):
         super().__init__(*args, **kwargs)
         self.model = model
 
@@ -231,7 +907,7 @@ class QtOrganizeQueueRight(QSplitter):
         self.addWidget(self._frame_bottom)
 
         self._plan_editor = QtRePlanEditor(model)
-        self._plan_history = QtRePlanHistory(model)
+        self._plan_history = QtSRXPlanHistory(model, thumbnails=thumbnails)
 
         vbox = QVBoxLayout()
         vbox.addWidget(self._plan_editor, stretch=1)
@@ -246,7 +922,7 @@ class QtOrganizeQueueRight(QSplitter):
 
 
 class QtOrganizeQueueSplitter(QSplitter):
-    def __init__(self, model, *args, **kwargs):
+    def __init__(self, model, *args, thumbnails=None, **kwargs):
         super().__init__(*args, **kwargs)
         self.model = model
 
@@ -262,7 +938,7 @@ class QtOrganizeQueueSplitter(QSplitter):
         self.addWidget(self._frame_right)
 
         self._plan_editor = QtOrganizeQueueLeft(model)
-        self._right_splitter = QtOrganizeQueueRight(model)
+        self._right_splitter = QtOrganizeQueueRight(model, thumbnails=thumbnails)
 
         vbox = QVBoxLayout()
         vbox.addWidget(self._plan_editor, stretch=1)
@@ -277,12 +953,12 @@ class QtOrganizeQueueSplitter(QSplitter):
 
 
 class QtOrganizeQueue(QWidget):
-    def __init__(self, model, *args, **kwargs):
+    def __init__(self, model, *args, thumbnails=None, **kwargs):
         super().__init__(*args, **kwargs)
         self.model = model
 
         hbox = QHBoxLayout()
-        hbox.addWidget(QtOrganizeQueueSplitter(model))
+        hbox.addWidget(QtOrganizeQueueSplitter(model, thumbnails=thumbnails))
         self.setLayout(hbox)
 
 
@@ -291,10 +967,137 @@ class QtLivePlots(QWidget):
         super().__init__(*args, **kwargs)
         self.model = model
         vbox = QVBoxLayout()
-        vbox.addWidget(QtFigures(model.live_auto_plot_builder.figures))
+        vbox.addWidget(QtSRXFigures(model.live_auto_plot_builder.figures))
         self.setLayout(vbox)
 
 
+class QtLazyTab(QWidget):
+    """
+    Container for a tab of ``QtViewer``. The contained widget is created by calling ``factory()``
+    the first time the tab is shown. While the tab is hidden, the callbacks that the widget
+    connected to the model events (``model_events``) are blocked and the latest event
+    from each emitter is saved. When the tab is shown again, the callbacks are unblocked
+    and called once with the saved events, so the widget is updated to the current state.
+
+    Parameters
+    ----------
+    factory: callable
+        Function that creates the widget, called as ``factory()``.
+    model_events: EmitterGroup or None, optional
+        Events of the model, e.g. ``run_engine.events``.
+    """
+
+    # Events that carry the complete state, so only the latest event needs to be delivered
+    #   to the widget when it is shown. Other events (e.g. requests to process items) are never blocked.
+    suspended_events = (
+        "status_changed",
+        "plan_queue_changed",
+        "running_item_changed",
+        "plan_history_changed",
+        "allowed_plans_changed",
+        "allowed_devices_changed",
+    )
+
+    def __init__(self, factory, *args, model_events=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._factory = factory
+        self._model_events = model_events
+        self._widget = None
+
+        # Maps emitter name -> list of callbacks connected by the widget
+        self._callbacks = {}
+        # Maps emitter name -> the latest event emitted while the tab was suspended
+        self._latest_events = {}
+        self._suspended = False
+        # The events may be emitted by the polling threads while the tab is suspended or resumed
+        self._lock = threading.Lock()
+
+        vbox = QVBoxLayout()
+        vbox.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(vbox)
+
+    @property
+    def widget(self):
+        """
+        The contained widget or ``None`` if the widget was not created yet.
+        """
+        return self._widget
+
+    def _emitters(self):
+        if self._model_events is None:
+            return {}
+        emitters = self._model_events.emitters
+        return {name: emitters[name] for name in self.suspended_events if name in emitters}
+
+    @staticmethod
+    def _resolve_callback(callback):
+        # Bound methods are stored by emitters as (weakref, method_name)
+        if isinstance(callback, tuple):
+            obj = callback[0]()
+            return None if obj is None else getattr(obj, callback[1], None)
+        return callback
+
+    def _create_widget(self):
+        emitters = self._emitters()
+        callbacks_before = {name: set(emitter.callbacks) for name, emitter in emitters.items()}
+
+        self._widget = self._factory()
+        self.layout().addWidget(self._widget)
+
+        for name, emitter in emitters.items():
+            self._callbacks[name] = [_ for _ in emitter.callbacks if _ not in callbacks_before[name]]
+            if self._callbacks[name]:
+                # The events are saved before they are delivered to the callbacks of the widget
+                emitter.connect(self._save_event, position="first")
+
+    def _save_event(self, event):
+        with self._lock:
+            if self._suspended:
+                self._latest_events[event.type] = event
+
+    def _suspend(self):
+        if self._suspended:
+            return
+        with self._lock:
+            self._suspended = True
+        emitters = self._emitters()
+        for name, callbacks in self._callbacks.items():
+            for callback in filter(None, map(self._resolve_callback, callbacks)):
+                emitters[name].block(callback)
+
+    def _resume(self):
+        if not self._suspended:
+            return
+        emitters = self._emitters()
+        callbacks = {
+            name: list(filter(None, map(self._resolve_callback, _))) for name, _ in self._callbacks.items()
+        }
+        # The callbacks are unblocked while the events are still saved, so each event emitted
+        #   by other threads in the meantime is either delivered or saved and replayed
+        for name in callbacks:
+            for callback in callbacks[name]:
+                if emitters[name].blocked(callback):
+                    emitters[name].unblock(callback)
+        with self._lock:
+            latest_events, self._latest_events = self._latest_events, {}
+            self._suspended = False
+        for name, event in latest_events.items():
+            for callback in callbacks.get(name, []):
+                callback(event)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self._widget is None:
+            self._create_widget()
+        else:
+            self._resume()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        if self._widget is not None:
+            self._suspend()
+
+
 class QtViewer(QTabWidget):
     def __init__(self, model, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -302,15 +1105,36 @@ class QtViewer(QTabWidget):
 
         self.setTabPosition(QTabWidget.West)
 
-        self._run_experiment = QtRunExperiment(RunAndView(model.run_engine, model.live_auto_plot_builder))
+        # Tabs are created the first time they are shown
+        events = model.run_engine.events
+
+        self._run_experiment = QtLazyTab(
+            lambda: QtRunExperiment(RunAndView(model.run_engine, model.live_auto_plot_builder)),
+            model_events=events,
+        )
         self.addTab(self._run_experiment, "Run Experiment")
 
-        self._organize_queue = QtOrganizeQueue(model.run_engine)
+        self._organize_queue = QtLazyTab(
+            lambda: QtOrganizeQueue(model.run_engine, thumbnails=model.thumbnails), model_events=events
+        )
         self.addTab(self._organize_queue, "Organize Queue")
 
-        self._live_plots = QtLivePlots(RunAndView(model.run_engine, model.live_auto_plot_builder))
+        self._live_plots = QtLazyTab(
+            lambda: QtLivePlots(RunAndView(model.run_engine, model.live_auto_plot_builder)), model_events=events
+        )
         self.addTab(self._live_plots, "Live Plots")
 
-        # self._search_and_view = QtSearchAndView(SearchAndView(model.search, model.databroker_auto_plot_builder))
-        # self._search_and_view = QtSearchAndView(SearchAndView(model.databroker_auto_plot_builder))
-        # self.addTab(self._search_and_view, "Data Broker")
+        # The tab for browsing the catalog is displayed only if the catalog is opened
+        if model.search is not None:
+            self._search_and_view = QtLazyTab(
+                lambda: QtSearchAndView(
+                    SearchAndView(
+                        model.databroker_auto_plot_builder,
+                        model.search,
+                        run_loader=getattr(model, "run_loader", None),
+                        thumbnails=model.thumbnails,
+                        array_cache=model.array_cache,
+                    )
+                )
+            )
+            self.addTab(self._search_and_view, "Data Broker")
@@ -0,0 +1,134 @@
+"""
+Receiving Bluesky documents published over 0MQ in a background thread.
+"""
+import pickle
+
+
+class ZmqDocumentReceiver:
+    """
+    Receives documents from a 0MQ proxy in a background thread. Documents are received
+    and deserialized in batches (all messages that are available at the moment, up to
+    ``batch_size``) and the batches are passed to the subscribed batch callbacks, so
+    a high-rate feed does not compete with the processing of UI events in the Qt loop.
+
+    The interface is similar to the interface of dispatchers: subscribe the callbacks and call
+    the blocking ``start()`` method in a separate thread.
+
+    Parameters
+    ----------
+    address : tuple | str
+        Address of a running 0MQ proxy, given either as a string like
+        ``'127.0.0.1:5567'`` or as a tuple like ``('127.0.0.1', 5567)``
+    prefix : bytes, optional
+        User-defined bytestring used to distinguish between multiple
+        Publishers. If set, messages without this prefix will be ignored.
+    deserializer: function, optional
+        Function to deserialize documents. Default is ``pickle.loads``.
+    batch_size: int, optional
+        Maximum number of documents in a batch.
+    polling_duration: float, optional
+        Time in seconds to wait for messages.
+
+    Examples
+    --------
+    >>> receiver = ZmqDocumentReceiver("localhost:5578")
+    >>> receiver.subscribe_batch(document_queue.put_many)
+    >>> receiver.start()  # Blocking, call in a separate thread
+    """
+
+    def __init__(self, address, *, prefix=b"", deserializer=pickle.loads, batch_size=1000, polling_duration=0.05):
+        if isinstance(prefix, str):
+            raise ValueError("prefix must be bytes, not string")
+        if b" " in prefix:
+            raise ValueError(f"prefix {prefix!r} may not contain b' '")
+        if isinstance(address, str):
+            address = address.split(":", maxsplit=1)
+        self.address = (address[0], int(address[1]))
+
+        self._prefix = prefix
+        self._deserializer = deserializer
+        self._batch_size = batch_size
+        self._polling_duration = polling_duration
+
+        self._callbacks = []
+        self._batch_callbacks = []
+        self._stop_requested = False
+        self._waiting_for_start = True
+
+    def subscribe(self, func):
+        """
+        Subscribe the callback. The callback is called as ``func(name, doc)`` for each document.
+        """
+        self._callbacks.append(func)
+
+    def subscribe_batch(self, func):
+        """
+        Subscribe the batch callback. The callback is called as ``func(documents)``, where
+        ``documents`` is a list of ``(name, doc)`` pairs.
+        """
+        self._batch_callbacks.append(func)
+
+    def stop(self):
+        """
+        Request the receiving loop to stop.
+        """
+        self._stop_requested = True
+
+    def _decode(self, message):
+        """
+        Returns (name, doc) or None if the message should be ignored.
+        """
+        prefix, name, doc = message.split(b" ", 2)
+        name = name.decode()
+        if self._prefix and prefix != self._prefix:
+            return None
+        if self._waiting_for_start:
+            # We subscribed midstream and are seeing documents for which we
+            # do not have the full run. Wait for a 'start' doc.
+            if name != "start":
+                return None
+            self._waiting_for_start = False
+        return name, self._deserializer(doc)
+
+    def start(self):
+        """
+        Start the receiving loop. The function returns after ``stop()`` is called.
+        """
+        import zmq
+
+        self._stop_requested = False
+        context = zmq.Context()
+        socket = context.socket(zmq.SUB)
+        socket.connect("tcp://%s:%d" % self.address)
+        socket.setsockopt_string(zmq.SUBSCRIBE, "")
+        poller = zmq.Poller()
+        poller.register(socket, zmq.POLLIN)
+
+        try:
+            while not self._stop_requested:
+                if not poller.poll(int(self._polling_duration * 1000)):
+                    continue
+
+                documents = []
+                while len(documents) < self._batch_size:
+                    try:
+                        message = socket.recv(zmq.NOBLOCK)
+                    except zmq.Again:
+                        break
+                    try:
+                        result = self._decode(message)
+                    except Exception as ex:
+                        print(f"0MQ: failed to decode a message: {ex}")
+                        continue
+                    if result is not None:
+                        documents.append(result)
+
+                if documents:
+                    for func in self._batch_callbacks:
+                        func(documents)
+                    for name, doc in documents:
+                        for func in self._callbacks:
+                            func(name, doc)
+        finally:
+            socket.close(linger=0)
+            context.term()